@@ -0,0 +1,301 @@
+# Runs a batch of Brewin# programs across a pool of worker processes and
+# writes a JSON report of how each one went.
+#
+#   python batch_runner.py PATH [--jobs N] [--timeout SECONDS] [--report FILE]
+#                          [--engine ENGINE] [--parser PARSER] [--optimize]
+#
+# PATH is a directory, searched recursively for .br programs, or a manifest.
+# A .json manifest is a list of {"program": ..., "input": ..., "expected": ...}
+# objects, any other manifest lists one program per line; paths in a manifest
+# are relative to it. A program found without an explicit input or expected
+# file uses name.in and name.out next to it when they exist: the input file
+# feeds inputi()/inputs() and the expected file is compared with the output,
+# line by line.
+#
+# Each worker imports the interpreter once and then runs program after
+# program. A program still running when its timeout is up has its worker
+# killed and replaced, so one runaway program costs a worker restart, not the
+# whole batch. The exit status is 1 if any program timed out, crashed the
+# interpreter or printed something other than its expected output.
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from input_sources import ListSource
+from interpreterv4 import Interpreter
+
+PROGRAM_SUFFIX = ".br"
+INPUT_SUFFIX = ".in"
+EXPECTED_SUFFIX = ".out"
+
+
+def find_jobs(path):
+    if os.path.isdir(path):
+        programs = []
+        for directory, _, names in os.walk(path):
+            for name in names:
+                if name.endswith(PROGRAM_SUFFIX):
+                    programs.append(os.path.join(directory, name))
+        return [job_for(program) for program in sorted(programs)]
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        if path.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [{"program": line.strip()} for line in f if line.strip()]
+    jobs = []
+    for entry in entries:
+        job = job_for(os.path.join(base, entry["program"]))
+        for key in ("input", "expected"):
+            if entry.get(key) is not None:
+                job[key] = os.path.join(base, entry[key])
+        jobs.append(job)
+    return jobs
+
+
+def job_for(program):
+    stem = program[: -len(PROGRAM_SUFFIX)] if program.endswith(PROGRAM_SUFFIX) else program
+    job = {"program": program, "input": None, "expected": None}
+    if os.path.exists(stem + INPUT_SUFFIX):
+        job["input"] = stem + INPUT_SUFFIX
+    if os.path.exists(stem + EXPECTED_SUFFIX):
+        job["expected"] = stem + EXPECTED_SUFFIX
+    return job
+
+
+def run_job(job, options):
+    result = {
+        "program": job["program"],
+        "status": "ok",
+        "output": [],
+        "error_type": None,
+        "error_line": None,
+        "error": None,
+        "log": "",
+        "passed": None,
+        "wall_time": 0.0,
+    }
+    start = time.perf_counter()
+    inp = None
+    # whatever the parser or a trace prints goes to the report, not the
+    # worker's stdout
+    log = io.StringIO()
+    try:
+        with open(job["program"]) as f:
+            source = f.read()
+        if job["input"] is not None:
+            inp = open(job["input"], "rb")
+        interpreter = Interpreter(
+            console_output=False,
+            # no input file means no input, not the keyboard
+            inp=inp if inp is not None else ListSource([]),
+            engine=options["engine"],
+            parser=options["parser"],
+            optimize=options["optimize"],
+        )
+        try:
+            with contextlib.redirect_stdout(log):
+                interpreter.run(source)
+        except SyntaxError as e:
+            result["status"] = "syntax_error"
+            result["error"] = str(e)
+        except Exception as e:
+            result["error"] = str(e)
+        result["output"] = list(interpreter.get_output())
+        error_type, error_line = interpreter.get_error_type_and_line()
+        if error_type is not None:
+            result["status"] = "error"
+            result["error_type"] = error_type.name
+            result["error_line"] = error_line
+        elif result["error"] is not None and result["status"] == "ok":
+            result["status"] = "crash"
+    except Exception as e:
+        result["status"] = "crash"
+        result["error"] = str(e)
+    finally:
+        if inp is not None:
+            inp.close()
+    result["log"] = log.getvalue()
+    result["wall_time"] = time.perf_counter() - start
+    if job["expected"] is not None:
+        with open(job["expected"]) as f:
+            result["passed"] = f.read().splitlines() == result["output"]
+    return result
+
+
+def worker_main(conn, options):
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        conn.send(run_job(job, options))
+
+
+class Worker:
+    def __init__(self, context, options):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(child_conn, options), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.index = None
+        self.deadline = None
+
+    def start(self, index, job, timeout):
+        self.index = index
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.conn.send(job)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def failed_result(job, status, error, wall_time):
+    return {
+        "program": job["program"],
+        "status": status,
+        "output": [],
+        "error_type": None,
+        "error_line": None,
+        "error": error,
+        "log": "",
+        "passed": False if job["expected"] is not None else None,
+        "wall_time": wall_time,
+    }
+
+
+# the results of running jobs on a pool of processes, in the order of jobs
+def run_batch(
+    jobs, processes=None, timeout=None, engine="tree", parser="ply", optimize=False
+):
+    if not jobs:
+        return []
+    options = {"engine": engine, "parser": parser, "optimize": optimize}
+    processes = max(1, min(processes or os.cpu_count() or 1, len(jobs)))
+    context = multiprocessing.get_context()
+    results = [None] * len(jobs)
+    pending = deque(enumerate(jobs))
+    idle = [Worker(context, options) for _ in range(processes)]
+    busy = {}
+    try:
+        while pending or busy:
+            while pending and idle:
+                worker = idle.pop()
+                index, job = pending.popleft()
+                worker.start(index, job, timeout)
+                busy[worker.conn] = worker
+            deadlines = [w.deadline for w in busy.values() if w.deadline is not None]
+            wait_for = None
+            if deadlines:
+                wait_for = max(0.0, min(deadlines) - time.monotonic())
+            for conn in wait(list(busy), wait_for):
+                worker = busy.pop(conn)
+                job = jobs[worker.index]
+                try:
+                    results[worker.index] = conn.recv()
+                    idle.append(worker)
+                except (EOFError, OSError):
+                    # the worker died with the program, e.g. out of memory
+                    worker.kill()
+                    results[worker.index] = failed_result(
+                        job, "crash", "worker process died", None
+                    )
+                    idle.append(Worker(context, options))
+            now = time.monotonic()
+            for conn, worker in list(busy.items()):
+                if worker.deadline is not None and now >= worker.deadline:
+                    del busy[conn]
+                    worker.kill()
+                    results[worker.index] = failed_result(
+                        jobs[worker.index], "timeout", f"timed out after {timeout}s", timeout
+                    )
+                    idle.append(Worker(context, options))
+    finally:
+        for worker in busy.values():
+            worker.kill()
+        for worker in idle:
+            worker.stop()
+    return results
+
+
+def summarize(results, wall_time):
+    summary = {
+        "programs": len(results),
+        "wall_time": wall_time,
+    }
+    for status in ("ok", "error", "syntax_error", "timeout", "crash"):
+        summary[status] = sum(1 for r in results if r["status"] == status)
+    summary["passed"] = sum(1 for r in results if r["passed"] is True)
+    summary["failed"] = sum(1 for r in results if r["passed"] is False)
+    return summary
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description="Run a batch of Brewin# programs in parallel."
+    )
+    arg_parser.add_argument("path", help="directory of .br programs or a manifest")
+    arg_parser.add_argument(
+        "--jobs", "-j", type=int, default=None, help="worker processes (default: CPUs)"
+    )
+    arg_parser.add_argument(
+        "--timeout", type=float, default=None, help="seconds allowed per program"
+    )
+    arg_parser.add_argument("--report", help="write the JSON report here, not stdout")
+    arg_parser.add_argument("--engine", choices=Interpreter.ENGINES, default="tree")
+    arg_parser.add_argument("--parser", choices=Interpreter.PARSERS, default="ply")
+    arg_parser.add_argument(
+        "--optimize", action="store_true", help="run optimizer.py over the program first"
+    )
+    args = arg_parser.parse_args(argv)
+
+    jobs = find_jobs(args.path)
+    start = time.perf_counter()
+    results = run_batch(
+        jobs, args.jobs, args.timeout, args.engine, args.parser, args.optimize
+    )
+    report = {
+        "summary": summarize(results, time.perf_counter() - start),
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    summary = report["summary"]
+    print(
+        f"{summary['programs']} programs: {summary['ok']} ok, "
+        f"{summary['error']} errors, {summary['syntax_error']} syntax errors, "
+        f"{summary['timeout']} timeouts, "
+        f"{summary['crash']} crashes; {summary['passed']} passed, "
+        f"{summary['failed']} failed",
+        file=sys.stderr,
+    )
+    if summary["timeout"] or summary["crash"] or summary["failed"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
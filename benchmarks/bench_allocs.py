@@ -0,0 +1,56 @@
+# Counts how many Values each engine allocates per executed statement on the
+# programs from bench_engines.py. Statements are counted from the trace output,
+# which every engine prints once per statement it runs.
+#
+#   python benchmarks/bench_allocs.py
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import type_valuev2
+from bench_engines import PROGRAMS
+from interpreterv4 import Interpreter
+
+
+def count_statements(program, engine):
+    trace = io.StringIO()
+    with contextlib.redirect_stdout(trace):
+        Interpreter(console_output=False, trace_output=True, engine=engine).run(program)
+    return trace.getvalue().count("\n")
+
+
+def count_values(program, engine):
+    original_init = type_valuev2.Value.__init__
+    allocations = 0
+
+    def counting_init(self, *args, **kwargs):
+        nonlocal allocations
+        allocations += 1
+        original_init(self, *args, **kwargs)
+
+    type_valuev2.Value.__init__ = counting_init
+    try:
+        Interpreter(console_output=False, engine=engine).run(program)
+    finally:
+        type_valuev2.Value.__init__ = original_init
+    return allocations
+
+
+def main():
+    header = f"{'program':<16}{'statements':>12}"
+    for engine in Interpreter.ENGINES:
+        header += f"{engine + ' values/stmt':>20}"
+    print(header)
+    for name, program in PROGRAMS.items():
+        statements = count_statements(program, "tree")
+        row = f"{name:<16}{statements:>12}"
+        for engine in Interpreter.ENGINES:
+            row += f"{count_values(program, engine) / statements:>20.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
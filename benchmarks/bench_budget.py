@@ -0,0 +1,48 @@
+# Measures what metering a run costs: the programs of bench_engines.py run
+# with no budget and with every limit of a budget.Budget set (too high to be
+# reached), on each engine. Runs alternate and the best CPU time of each is
+# kept.
+#
+#   python benchmarks/bench_budget.py [repetitions]
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_engines import PROGRAMS
+from budget import Budget
+from interpreterv4 import Interpreter
+
+
+def time_run(program, engine, budget):
+    interpreter = Interpreter(console_output=False, engine=engine)
+    gc.collect()
+    start = time.process_time()
+    interpreter.run(program, budget=budget)
+    return time.process_time() - start
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'program':<16}" + "".join(f"{engine:>10}" for engine in Interpreter.ENGINES))
+    for name, program in PROGRAMS.items():
+        row = f"{name:<16}"
+        for engine in Interpreter.ENGINES:
+            plain = metered = None
+            for _ in range(repetitions):
+                budget = Budget(
+                    max_steps=10**12, max_depth=10**6, max_objects=10**9, timeout=3600
+                )
+                elapsed = time_run(program, engine, None)
+                plain = elapsed if plain is None else min(plain, elapsed)
+                elapsed = time_run(program, engine, budget)
+                metered = elapsed if metered is None else min(metered, elapsed)
+            row += f"{(metered / plain - 1) * 100:>+9.1f}%"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
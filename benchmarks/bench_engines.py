@@ -0,0 +1,93 @@
+# Compares the tree-walking engine against the closure-compiled and bytecode
+# engines on a few loop- and call-heavy programs.
+#
+#   python benchmarks/bench_engines.py [repetitions]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from interpreterv4 import Interpreter
+
+PROGRAMS = {
+    "arith_loop": """
+func main() {
+  i = 0;
+  s = 0;
+  while (i < 20000) {
+    s = s + i * 2 - i / 3;
+    if (s > 1000000) { s = s - 1000000; }
+    i = i + 1;
+  }
+  print(s);
+}
+""",
+    "recursive_fib": """
+func fib(n) {
+  if (n < 2) { return n; }
+  return fib(n - 1) + fib(n - 2);
+}
+func main() { print(fib(17)); }
+""",
+    "call_loop": """
+func add(a, b) { return a + b; }
+func main() {
+  i = 0;
+  s = 0;
+  while (i < 5000) { s = add(s, i); i = i + 1; }
+  print(s);
+}
+""",
+    "method_loop": """
+func main() {
+  c = @;
+  c.n = 0;
+  c.inc = lambda(d) { this.n = this.n + d; };
+  i = 0;
+  while (i < 3000) { c.inc(2); i = i + 1; }
+  print(c.n);
+}
+""",
+    "tail_calls": """
+func sum(ref total, n) {
+  if (n == 0) { return total; }
+  total = total + n;
+  return sum(total, n - 1);
+}
+func main() { t = 0; sum(t, 20000); print(t); }
+""",
+}
+
+
+def time_run(program, engine, repetitions):
+    best = None
+    for _ in range(repetitions):
+        interpreter = Interpreter(console_output=False, engine=engine)
+        start = time.perf_counter()
+        interpreter.run(program)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, interpreter.get_output()
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    header = f"{'program':<16}{'tree (s)':>10}"
+    for engine in Interpreter.ENGINES[1:]:
+        header += f"{engine + ' (s)':>14}{'speedup':>9}"
+    print(header)
+    for name, program in PROGRAMS.items():
+        tree_time, tree_output = time_run(program, "tree", repetitions)
+        row = f"{name:<16}{tree_time:>10.3f}"
+        for engine in Interpreter.ENGINES[1:]:
+            engine_time, engine_output = time_run(program, engine, repetitions)
+            if engine_output != tree_output:
+                raise RuntimeError(f"{name}: {engine} engine disagrees on output")
+            row += f"{engine_time:>14.3f}{tree_time / engine_time:>8.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Sums a file of integers with inputi() through each input source and reports
+# the time taken and the peak memory of the run; only the list has to hold
+# the whole input.
+#
+#   python benchmarks/bench_input.py [values]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_sources import MmapSource, StreamSource
+from interpreterv4 import Interpreter
+
+PROGRAM = """
+func main() {
+  n = inputi();
+  s = 0;
+  while (n > 0) { s = s + inputi(); n = n - 1; }
+  print(s);
+}
+"""
+
+
+def run(make_input):
+    inp = make_input()
+    interpreter = Interpreter(console_output=False, inp=inp, engine="vm")
+    interpreter.run(PROGRAM)
+    return interpreter.get_output()
+
+
+# time taken, then the peak memory of a second run under tracemalloc
+def measure(make_input):
+    start = time.perf_counter()
+    output = run(make_input)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run(make_input)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, output
+
+
+def main():
+    values = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(f"{values}\n")
+        for i in range(values):
+            f.write(f"{i % 1000}\n")
+        path = f.name
+    files = []
+
+    def opened(mode):
+        files.append(open(path, mode))
+        return files[-1]
+
+    sources = {
+        "list": lambda: open(path).read().split("\n"),
+        "text file": lambda: StreamSource(opened("r")),
+        "binary file": lambda: StreamSource(opened("rb")),
+        "mmap": lambda: MmapSource(path),
+    }
+    try:
+        print(f"{'source':<14}{'time (s)':>10}{'peak (KB)':>12}")
+        expected = None
+        for name, make_input in sources.items():
+            elapsed, peak, output = measure(make_input)
+            if expected is None:
+                expected = output
+            elif output != expected:
+                raise RuntimeError(f"{name}: read different values")
+            print(f"{name:<14}{elapsed:>10.3f}{peak / 1024:>12.0f}")
+    finally:
+        for f in files:
+            f.close()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
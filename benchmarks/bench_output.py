@@ -0,0 +1,62 @@
+# Runs a print-heavy program with each output sink, writing to a file so the
+# cost of the writes themselves shows, and reports the time taken and the
+# memory each run's output still holds afterwards.
+#
+#   python benchmarks/bench_output.py [lines]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from interpreterv4 import Interpreter
+from output_sinks import DiscardSink, ListSink, RingSink, StreamSink
+
+PROGRAM = """
+func main() {
+  i = 0;
+  while (i < %d) { print("line ", i); i = i + 1; }
+}
+"""
+
+
+def run(program, sink):
+    interpreter = Interpreter(output_sink=sink, engine="vm")
+    interpreter.run(program)
+    return len(interpreter.get_output())
+
+
+# time taken, then the memory still held after a second run under tracemalloc
+def measure(program, make_sink):
+    with tempfile.TemporaryFile("w") as stream:
+        start = time.perf_counter()
+        kept = run(program, make_sink(stream))
+        elapsed = time.perf_counter() - start
+        sink = make_sink(stream)
+        tracemalloc.start()
+        run(program, sink)
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, held, kept
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    program = PROGRAM % lines
+    sinks = {
+        "stream, per line": lambda stream: StreamSink(stream, flush_at=0),
+        "stream, buffered": lambda stream: StreamSink(stream),
+        "list": lambda stream: ListSink(),
+        "ring (100)": lambda stream: RingSink(100),
+        "discard": lambda stream: DiscardSink(),
+    }
+    print(f"{'sink':<20}{'time (s)':>10}{'held (KB)':>12}{'kept':>10}")
+    for name, make_sink in sinks.items():
+        elapsed, held, kept = measure(program, make_sink)
+        print(f"{name:<20}{elapsed:>10.3f}{held / 1024:>12.0f}{kept:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Checks the hand-written front end (handparse.py) against the ply one
+# (brewparse.py), then compares their throughput.
+#
+# The check parses the bench_engines.py programs and a batch of randomly
+# generated ones with both parsers. Each generated program is also run
+# through a few random character edits, so error messages and error recovery
+# get exercised. Both parsers must print the same thing, and must build
+# identical trees, down to the line of every node, or both raise SyntaxError.
+#
+#   python benchmarks/bench_parsers.py [programs] [megabytes]
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import brewparse
+import handparse
+from bench_engines import PROGRAMS
+
+OPERATORS = ["+", "-", "*", "/", "==", "!=", "<", "<=", ">", ">=", "&&", "||"]
+NAMES = ["a", "b", "x", "y1", "this", "f", "g", "_tmp", "print", "inputi", "main"]
+EDITS = ["", " ", "\n", ";", ".", ",", "(", ")", "{", "}", '"', "$", "\r", "=", "!", "/*", "*/", "func", "-"]
+
+
+class Generator:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def name(self):
+        return self.rng.choice(NAMES)
+
+    def variable(self):
+        if self.rng.random() < 0.3:
+            return self.name() + "." + self.name()
+        return self.name()
+
+    def expression(self, depth=0):
+        rng = self.rng
+        choice = rng.randrange(12 if depth < 4 else 6)
+        if choice == 0:
+            return str(rng.randrange(1000))
+        if choice == 1:
+            return rng.choice(['"hi"', '""', '"a b+c"', "true", "false", "nil", "@"])
+        if choice in (2, 3, 4, 5):
+            return self.variable()
+        if choice in (6, 7):
+            left = self.expression(depth + 1)
+            return left + " " + rng.choice(OPERATORS) + " " + self.expression(depth + 1)
+        if choice == 8:
+            return rng.choice(["-", "!", "- ", "!!"]) + self.expression(depth + 1)
+        if choice == 9:
+            return "(" + self.expression(depth + 1) + ")"
+        if choice == 10:
+            return self.call(depth + 1)
+        return "lambda(" + self.formals() + ") { " + self.statements(depth + 1) + " }"
+
+    def call(self, depth):
+        args = ", ".join(self.expression(depth) for _ in range(self.rng.randrange(4)))
+        if self.rng.random() < 0.4:
+            return self.name() + "." + self.name() + "(" + args + ")"
+        return self.name() + "(" + args + ")"
+
+    def formals(self):
+        names = [
+            ("ref " if self.rng.random() < 0.3 else "") + self.name()
+            for _ in range(self.rng.randrange(4))
+        ]
+        return ", ".join(names)
+
+    def statement(self, depth):
+        rng = self.rng
+        choice = rng.randrange(8 if depth < 3 else 4)
+        if choice in (0, 1):
+            return self.variable() + " = " + self.expression(depth) + ";"
+        if choice == 2:
+            return self.call(depth) + ";"
+        if choice == 3:
+            if rng.random() < 0.5:
+                return "return;"
+            return "return " + self.expression(depth) + ";"
+        if choice == 4:
+            return self.expression(depth) + ";"
+        if choice == 5:
+            return "/* note */ while (" + self.expression(depth) + ") {\n" + self.statements(depth + 1) + "\n}"
+        text = "if (" + self.expression(depth) + ") { " + self.statements(depth + 1) + " }"
+        if rng.random() < 0.5:
+            text += " else {\n\t" + self.statements(depth + 1) + " }"
+        return text
+
+    def statements(self, depth):
+        return "\n  ".join(self.statement(depth) for _ in range(1 + self.rng.randrange(4)))
+
+    def program(self, functions=3):
+        return "\n".join(
+            "func " + self.name() + "(" + self.formals() + ") {\n  " + self.statements(0) + "\n}"
+            for _ in range(1 + self.rng.randrange(functions))
+        )
+
+    def edit(self, source):
+        for _ in range(1 + self.rng.randrange(3)):
+            at = self.rng.randrange(len(source) + 1)
+            cut = self.rng.randrange(3)
+            source = source[:at] + self.rng.choice(EDITS) + source[at + cut :]
+        return source
+
+
+def parse(parse_program, source):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            result = parse_program(source)
+        except SyntaxError:
+            result = None
+    return result, output.getvalue()
+
+
+def same_tree(a, b):
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(map(same_tree, a, b))
+    if not hasattr(a, "elem_type"):
+        return type(a) is type(b) and a == b
+    if type(a) is not type(b) or a.elem_type != b.elem_type or a.line != b.line:
+        return False
+    return all(same_tree(value, b.get(key)) for key, value in a.items())
+
+
+def check(source):
+    expected, expected_output = parse(brewparse.parse_program, source)
+    got, got_output = parse(handparse.parse_program, source)
+    if got_output != expected_output:
+        raise RuntimeError(f"output differs: {expected_output!r} vs {got_output!r}\n{source}")
+    if expected is None or got is None:
+        if expected is not got:
+            raise RuntimeError(f"only one parser accepted\n{source}")
+    elif not same_tree(expected, got):
+        raise RuntimeError(f"trees differ\n{source}")
+    return expected is not None
+
+
+# best of three, in MB/s
+def throughput(parse_program, source):
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        parse_program(source)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return len(source) / best / 1e6
+
+
+def main():
+    programs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    megabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    generator = Generator(random.Random(131))
+
+    valid = invalid = 0
+    sources = list(PROGRAMS.values())
+    for _ in range(programs):
+        source = generator.program()
+        sources.append(source)
+        sources.extend(generator.edit(source) for _ in range(3))
+    for source in sources:
+        if check(source):
+            valid += 1
+        else:
+            invalid += 1
+    print(f"{len(sources)} programs parse the same ({valid} valid, {invalid} with errors)")
+
+    chunks = []
+    size = 0
+    while size < megabytes * 1e6:
+        chunks.append(generator.program(20))
+        size += len(chunks[-1]) + 1
+    source = "\n".join(chunks)
+    print(f"{'parser':<8}{'MB/s':>8}   ({size / 1e6:.1f} MB of source)")
+    for name, module in (("ply", brewparse), ("hand", handparse)):
+        print(f"{name:<8}{throughput(module.parse_program, source):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
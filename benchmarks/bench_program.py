@@ -0,0 +1,69 @@
+# Runs one program against many input vectors, parsing it for every input
+# with Interpreter.run and then compiling it once with program.compile, and
+# checks the outputs agree.
+#
+#   python benchmarks/bench_program.py [inputs] [threads]
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from interpreterv4 import Interpreter
+from program import compile
+
+PROGRAM = """
+func collatz(n) {
+  steps = 0;
+  while (n != 1) {
+    if (n / 2 * 2 == n) { n = n / 2; } else { n = 3 * n + 1; }
+    steps = steps + 1;
+  }
+  return steps;
+}
+func main() {
+  a = inputi();
+  b = inputi();
+  o = @;
+  o.total = 0;
+  o.add = lambda(x) { this.total = this.total + x; };
+  o.add(collatz(a));
+  o.add(collatz(b));
+  print(a, " ", b, " ", o.total);
+}
+"""
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    inputs = [[str(i + 1), str(2 * i + 1)] for i in range(count)]
+    print(f"{'engine':<8}{'run (s)':>10}{'compiled (s)':>14}{'threads (s)':>13}")
+    for engine in Interpreter.ENGINES:
+        start = time.perf_counter()
+        expected = []
+        for inp in inputs:
+            interpreter = Interpreter(console_output=False, inp=inp, engine=engine)
+            interpreter.run(PROGRAM)
+            expected.append(interpreter.get_output())
+        each_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        program = compile(PROGRAM, engine=engine)
+        outputs = [program.run(inp) for inp in inputs]
+        compiled_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        program = compile(PROGRAM, engine=engine)
+        with ThreadPoolExecutor(threads) as pool:
+            pooled = list(pool.map(program.run, inputs))
+        pooled_time = time.perf_counter() - start
+
+        if outputs != expected or pooled != expected:
+            raise RuntimeError(f"{engine}: compiled runs disagree on output")
+        print(f"{engine:<8}{each_time:>10.3f}{compiled_time:>14.3f}{pooled_time:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
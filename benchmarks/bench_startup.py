@@ -0,0 +1,53 @@
+# Measures cold start: the time from `import interpreterv4` to the end of the
+# first run(), each sample in a fresh Python process started in an empty
+# temporary directory. Also checks that nothing was written to that directory.
+#
+#   python benchmarks/bench_startup.py [samples]
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import interpreterv4
+imported = time.perf_counter()
+interpreterv4.Interpreter(console_output=False).run("func main() { print(1 + 2); }")
+done = time.perf_counter()
+print(imported - start, done - imported)
+"""
+
+
+def sample(cwd):
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, os.path.abspath(ROOT)],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_time, run_time = (float(t) for t in result.stdout.split())
+    return import_time, run_time
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as cwd:
+        # the first process may still have to write __pycache__ files
+        sample(cwd)
+        times = sorted((sample(cwd) for _ in range(samples)), key=sum)
+        written = os.listdir(cwd)
+    import_time, run_time = times[len(times) // 2]
+    print(f"import      {import_time * 1000:7.1f} ms")
+    print(f"first run   {run_time * 1000:7.1f} ms")
+    print(f"cold start  {(import_time + run_time) * 1000:7.1f} ms  (median of {samples})")
+    if written:
+        raise RuntimeError(f"files written to the working directory: {written}")
+
+
+if __name__ == "__main__":
+    main()
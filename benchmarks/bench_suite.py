@@ -0,0 +1,186 @@
+# Times the Brewin# workloads in benchmarks/workloads on interpreterv4's
+# engines, and on interpreterv1 for the workloads in its subset of the
+# language, and compares the timings with a saved baseline.
+#
+#   python benchmarks/bench_suite.py [--repetitions N] [--warmup N]
+#                                    [--workload NAME ...] [--target NAME ...]
+#                                    [--baseline FILE] [--threshold FRACTION]
+#                                    [--save FILE]
+#
+# Each workload is a .br program with its expected output in a .out file
+# next to it. A workload runs --warmup times untimed and then --repetitions
+# times timed, each run in a fresh interpreter. The parse is included, as in
+# Interpreter.run. A run that prints anything other than the expected output
+# stops the suite. The table gives the min, median, mean and standard
+# deviation of the timed runs, in seconds of CPU time, which other processes
+# on the machine affect less than wall time.
+#
+# With --baseline, each median is compared with the baseline's median for
+# the same workload and target. A change beyond --threshold is reported as a
+# regression or an improvement, but only if every timed run was on the same
+# side of the baseline's median, so one noisy run can't flag a change. Any
+# regression makes the exit status 1.
+#
+# --save writes this run's results in the format --baseline reads;
+# benchmarks/baseline.json holds the results the suite was last checked
+# against. Timings depend on the machine, so compare runs made on the same
+# one.
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import interpreterv1
+from interpreterv4 import Interpreter
+
+WORKLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workloads")
+PROGRAM_SUFFIX = ".br"
+EXPECTED_SUFFIX = ".out"
+# the workloads interpreterv1 can run: straight-line main, + and -, print
+V1_WORKLOADS = ("straight_line",)
+TARGETS = tuple(f"v4-{engine}" for engine in Interpreter.ENGINES) + ("v1",)
+DEFAULT_THRESHOLD = 0.10
+
+
+def find_workloads(names=None):
+    workloads = {}
+    for file_name in sorted(os.listdir(WORKLOADS)):
+        if not file_name.endswith(PROGRAM_SUFFIX):
+            continue
+        name = file_name[: -len(PROGRAM_SUFFIX)]
+        if names and name not in names:
+            continue
+        path = os.path.join(WORKLOADS, name)
+        with open(path + PROGRAM_SUFFIX) as f:
+            source = f.read()
+        with open(path + EXPECTED_SUFFIX) as f:
+            expected = f.read().splitlines()
+        workloads[name] = (source, expected)
+    return workloads
+
+
+def make_interpreter(target):
+    if target == "v1":
+        return interpreterv1.Interpreter(console_output=False)
+    return Interpreter(console_output=False, engine=target[len("v4-") :])
+
+
+# the CPU seconds each timed run of source took
+def time_workload(name, source, expected, target, warmup, repetitions):
+    times = []
+    for run in range(warmup + repetitions):
+        interpreter = make_interpreter(target)
+        gc.collect()
+        start = time.process_time()
+        interpreter.run(source)
+        elapsed = time.process_time() - start
+        if interpreter.get_output() != expected:
+            raise RuntimeError(f"{name} printed the wrong output on {target}")
+        if run >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def summarize(times):
+    return {
+        "runs": len(times),
+        "min": min(times),
+        "max": max(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+# "regression", "improvement" or None for a result against its baseline
+def compare(result, baseline, threshold):
+    if baseline is None:
+        return None
+    change = result["median"] / baseline["median"] - 1
+    if change > threshold and result["min"] > baseline["median"]:
+        return "regression"
+    if change < -threshold and result["max"] < baseline["median"]:
+        return "improvement"
+    return None
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Time the Brewin# workloads.")
+    arg_parser.add_argument("--repetitions", "-n", type=int, default=5)
+    arg_parser.add_argument("--warmup", type=int, default=1)
+    arg_parser.add_argument("--workload", action="append", help="run only these")
+    arg_parser.add_argument("--target", action="append", choices=TARGETS, help="run only these")
+    arg_parser.add_argument("--baseline", help="results JSON to compare with")
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="change in the median flagged, as a fraction",
+    )
+    arg_parser.add_argument("--save", help="write the results JSON here")
+    args = arg_parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    targets = args.target or TARGETS
+    results = {}
+    regressions = 0
+    print(
+        f"{'workload':<16}{'target':<12}{'min':>9}{'median':>9}{'mean':>9}{'stdev':>9}"
+        + (f"{'baseline':>10}{'change':>9}" if args.baseline else "")
+    )
+    for name, (source, expected) in find_workloads(args.workload).items():
+        for target in targets:
+            if target == "v1" and name not in V1_WORKLOADS:
+                continue
+            times = time_workload(
+                name, source, expected, target, args.warmup, args.repetitions
+            )
+            key = f"{name}/{target}"
+            result = results[key] = summarize(times)
+            row = (
+                f"{name:<16}{target:<12}{result['min']:>9.4f}{result['median']:>9.4f}"
+                f"{result['mean']:>9.4f}{result['stdev']:>9.4f}"
+            )
+            old = baseline.get(key)
+            if old is not None:
+                change = (result["median"] / old["median"] - 1) * 100
+                row += f"{old['median']:>10.4f}{change:>+8.1f}%"
+                verdict = compare(result, old, args.threshold)
+                if verdict is not None:
+                    row += f"  {verdict}"
+                if verdict == "regression":
+                    regressions += 1
+            print(row, flush=True)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "repetitions": args.repetitions,
+                    "warmup": args.warmup,
+                    "results": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+    if regressions:
+        print(f"{regressions} regressions beyond {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,6 @@
+import hashlib
+import importlib
+
 from ply import lex
 
 reserved = (
@@ -126,5 +129,35 @@ def t_error(t):
     t.lexer.skip(1)
 
 
-# Build the lexer
-lex.lex()
+# The lexer is built on first use, from the precomputed table in brewlextab.py
+# (`python brewparse.py` regenerates it after the rules above change). The
+# table stores the signature of the rules it was built from; when it doesn't
+# match the rules above, the lexer is built from the rules instead.
+LEX_TABLE = "brewlextab"
+lexer = None
+
+
+# a hash of the token names, literals, ignored characters and every t_ rule's
+# regex in the order they are defined
+def rules_signature():
+    digest = hashlib.sha256(repr((tokens, literals, t_ignore)).encode())
+    for name, rule in globals().items():
+        if name.startswith("t_") and name != "t_ignore":
+            regex = rule.__doc__ if callable(rule) else rule
+            digest.update(f"{name} {regex}\n".encode())
+    return digest.hexdigest()
+
+
+def get_lexer():
+    global lexer
+    if lexer is None:
+        try:
+            table = importlib.import_module(LEX_TABLE)
+        except ImportError:
+            table = None
+        if getattr(table, "_lexsignature", None) == rules_signature():
+            lexer = lex.lex(optimize=True, lextab=table)
+        else:
+            # the table is stale or missing, build from the rules instead
+            lexer = lex.lex()
+    return lexer
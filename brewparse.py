@@ -1,7 +1,28 @@
-from element import Element
+import os
+import threading
+
+from element import (
+    Arg,
+    Assign,
+    BinOp,
+    Call,
+    FieldAssign,
+    FieldVar,
+    FuncDef,
+    If,
+    LambdaDef,
+    Leaf,
+    Literal,
+    MethodCall,
+    Program,
+    Return,
+    UnaryOp,
+    Var,
+    While,
+)
 from brewlex import *
 from intbase import InterpreterBase
-from ply import yacc
+from ply import lex, yacc
 
 # Parsing rules
 
@@ -25,7 +46,7 @@ def collapse_items(p, group_index, singleton_index):
 
 def p_program(p):
     "program : funcs"
-    p[0] = Element(InterpreterBase.PROGRAM_DEF, functions=p[1])
+    p[0] = Program(InterpreterBase.PROGRAM_DEF, functions=p[1], line=p[1][0].line)
 
 
 def p_funcs(p):
@@ -38,18 +59,34 @@ def p_func(p):
     """func : FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE
     | FUNC NAME LPAREN RPAREN LBRACE statements RBRACE"""
     if len(p) == 9:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.FUNC_DEF, name=p[2], args=p[4], statements=p[7])
+        p[0] = FuncDef(
+            InterpreterBase.FUNC_DEF,
+            name=p[2],
+            args=p[4],
+            statements=p[7],
+            line=p.lineno(1),
+        )
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.FUNC_DEF, name=p[2], args=[], statements=p[6])
+        p[0] = FuncDef(
+            InterpreterBase.FUNC_DEF,
+            name=p[2],
+            args=[],
+            statements=p[6],
+            line=p.lineno(1),
+        )
 
 
 def p_lambda(p):
     """lambda : LAMBDA LPAREN formal_args RPAREN LBRACE statements RBRACE
     | LAMBDA LPAREN RPAREN LBRACE statements RBRACE"""
     if len(p) == 8:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.LAMBDA_DEF, args=p[3], statements=p[6])
+        p[0] = LambdaDef(
+            InterpreterBase.LAMBDA_DEF, args=p[3], statements=p[6], line=p.lineno(1)
+        )
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.LAMBDA_DEF, args=[], statements=p[5])
+        p[0] = LambdaDef(
+            InterpreterBase.LAMBDA_DEF, args=[], statements=p[5], line=p.lineno(1)
+        )
 
 
 def p_formal_args(p):
@@ -60,12 +97,12 @@ def p_formal_args(p):
 
 def p_formal_arg(p):
     "formal_arg : NAME"
-    p[0] = Element(InterpreterBase.ARG_DEF, name=p[1])
+    p[0] = Arg(InterpreterBase.ARG_DEF, name=p[1], line=p.lineno(1))
 
 
 def p_formal_ref_arg(p):
     "formal_arg : REF NAME"
-    p[0] = Element(InterpreterBase.REFARG_DEF, name=p[2])
+    p[0] = Arg(InterpreterBase.REFARG_DEF, name=p[2], line=p.lineno(1))
 
 
 def p_statements(p):
@@ -75,17 +112,19 @@ def p_statements(p):
 
 
 def p_statement___assign(p):
-    "statement : variable ASSIGN expression SEMI"
-    p[0] = Element("=", name=p[1], expression=p[3])
+    "statement : NAME ASSIGN expression SEMI"
+    p[0] = Assign("=", name=p[1], expression=p[3], line=p.lineno(1))
 
 
-def p_variable(p):
-    """variable : NAME DOT NAME
-    | NAME"""
-    if len(p) == 4:
-        p[0] = p[1] + "." + p[3]
-    else:
-        p[0] = p[1]
+def p_statement_field_assign(p):
+    "statement : NAME DOT NAME ASSIGN expression SEMI"
+    p[0] = FieldAssign(
+        InterpreterBase.FIELD_ASSIGN_DEF,
+        objref=p[1],
+        field=p[3],
+        expression=p[5],
+        line=p.lineno(1),
+    )
 
 
 def p_statement_if(p):
@@ -93,24 +132,28 @@ def p_statement_if(p):
     | IF LPAREN expression RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE
     """
     if len(p) == 8:
-        p[0] = Element(
+        p[0] = If(
             InterpreterBase.IF_DEF,
             condition=p[3],
             statements=p[6],
             else_statements=None,
+            line=p.lineno(1),
         )
     else:
-        p[0] = Element(
+        p[0] = If(
             InterpreterBase.IF_DEF,
             condition=p[3],
             statements=p[6],
             else_statements=p[10],
+            line=p.lineno(1),
         )
 
 
 def p_statement_while(p):
     "statement : WHILE LPAREN expression RPAREN LBRACE statements RBRACE"
-    p[0] = Element(InterpreterBase.WHILE_DEF, condition=p[3], statements=p[6])
+    p[0] = While(
+        InterpreterBase.WHILE_DEF, condition=p[3], statements=p[6], line=p.lineno(1)
+    )
 
 
 def p_statement_expr(p):
@@ -125,17 +168,17 @@ def p_statement_return(p):
         expr = p[2]
     else:
         expr = None
-    p[0] = Element(InterpreterBase.RETURN_DEF, expression=expr)
+    p[0] = Return(InterpreterBase.RETURN_DEF, expression=expr, line=p.lineno(1))
 
 
 def p_expression_not(p):
     "expression : NOT expression"
-    p[0] = Element(InterpreterBase.NOT_DEF, op1=p[2])
+    p[0] = UnaryOp(InterpreterBase.NOT_DEF, op1=p[2], line=p.lineno(1))
 
 
 def p_expression_uminus(p):
     "expression : MINUS expression %prec UMINUS"
-    p[0] = Element(InterpreterBase.NEG_DEF, op1=p[2])
+    p[0] = UnaryOp(InterpreterBase.NEG_DEF, op1=p[2], line=p.lineno(1))
 
 
 def p_arith_expression_binop(p):
@@ -149,7 +192,7 @@ def p_arith_expression_binop(p):
     | expression MINUS expression
     | expression MULTIPLY expression
     | expression DIVIDE expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = BinOp(p[2], op1=p[1], op2=p[3], line=p[1].line)
 
 
 def p_expression_group(p):
@@ -160,12 +203,12 @@ def p_expression_group(p):
 def p_expression_and_or(p):
     """expression : expression OR expression
     | expression AND expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = BinOp(p[2], op1=p[1], op2=p[3], line=p[1].line)
 
 
 def p_expression_number(p):
     "expression : NUMBER"
-    p[0] = Element(InterpreterBase.INT_DEF, val=p[1])
+    p[0] = Literal(InterpreterBase.INT_DEF, val=p[1], line=p.lineno(1))
 
 
 def p_expression_lambda(p):
@@ -177,47 +220,64 @@ def p_expression_bool(p):
     """expression : TRUE
     | FALSE"""
     bool_val = p[1] == InterpreterBase.TRUE_DEF
-    p[0] = Element(InterpreterBase.BOOL_DEF, val=bool_val)
+    p[0] = Literal(InterpreterBase.BOOL_DEF, val=bool_val, line=p.lineno(1))
 
 
 def p_expression_nil(p):
     "expression : NIL"
-    p[0] = Element(InterpreterBase.NIL_DEF)
+    p[0] = Leaf(InterpreterBase.NIL_DEF, line=p.lineno(1))
 
 
 def p_expression_obj(
     p,
 ):  # e.g. a = @;   ### creates a new dictionary/object and stores in a
     "expression : AT"
-    p[0] = Element(InterpreterBase.OBJ_DEF)
+    p[0] = Leaf(InterpreterBase.OBJ_DEF, line=p.lineno(1))
 
 
 def p_expression_string(p):
     "expression : STRING"
-    p[0] = Element(InterpreterBase.STRING_DEF, val=p[1])
+    p[0] = Literal(InterpreterBase.STRING_DEF, val=p[1], line=p.lineno(1))
 
 
 def p_expression_variable(p):
-    "expression : variable"
-    p[0] = Element(InterpreterBase.VAR_DEF, name=p[1])
+    "expression : NAME"
+    p[0] = Var(InterpreterBase.VAR_DEF, name=p[1], line=p.lineno(1))
+
+
+def p_expression_field(p):
+    "expression : NAME DOT NAME"
+    p[0] = FieldVar(
+        InterpreterBase.FIELD_DEF, objref=p[1], field=p[3], line=p.lineno(1)
+    )
 
 
 def p_func_call(p):
     """expression : NAME LPAREN args RPAREN
     | NAME LPAREN RPAREN"""
     if len(p) == 5:
-        p[0] = Element(InterpreterBase.FCALL_DEF, name=p[1], args=p[3])
+        p[0] = Call(
+            InterpreterBase.FCALL_DEF, name=p[1], args=p[3], line=p.lineno(1)
+        )
     else:
-        p[0] = Element(InterpreterBase.FCALL_DEF, name=p[1], args=[])
+        p[0] = Call(InterpreterBase.FCALL_DEF, name=p[1], args=[], line=p.lineno(1))
 
 
 def p_method_call(p):
     """expression : NAME DOT NAME LPAREN args RPAREN
     | NAME DOT NAME LPAREN RPAREN"""
     if len(p) == 7:
-        p[0] = Element(InterpreterBase.MCALL_DEF, objref=p[1], name=p[3], args=p[5])
+        p[0] = MethodCall(
+            InterpreterBase.MCALL_DEF,
+            objref=p[1],
+            name=p[3],
+            args=p[5],
+            line=p.lineno(1),
+        )
     else:
-        p[0] = Element(InterpreterBase.MCALL_DEF, objref=p[1], name=p[3], args=[])
+        p[0] = MethodCall(
+            InterpreterBase.MCALL_DEF, objref=p[1], name=p[3], args=[], line=p.lineno(1)
+        )
 
 
 def p_expression_args(p):
@@ -233,13 +293,43 @@ def p_error(p):
         print("Syntax error at EOF")
 
 
+# The parser is built on first use, from the precomputed tables in
+# brewparsetab.py. yacc checks their signature against the grammar above and,
+# if they are stale, rebuilds them in memory; nothing is ever written out.
+PARSE_TABLE = "brewparsetab"
+parser = None
+
+
+def get_parser():
+    global parser
+    if parser is None:
+        parser = yacc.yacc(tabmodule=PARSE_TABLE, debug=False, write_tables=False)
+    return parser
+
+
+# PLY keeps the state of a parse in the parser and the lexer, so only one
+# thread can be parsing at a time
+parse_lock = threading.Lock()
+
+
 # exported function
 def parse_program(program):
-    ast = yacc.parse(program)
+    with parse_lock:
+        lexer = get_lexer()
+        lexer.lineno = 1  # left at the end of the previous program otherwise
+        ast = get_parser().parse(program, lexer=lexer)
     if ast is None:
         raise SyntaxError("Syntax error")
     return ast
 
 
-# generate our parser
-yacc.yacc()
+# python brewparse.py regenerates brewlextab.py and brewparsetab.py next to
+# this file
+if __name__ == "__main__":
+    import brewlex
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    lex.lex(module=brewlex).writetab(LEX_TABLE, here)
+    with open(os.path.join(here, LEX_TABLE + ".py"), "a") as f:
+        f.write(f"_lexsignature = {brewlex.rules_signature()!r}\n")
+    yacc.yacc(tabmodule=PARSE_TABLE, outputdir=here, debug=False)
@@ -0,0 +1,81 @@
+
+# brewparsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'leftORleftANDleftGREATER_EQGREATERLESS_EQLESSEQNOT_EQleftPLUSMINUSleftMULTIPLYDIVIDErightUMINUSNOTAND ASSIGN AT COMMA DIVIDE DOT ELSE EQ FALSE FUNC GREATER GREATER_EQ IF LAMBDA LBRACE LESS LESS_EQ LPAREN MINUS MULTIPLY NAME NIL NOT NOT_EQ NUMBER OR PLUS RBRACE REF RETURN RPAREN SEMI STRING TRUE WHILEprogram : funcsfuncs : funcs func\n    | funcfunc : FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE\n    | FUNC NAME LPAREN RPAREN LBRACE statements RBRACElambda : LAMBDA LPAREN formal_args RPAREN LBRACE statements RBRACE\n    | LAMBDA LPAREN RPAREN LBRACE statements RBRACEformal_args : formal_args COMMA formal_arg\n    | formal_argformal_arg : NAMEformal_arg : REF NAMEstatements : statements statement\n    | statementstatement : NAME ASSIGN expression SEMIstatement : NAME DOT NAME ASSIGN expression SEMIstatement : IF LPAREN expression RPAREN LBRACE statements RBRACE\n    | IF LPAREN expression RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE\n    statement : WHILE LPAREN expression RPAREN LBRACE statements RBRACEstatement : expression SEMIstatement : RETURN expression SEMI\n    | RETURN SEMIexpression : NOT expressionexpression : MINUS expression %prec UMINUSexpression : expression EQ expression\n    | expression GREATER expression\n    | expression LESS expression\n    | expression NOT_EQ expression\n    | expression GREATER_EQ expression\n    | expression LESS_EQ expression\n    | expression PLUS expression\n    | expression MINUS expression\n    | expression MULTIPLY expression\n    | expression DIVIDE expressionexpression : LPAREN expression RPARENexpression : expression OR expression\n    | expression AND expressionexpression : NUMBERexpression : lambdaexpression : TRUE\n    | FALSEexpression : NILexpression : ATexpression : STRINGexpression : NAMEexpression : NAME DOT NAMEexpression : NAME LPAREN args RPAREN\n    | NAME LPAREN RPARENexpression : NAME DOT NAME LPAREN args RPAREN\n    | NAME DOT NAME LPAREN RPARENargs : args COMMA expression\n    | expression'
+    
+_lr_action_items = {'FUNC':([0,2,3,5,43,65,],[4,4,-3,-2,-5,-4,]),'$end':([1,2,3,5,43,65,],[0,-1,-3,-2,-5,-4,]),'NAME':([4,7,12,14,15,17,20,21,22,26,27,28,37,38,39,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,64,72,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[6,8,16,8,19,19,42,19,-13,42,42,42,19,42,67,42,-12,-19,42,42,42,42,42,42,42,42,42,42,42,42,42,42,-21,8,95,-20,-14,42,42,42,19,19,19,19,19,-15,19,19,19,-16,-18,19,19,-17,]),'LPAREN':([6,15,17,19,20,21,22,24,25,26,27,28,36,37,38,40,42,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,67,87,90,91,92,94,95,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[7,20,20,40,20,20,-13,58,59,20,20,20,64,20,20,20,40,-12,-19,20,20,20,20,20,20,20,20,20,20,20,20,20,20,-21,92,-20,-14,20,20,20,92,20,20,20,20,20,-15,20,20,20,-16,-18,20,20,-17,]),'RPAREN':([7,8,9,11,16,18,29,30,31,32,33,34,35,40,41,42,62,63,64,68,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,88,92,93,95,101,102,103,109,113,116,],[10,-10,13,-9,-11,-8,-37,-38,-39,-40,-41,-42,-43,69,71,-44,-22,-23,89,93,-47,-51,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,-35,-36,96,97,98,102,-46,-45,109,-49,-50,-48,-7,-6,]),'REF':([7,14,64,],[12,12,12,]),'COMMA':([8,9,11,16,18,29,30,31,32,33,34,35,42,62,63,68,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,88,93,95,101,102,103,109,113,116,],[-10,14,-9,-11,-8,-37,-38,-39,-40,-41,-42,-43,-44,-22,-23,94,-47,-51,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,-35,-36,14,-46,-45,94,-49,-50,-48,-7,-6,]),'LBRACE':([10,13,89,96,97,98,117,],[15,17,99,104,105,106,118,]),'IF':([15,17,21,22,37,44,45,61,87,90,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[24,24,24,-13,24,-12,-19,-21,-20,-14,24,24,24,24,24,-15,24,24,24,-16,-18,24,24,-17,]),'WHILE':([15,17,21,22,37,44,45,61,87,90,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[25,25,25,-13,25,-12,-19,-21,-20,-14,25,25,25,25,25,-15,25,25,25,-16,-18,25,25,-17,]),'RETURN':([15,17,21,22,37,44,45,61,87,90,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[26,26,26,-13,26,-12,-19,-21,-20,-14,26,26,26,26,26,-15,26,26,26,-16,-18,26,26,-17,]),'NOT':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[27,27,27,27,-13,27,27,27,27,27,27,-12,-19,27,27,27,27,27,27,27,27,27,27,27,27,27,27,-21,-20,-14,27,27,27,27,27,27,27,27,-15,27,27,27,-16,-18,27,27,-17,]),'MINUS':([15,17,19,20,21,22,23,26,27,28,29,30,31,32,33,34,35,37,38,40,41,42,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,87,90,91,92,93,94,95,99,100,102,103,104,105,106,107,108,109,110,111,112,113,114,115,116,118,119,120,],[28,28,-44,28,28,-13,53,28,28,28,-37,-38,-39,-40,-41,-42,-43,28,28,28,53,-44,-12,-19,28,28,28,28,28,28,28,28,28,28,28,28,28,28,53,-21,-22,-23,53,-45,-47,53,-34,53,53,53,53,53,53,-30,-31,-32,-33,53,53,53,53,-20,-14,28,28,-46,28,-45,28,53,-49,53,28,28,28,28,-15,-48,28,28,28,-7,-16,-18,-6,28,28,-17,]),'NUMBER':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[29,29,29,29,-13,29,29,29,29,29,29,-12,-19,29,29,29,29,29,29,29,29,29,29,29,29,29,29,-21,-20,-14,29,29,29,29,29,29,29,29,-15,29,29,29,-16,-18,29,29,-17,]),'TRUE':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[31,31,31,31,-13,31,31,31,31,31,31,-12,-19,31,31,31,31,31,31,31,31,31,31,31,31,31,31,-21,-20,-14,31,31,31,31,31,31,31,31,-15,31,31,31,-16,-18,31,31,-17,]),'FALSE':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[32,32,32,32,-13,32,32,32,32,32,32,-12,-19,32,32,32,32,32,32,32,32,32,32,32,32,32,32,-21,-20,-14,32,32,32,32,32,32,32,32,-15,32,32,32,-16,-18,32,32,-17,]),'NIL':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[33,33,33,33,-13,33,33,33,33,33,33,-12,-19,33,33,33,33,33,33,33,33,33,33,33,33,33,33,-21,-20,-14,33,33,33,33,33,33,33,33,-15,33,33,33,-16,-18,33,33,-17,]),'AT':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[34,34,34,34,-13,34,34,34,34,34,34,-12,-19,34,34,34,34,34,34,34,34,34,34,34,34,34,34,-21,-20,-14,34,34,34,34,34,34,34,34,-15,34,34,34,-16,-18,34,34,-17,]),'STRING':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[35,35,35,35,-13,35,35,35,35,35,35,-12,-19,35,35,35,35,35,35,35,35,35,35,35,35,35,35,-21,-20,-14,35,35,35,35,35,35,35,35,-15,35,35,35,-16,-18,35,35,-17,]),'LAMBDA':([15,17,20,21,22,26,27,28,37,38,40,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,61,87,90,91,92,94,99,104,105,106,107,108,110,111,112,114,115,118,119,120,],[36,36,36,36,-13,36,36,36,36,36,36,-12,-19,36,36,36,36,36,36,36,36,36,36,36,36,36,36,-21,-20,-14,36,36,36,36,36,36,36,36,-15,36,36,36,-16,-18,36,36,-17,]),'ASSIGN':([19,67,],[38,91,]),'DOT':([19,42,],[39,72,]),'SEMI':([19,23,26,29,30,31,32,33,34,35,42,60,62,63,66,67,69,71,73,74,75,76,77,78,79,80,81,82,83,84,93,95,100,102,109,113,116,],[-44,45,61,-37,-38,-39,-40,-41,-42,-43,-44,87,-22,-23,90,-45,-47,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,-35,-36,-46,-45,108,-49,-48,-7,-6,]),'EQ':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,46,-37,-38,-39,-40,-41,-42,-43,46,-44,46,-22,-23,46,-45,-47,46,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,46,46,46,46,-46,-45,46,-49,46,-48,-7,-6,]),'GREATER':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,47,-37,-38,-39,-40,-41,-42,-43,47,-44,47,-22,-23,47,-45,-47,47,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,47,47,47,47,-46,-45,47,-49,47,-48,-7,-6,]),'LESS':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,48,-37,-38,-39,-40,-41,-42,-43,48,-44,48,-22,-23,48,-45,-47,48,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,48,48,48,48,-46,-45,48,-49,48,-48,-7,-6,]),'NOT_EQ':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,49,-37,-38,-39,-40,-41,-42,-43,49,-44,49,-22,-23,49,-45,-47,49,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,49,49,49,49,-46,-45,49,-49,49,-48,-7,-6,]),'GREATER_EQ':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,50,-37,-38,-39,-40,-41,-42,-43,50,-44,50,-22,-23,50,-45,-47,50,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,50,50,50,50,-46,-45,50,-49,50,-48,-7,-6,]),'LESS_EQ':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,51,-37,-38,-39,-40,-41,-42,-43,51,-44,51,-22,-23,51,-45,-47,51,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,51,51,51,51,-46,-45,51,-49,51,-48,-7,-6,]),'PLUS':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,52,-37,-38,-39,-40,-41,-42,-43,52,-44,52,-22,-23,52,-45,-47,52,-34,52,52,52,52,52,52,-30,-31,-32,-33,52,52,52,52,-46,-45,52,-49,52,-48,-7,-6,]),'MULTIPLY':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,54,-37,-38,-39,-40,-41,-42,-43,54,-44,54,-22,-23,54,-45,-47,54,-34,54,54,54,54,54,54,54,54,-32,-33,54,54,54,54,-46,-45,54,-49,54,-48,-7,-6,]),'DIVIDE':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,55,-37,-38,-39,-40,-41,-42,-43,55,-44,55,-22,-23,55,-45,-47,55,-34,55,55,55,55,55,55,55,55,-32,-33,55,55,55,55,-46,-45,55,-49,55,-48,-7,-6,]),'OR':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,56,-37,-38,-39,-40,-41,-42,-43,56,-44,56,-22,-23,56,-45,-47,56,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,-35,-36,56,56,-46,-45,56,-49,56,-48,-7,-6,]),'AND':([19,23,29,30,31,32,33,34,35,41,42,60,62,63,66,67,69,70,71,73,74,75,76,77,78,79,80,81,82,83,84,85,86,93,95,100,102,103,109,113,116,],[-44,57,-37,-38,-39,-40,-41,-42,-43,57,-44,57,-22,-23,57,-45,-47,57,-34,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,57,-36,57,57,-46,-45,57,-49,57,-48,-7,-6,]),'RBRACE':([21,22,37,44,45,61,87,90,107,108,110,111,112,114,115,119,120,],[43,-13,65,-12,-19,-21,-20,-14,113,-15,114,115,116,-16,-18,120,-17,]),'ELSE':([114,],[117,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'funcs':([0,],[2,]),'func':([0,2,],[3,5,]),'formal_args':([7,64,],[9,88,]),'formal_arg':([7,14,64,],[11,18,11,]),'statements':([15,17,99,104,105,106,118,],[21,37,107,110,111,112,119,]),'statement':([15,17,21,37,99,104,105,106,107,110,111,112,118,119,],[22,22,44,44,22,22,22,22,44,44,44,44,22,44,]),'expression':([15,17,20,21,26,27,28,37,38,40,46,47,48,49,50,51,52,53,54,55,56,57,58,59,91,92,94,99,104,105,106,107,110,111,112,118,119,],[23,23,41,23,60,62,63,23,66,70,73,74,75,76,77,78,79,80,81,82,83,84,85,86,100,70,103,23,23,23,23,23,23,23,23,23,23,]),'lambda':([15,17,20,21,26,27,28,37,38,40,46,47,48,49,50,51,52,53,54,55,56,57,58,59,91,92,94,99,104,105,106,107,110,111,112,118,119,],[30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,]),'args':([40,92,],[68,101,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> funcs','program',1,'p_program','brewparse.py',47),
+  ('funcs -> funcs func','funcs',2,'p_funcs','brewparse.py',52),
+  ('funcs -> func','funcs',1,'p_funcs','brewparse.py',53),
+  ('func -> FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE','func',8,'p_func','brewparse.py',58),
+  ('func -> FUNC NAME LPAREN RPAREN LBRACE statements RBRACE','func',7,'p_func','brewparse.py',59),
+  ('lambda -> LAMBDA LPAREN formal_args RPAREN LBRACE statements RBRACE','lambda',7,'p_lambda','brewparse.py',67),
+  ('lambda -> LAMBDA LPAREN RPAREN LBRACE statements RBRACE','lambda',6,'p_lambda','brewparse.py',68),
+  ('formal_args -> formal_args COMMA formal_arg','formal_args',3,'p_formal_args','brewparse.py',76),
+  ('formal_args -> formal_arg','formal_args',1,'p_formal_args','brewparse.py',77),
+  ('formal_arg -> NAME','formal_arg',1,'p_formal_arg','brewparse.py',82),
+  ('formal_arg -> REF NAME','formal_arg',2,'p_formal_ref_arg','brewparse.py',87),
+  ('statements -> statements statement','statements',2,'p_statements','brewparse.py',92),
+  ('statements -> statement','statements',1,'p_statements','brewparse.py',93),
+  ('statement -> NAME ASSIGN expression SEMI','statement',4,'p_statement___assign','brewparse.py',98),
+  ('statement -> NAME DOT NAME ASSIGN expression SEMI','statement',6,'p_statement_field_assign','brewparse.py',103),
+  ('statement -> IF LPAREN expression RPAREN LBRACE statements RBRACE','statement',7,'p_statement_if','brewparse.py',110),
+  ('statement -> IF LPAREN expression RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE','statement',11,'p_statement_if','brewparse.py',111),
+  ('statement -> WHILE LPAREN expression RPAREN LBRACE statements RBRACE','statement',7,'p_statement_while','brewparse.py',130),
+  ('statement -> expression SEMI','statement',2,'p_statement_expr','brewparse.py',135),
+  ('statement -> RETURN expression SEMI','statement',3,'p_statement_return','brewparse.py',140),
+  ('statement -> RETURN SEMI','statement',2,'p_statement_return','brewparse.py',141),
+  ('expression -> NOT expression','expression',2,'p_expression_not','brewparse.py',150),
+  ('expression -> MINUS expression','expression',2,'p_expression_uminus','brewparse.py',155),
+  ('expression -> expression EQ expression','expression',3,'p_arith_expression_binop','brewparse.py',160),
+  ('expression -> expression GREATER expression','expression',3,'p_arith_expression_binop','brewparse.py',161),
+  ('expression -> expression LESS expression','expression',3,'p_arith_expression_binop','brewparse.py',162),
+  ('expression -> expression NOT_EQ expression','expression',3,'p_arith_expression_binop','brewparse.py',163),
+  ('expression -> expression GREATER_EQ expression','expression',3,'p_arith_expression_binop','brewparse.py',164),
+  ('expression -> expression LESS_EQ expression','expression',3,'p_arith_expression_binop','brewparse.py',165),
+  ('expression -> expression PLUS expression','expression',3,'p_arith_expression_binop','brewparse.py',166),
+  ('expression -> expression MINUS expression','expression',3,'p_arith_expression_binop','brewparse.py',167),
+  ('expression -> expression MULTIPLY expression','expression',3,'p_arith_expression_binop','brewparse.py',168),
+  ('expression -> expression DIVIDE expression','expression',3,'p_arith_expression_binop','brewparse.py',169),
+  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_group','brewparse.py',174),
+  ('expression -> expression OR expression','expression',3,'p_expression_and_or','brewparse.py',179),
+  ('expression -> expression AND expression','expression',3,'p_expression_and_or','brewparse.py',180),
+  ('expression -> NUMBER','expression',1,'p_expression_number','brewparse.py',185),
+  ('expression -> lambda','expression',1,'p_expression_lambda','brewparse.py',190),
+  ('expression -> TRUE','expression',1,'p_expression_bool','brewparse.py',195),
+  ('expression -> FALSE','expression',1,'p_expression_bool','brewparse.py',196),
+  ('expression -> NIL','expression',1,'p_expression_nil','brewparse.py',202),
+  ('expression -> AT','expression',1,'p_expression_obj','brewparse.py',207),
+  ('expression -> STRING','expression',1,'p_expression_string','brewparse.py',214),
+  ('expression -> NAME','expression',1,'p_expression_variable','brewparse.py',219),
+  ('expression -> NAME DOT NAME','expression',3,'p_expression_field','brewparse.py',224),
+  ('expression -> NAME LPAREN args RPAREN','expression',4,'p_func_call','brewparse.py',229),
+  ('expression -> NAME LPAREN RPAREN','expression',3,'p_func_call','brewparse.py',230),
+  ('expression -> NAME DOT NAME LPAREN args RPAREN','expression',6,'p_method_call','brewparse.py',238),
+  ('expression -> NAME DOT NAME LPAREN RPAREN','expression',5,'p_method_call','brewparse.py',239),
+  ('args -> args COMMA expression','args',3,'p_expression_args','brewparse.py',247),
+  ('args -> expression','args',1,'p_expression_args','brewparse.py',248),
+]
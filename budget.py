@@ -0,0 +1,104 @@
+import time
+
+from intbase import ErrorType
+
+# Opt-in limits on a run, passed as Interpreter.run(program, budget=Budget(...)).
+# Any limit left as None is not enforced.
+#
+#   max_steps    loop iterations plus function and lambda calls
+#   max_depth    calls running at once; an eliminated tail call doesn't count
+#   max_objects  objects created with @
+#   timeout      seconds the run may take, from when main starts
+#
+# Each raises its own ErrorType. The engines only meter loop back-edges, calls
+# and @, never single expressions, and check nothing at all without a budget.
+# The clock is read once every CLOCK_INTERVAL steps, not on every step.
+CLOCK_INTERVAL = 1024
+UNLIMITED = float("inf")
+
+
+class Budget:
+    def __init__(self, max_steps=None, max_depth=None, max_objects=None, timeout=None):
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.max_objects = max_objects
+        self.timeout = timeout
+
+    # a Meter for one run of interp
+    def start(self, interp):
+        return Meter(self, interp)
+
+
+# what one run has used of its Budget
+class Meter:
+    __slots__ = (
+        "interp",
+        "steps",
+        "max_steps",
+        "check_at",
+        "deadline",
+        "depth",
+        "max_depth",
+        "objects",
+        "max_objects",
+    )
+
+    def __init__(self, budget, interp):
+        self.interp = interp
+        self.steps = 0
+        self.max_steps = UNLIMITED if budget.max_steps is None else budget.max_steps
+        self.deadline = None
+        if budget.timeout is not None:
+            self.deadline = time.monotonic() + budget.timeout
+        self.depth = 0
+        self.max_depth = UNLIMITED if budget.max_depth is None else budget.max_depth
+        self.objects = 0
+        self.max_objects = UNLIMITED if budget.max_objects is None else budget.max_objects
+        self.__plan_check()
+
+    # a loop iteration or an eliminated tail call
+    def step(self):
+        self.steps += 1
+        if self.steps >= self.check_at:
+            self.__check()
+
+    # a call that adds to the depth; leave() when it returns
+    def enter(self):
+        self.steps += 1
+        if self.steps >= self.check_at:
+            self.__check()
+        self.depth += 1
+        if self.depth > self.max_depth:
+            self.interp.error(
+                ErrorType.DEPTH_LIMIT_ERROR,
+                f"Call depth exceeded the budget of {self.max_depth}",
+            )
+
+    def leave(self):
+        self.depth -= 1
+
+    # an object created with @
+    def allocate(self):
+        self.objects += 1
+        if self.objects > self.max_objects:
+            self.interp.error(
+                ErrorType.OBJECT_LIMIT_ERROR,
+                f"Objects created exceeded the budget of {self.max_objects}",
+            )
+
+    def __check(self):
+        if self.steps > self.max_steps:
+            self.interp.error(
+                ErrorType.STEP_LIMIT_ERROR,
+                f"Steps exceeded the budget of {self.max_steps}",
+            )
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.interp.error(ErrorType.TIME_LIMIT_ERROR, "Run exceeded its time budget")
+        self.__plan_check()
+
+    # the step count at which __check has to run next
+    def __plan_check(self):
+        check_at = self.max_steps + 1
+        if self.deadline is not None:
+            check_at = min(check_at, self.steps + CLOCK_INTERVAL)
+        self.check_at = check_at
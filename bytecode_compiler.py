@@ -0,0 +1,237 @@
+from intbase import InterpreterBase
+from resolver import BUILTINS, CALL_TYPES
+from type_valuev2 import Type, Value, bool_value, int_value
+
+# opcodes, roughly in the order the VM checks for them
+VAR = 0  # (name, addr) -> push the variable
+CONST = 1  # value -> push it
+BINARY = 2  # op -> pop right, pop left, push result
+ASSIGN = 3  # (name, addr) -> pop value, bind name
+TEST = 4  # (target, kind) -> pop condition, jump to target if false
+JUMP = 5  # target
+PUSH_BLOCK = 6
+POP_BLOCK = 7
+CALL_BEGIN = 8  # CallSite -> resolve the callee and push its frame
+BIND_ARG = 9  # (index, variable name, line) -> pop value, bind to the callee's formal
+CALL = 10  # CallSite -> run the callee, its return value gets pushed
+POP = 11
+RETURN = 12  # line -> pop value, return a copy of it
+RETURN_NIL = 13
+FIELD = 14  # (obj name, field name, addr) -> push obj.field
+ASSIGN_FIELD = 15  # (obj name, field name, addr) -> pop value, set field
+MCALL_CHECK = 16  # CallSite -> check the method exists, then set this
+NEG = 17
+NOT = 18
+NEW_OBJECT = 19  # line
+MAKE_LAMBDA = 20  # lambda ast -> push a new closure
+FUNC_REF = 21  # (name, overloads) -> push the function as a value
+THIS_NAME = 22  # push the name this currently refers to
+ASSIGN_THIS = 23  # pop value, pop name, bind name
+PRINT_BEGIN = 24  # push ""
+PRINT_ARG = 25  # pop value, append its printable form to the string below it
+PRINT_END = 26  # pop string, output it, push nil
+INPUT_PROMPT = 27  # pop value, output it
+INPUT = 28  # (as_int, too_many_args) -> push the next input
+TRACE = 29  # statement -> print it
+TAIL_CALL = 30  # CallSite -> CALL, unless it can run in place of the caller
+LOOP = 31  # target -> JUMP back to the top of a while loop, metered by a budget
+LINE = 32  # line -> the running statement's line, for a profiler
+
+
+# A compiled statement list: parallel lists of opcodes and their arguments.
+class Code:
+    def __init__(self, name):
+        self.name = name
+        self.ops = []
+        self.args = []
+
+    def emit(self, op, arg=None):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def patch(self, index, arg):
+        self.args[index] = arg
+
+    def here(self):
+        return len(self.ops)
+
+
+# Everything the VM needs to know about one fcall/mcall site.
+class CallSite:
+    def __init__(self, call_ast):
+        self.name = call_ast.name
+        self.objref = call_ast.objref
+        self.obj_is_this = self.objref == InterpreterBase.THIS_DEF
+        self.num_args = len(call_ast.args)
+        self.func_addr = call_ast.addrs[self.name]
+        self.obj_addr = call_ast.addrs.get(self.objref)
+        self.cache = call_ast.cache
+
+
+# Compiles function and lambda bodies into Code for bytecode_vm.VM. Each
+# body compiles to PUSH_BLOCK, its statements, RETURN_NIL, matching the block
+# the tree walker pushes around every statement list. Statements start with
+# a LINE only when the interpreter runs with a profiler.
+class BytecodeCompiler:
+    def __init__(self, interpreter):
+        self.interp = interpreter
+        self.codes = {}  # id(func/lambda ast) -> Code
+
+    def code_for(self, func_ast):
+        code = self.codes.get(id(func_ast))
+        if code is None:
+            code = Code(func_ast.name or InterpreterBase.LAMBDA_DEF)
+            code.emit(PUSH_BLOCK)
+            for statement in func_ast.statements:
+                self.__statement(code, statement)
+            code.emit(RETURN_NIL)
+            self.codes[id(func_ast)] = code
+        return code
+
+    def __block(self, code, statements):
+        code.emit(PUSH_BLOCK)
+        for statement in statements:
+            self.__statement(code, statement)
+        code.emit(POP_BLOCK)
+
+    def __statement(self, code, statement):
+        if self.interp.trace_output:
+            code.emit(TRACE, statement)
+        if self.interp.profiler is not None:
+            code.emit(LINE, statement.line)
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_DEF:
+            self.__call(code, statement)
+            code.emit(POP)
+        elif kind == InterpreterBase.MCALL_DEF:
+            self.__mcall(code, statement)
+            code.emit(POP)
+        elif kind == "=":
+            self.__assign(code, statement)
+        elif kind == InterpreterBase.FIELD_ASSIGN_DEF:
+            self.__expr(code, statement.expression)
+            obj_name = statement.objref
+            code.emit(
+                ASSIGN_FIELD, (obj_name, statement.field, statement.addrs[obj_name])
+            )
+        elif kind == InterpreterBase.RETURN_DEF:
+            expr_ast = statement.expression
+            if expr_ast is None:
+                code.emit(RETURN_NIL)
+            elif expr_ast.elem_type in CALL_TYPES and expr_ast.name not in BUILTINS:
+                # the RETURN is only reached when the tail call ran as a CALL
+                if expr_ast.elem_type == InterpreterBase.FCALL_DEF:
+                    self.__call(code, expr_ast, TAIL_CALL)
+                else:
+                    self.__mcall(code, expr_ast, TAIL_CALL)
+                code.emit(RETURN, statement.line)
+            else:
+                self.__expr(code, statement.expression)
+                code.emit(RETURN, statement.line)
+        elif kind == InterpreterBase.IF_DEF:
+            self.__expr(code, statement.condition)
+            test = code.emit(TEST)
+            self.__block(code, statement.statements)
+            else_statements = statement.else_statements
+            if else_statements is None:
+                code.patch(test, (code.here(), InterpreterBase.IF_DEF))
+            else:
+                jump = code.emit(JUMP)
+                code.patch(test, (code.here(), InterpreterBase.IF_DEF))
+                self.__block(code, else_statements)
+                code.patch(jump, code.here())
+        elif kind == InterpreterBase.WHILE_DEF:
+            top = code.here()
+            self.__expr(code, statement.condition)
+            test = code.emit(TEST)
+            self.__block(code, statement.statements)
+            code.emit(LOOP, top)
+            code.patch(test, (code.here(), InterpreterBase.WHILE_DEF))
+        # bare expressions are never evaluated by the tree walker either
+
+    def __assign(self, code, assign_ast):
+        var_name = assign_ast.name
+        if var_name == InterpreterBase.THIS_DEF:
+            # this is resolved before the right hand side runs
+            code.emit(THIS_NAME)
+            self.__expr(code, assign_ast.expression)
+            code.emit(ASSIGN_THIS)
+        else:
+            self.__expr(code, assign_ast.expression)
+            code.emit(ASSIGN, (var_name, assign_ast.addrs[var_name]))
+
+    def __expr(self, code, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.VAR_DEF:
+            self.__var(code, expr_ast)
+        elif kind == InterpreterBase.FIELD_DEF:
+            obj_name = expr_ast.objref
+            code.emit(FIELD, (obj_name, expr_ast.field, expr_ast.addrs[obj_name]))
+        elif kind in self.interp.BIN_OPS:
+            self.__expr(code, expr_ast.op1)
+            self.__expr(code, expr_ast.op2)
+            code.emit(BINARY, kind)
+        elif kind == InterpreterBase.INT_DEF:
+            code.emit(CONST, int_value(expr_ast.val))
+        elif kind == InterpreterBase.STRING_DEF:
+            code.emit(CONST, Value(Type.STRING, expr_ast.val))
+        elif kind == InterpreterBase.BOOL_DEF:
+            code.emit(CONST, bool_value(expr_ast.val))
+        elif kind == InterpreterBase.NIL_DEF:
+            code.emit(CONST, self.interp.NIL_VALUE)
+        elif kind == InterpreterBase.FCALL_DEF:
+            self.__call(code, expr_ast)
+        elif kind == InterpreterBase.MCALL_DEF:
+            self.__mcall(code, expr_ast)
+        elif kind == InterpreterBase.NEG_DEF:
+            self.__expr(code, expr_ast.op1)
+            code.emit(NEG)
+        elif kind == InterpreterBase.NOT_DEF:
+            self.__expr(code, expr_ast.op1)
+            code.emit(NOT)
+        elif kind == InterpreterBase.LAMBDA_DEF:
+            code.emit(MAKE_LAMBDA, expr_ast)
+        elif kind == InterpreterBase.OBJ_DEF:
+            code.emit(NEW_OBJECT, expr_ast.line)
+        else:
+            code.emit(CONST, None)
+
+    def __var(self, code, var_ast):
+        var_name = var_ast.name
+        func_name_to_ast = self.interp.func_name_to_ast
+        # function names win over variables, as in the tree walker
+        if var_name in func_name_to_ast:
+            code.emit(FUNC_REF, (var_name, func_name_to_ast[var_name]))
+        else:
+            code.emit(VAR, (var_name, var_ast.addrs[var_name]))
+
+    def __call(self, code, call_ast, call_op=CALL):
+        name = call_ast.name
+        args = call_ast.args
+        if name == "print":
+            code.emit(PRINT_BEGIN)
+            for arg in args:
+                self.__expr(code, arg)
+                code.emit(PRINT_ARG)
+            code.emit(PRINT_END)
+            return
+        if name == "inputi" or name == "inputs":
+            if len(args) == 1:
+                self.__expr(code, args[0])
+                code.emit(INPUT_PROMPT)
+            code.emit(INPUT, (name == "inputi", len(args) > 1))
+            return
+
+        site = CallSite(call_ast)
+        code.emit(CALL_BEGIN, site)
+        for index, arg in enumerate(args):
+            self.__expr(code, arg)
+            # only a variable can be shared with a ref parameter
+            var_name = arg.name if arg.elem_type == InterpreterBase.VAR_DEF else None
+            code.emit(BIND_ARG, (index, var_name, call_ast.line))
+        code.emit(call_op, site)
+
+    def __mcall(self, code, mcall_ast, call_op=CALL):
+        code.emit(MCALL_CHECK, CallSite(mcall_ast))
+        self.__call(code, mcall_ast, call_op)
@@ -0,0 +1,445 @@
+from bytecode_compiler import (
+    BytecodeCompiler,
+    VAR,
+    CONST,
+    BINARY,
+    ASSIGN,
+    TEST,
+    JUMP,
+    PUSH_BLOCK,
+    POP_BLOCK,
+    CALL_BEGIN,
+    BIND_ARG,
+    CALL,
+    POP,
+    RETURN,
+    RETURN_NIL,
+    FIELD,
+    ASSIGN_FIELD,
+    MCALL_CHECK,
+    NEG,
+    NOT,
+    NEW_OBJECT,
+    MAKE_LAMBDA,
+    FUNC_REF,
+    THIS_NAME,
+    ASSIGN_THIS,
+    PRINT_BEGIN,
+    PRINT_ARG,
+    PRINT_END,
+    INPUT_PROMPT,
+    INPUT,
+    TRACE,
+    TAIL_CALL,
+    LOOP,
+    LINE,
+)
+from env_v2 import UNBOUND, Cell
+from intbase import ErrorType
+from type_valuev2 import Type, Value, bool_value, copy_value, get_printable, int_value
+from lambda_class import Lambda
+from object_class import Object
+
+INT_OPS = ("+", "-", "*", "/", "<", "<=", ">", ">=")
+
+
+# Runs the bytecode produced by BytecodeCompiler in a single dispatch loop.
+# A Brewin# call never recurses in Python: the caller's position is saved on
+# the VM's own list of frames and the loop carries on in the callee, so the
+# recursion depth is only bounded by memory. Variables still live in the
+# interpreter's EnvironmentManager, which keeps dynamic scoping identical to
+# the tree walker.
+class VM:
+    # compiler, if given, is a BytecodeCompiler for the same program whose
+    # code can be reused, instead of compiling it all over again
+    def __init__(self, interpreter, compiler=None):
+        self.interp = interpreter
+        self.env = interpreter.env
+        self.compiler = compiler or BytecodeCompiler(interpreter)
+        self.checked_method = None
+
+    def run_function(self, func_ast):
+        interp = self.interp
+        env = self.env
+        environment = env.environment
+        env_get = env.get
+        env_set = env.set
+        cells = env.cells
+        op_to_lambda = interp.op_to_lambda
+        int_ops = {op: op_to_lambda[Type.INT][op] for op in INT_OPS}
+        code_for = self.compiler.code_for
+        nil = interp.NIL_VALUE
+        meter = interp.meter  # None unless the run has a budget
+        profiler = interp.profiler  # None unless the run is profiled
+        profiled = profiler.stack if profiler is not None else None
+        memory = interp.memory  # None unless the run is tracked
+        INT = Type.INT
+        BOOL = Type.BOOL
+
+        stack = []  # operand stack shared by every frame
+        frames = []  # saved (ops, args, pc, env_base, lam, base, mark) of each caller
+        pending = []  # CallTargets of calls whose arguments are being bound
+
+        code = code_for(func_ast)
+        ops = code.ops
+        args = code.args
+        pc = 0
+        # everything above env_base belongs to the running body; main has no
+        # call frame underneath it so its body starts right at the top
+        env_base = len(environment)
+        lam = None  # the lambda whose scope is the running body's call frame
+        # index of the running body's call frame, and the length of env.cells
+        # before its arguments were bound (see tail_calls.py)
+        base = None
+        mark = None
+
+        while True:
+            op = ops[pc]
+            arg = args[pc]
+            pc += 1
+
+            if op == VAR:
+                name, addr = arg
+                if addr is None:
+                    val = env_get(name)
+                elif addr == UNBOUND:
+                    val = None
+                else:
+                    val = environment[addr].get(name)
+                if val is None:
+                    interp.error(ErrorType.NAME_ERROR, f"Variable {name} not found")
+                if val.__class__ is Cell:
+                    val = val.value
+                stack.append(val)
+
+            elif op == CONST:
+                stack.append(arg)
+
+            elif op == BINARY:
+                right = stack.pop()
+                left = stack[-1]
+                if left.t is INT and right.t is INT and arg in int_ops:
+                    stack[-1] = int_ops[arg](left, right)
+                else:
+                    stack[-1] = self.__binary(arg, left, right)
+
+            elif op == ASSIGN:
+                name, addr = arg
+                value_obj = stack.pop()
+                if base is not None:
+                    # an object or lambda rebinds the caller's variable too
+                    if addr is None:
+                        old_value = env_get(name)
+                    else:
+                        old_value = environment[addr].get(name)
+                        if old_value.__class__ is Cell:
+                            old_value = old_value.value
+                    if old_value is not None and old_value.t in (Type.OBJECT, Type.LAMBDA):
+                        env.link_to_caller(name, base)
+                if addr is None:
+                    env_set(name, value_obj)
+                else:
+                    held = environment[addr].get(name)
+                    if held.__class__ is Cell:
+                        held.value = value_obj
+                    else:
+                        env.writable(addr)[name] = value_obj
+
+            elif op == TEST:
+                result = stack.pop()
+                if result.t is not BOOL and result.t is not INT:
+                    interp.error(
+                        ErrorType.TYPE_ERROR, f"Incompatible type for {arg[1]} condition"
+                    )
+                if not result.v:
+                    pc = arg[0]
+
+            elif op == JUMP:
+                pc = arg
+
+            elif op == LOOP:
+                pc = arg
+                if meter is not None:
+                    meter.step()
+
+            elif op == PUSH_BLOCK:
+                environment.append({})
+
+            elif op == POP_BLOCK:
+                env.pop()
+
+            elif op == CALL_BEGIN:
+                pending.append((self.__begin_call(arg), len(cells)))
+
+            elif op == BIND_ARG:
+                index, var_name, line = arg
+                result = stack.pop()
+                formal_name, is_ref = pending[-1][0].formals[index]
+                if is_ref:
+                    if var_name is not None and env.bind_ref(formal_name, var_name):
+                        continue
+                elif memory is None:
+                    result = copy_value(result)
+                else:
+                    result = memory.copy(result, line)
+                env.create(formal_name, result)
+
+            elif op == CALL or op == TAIL_CALL:
+                target, call_mark = pending.pop()
+                if op == TAIL_CALL and frames and lam is None:
+                    # the callee takes over the caller's place in frames
+                    env.restack(base, env.fold(base, mark))
+                    if meter is not None:
+                        meter.step()
+                    if profiler is not None:
+                        profiler.tail_call(target)
+                else:
+                    if meter is not None:
+                        meter.enter()
+                    if profiler is not None:
+                        profiler.enter(target)
+                    if memory is not None:
+                        memory.check()
+                    frames.append((ops, args, pc, env_base, lam, base, mark))
+                    base = len(environment) - 1
+                    mark = call_mark
+                lam = target.lam
+                code = code_for(target.func_ast)
+                ops = code.ops
+                args = code.args
+                pc = 0
+                env_base = len(environment)
+
+            elif op == POP:
+                stack.pop()
+
+            elif op == RETURN or op == RETURN_NIL:
+                if op == RETURN_NIL:
+                    return_val = nil
+                elif memory is None:
+                    return_val = copy_value(stack.pop())
+                else:
+                    return_val = memory.copy(stack.pop(), arg)
+                env.truncate(env_base)
+                if not frames:
+                    return return_val
+                if meter is not None:
+                    meter.leave()
+                if profiler is not None:
+                    profiler.leave()
+                self.__finish_call(lam, base, mark)
+                ops, args, pc, env_base, lam, base, mark = frames.pop()
+                stack.append(return_val)
+
+            elif op == FIELD:
+                stack.append(self.__field(*arg))
+
+            elif op == ASSIGN_FIELD:
+                self.__assign_field(stack.pop(), *arg)
+
+            elif op == MCALL_CHECK:
+                self.__check_mcall(arg)
+
+            elif op == NEG:
+                value_obj = stack[-1]
+                if value_obj.t is not INT:
+                    interp.error(ErrorType.TYPE_ERROR, "Incompatible type for neg operation")
+                stack[-1] = int_value(-1 * value_obj.v)
+
+            elif op == NOT:
+                value_obj = stack[-1]
+                if value_obj.t is not BOOL and value_obj.t is not INT:
+                    interp.error(ErrorType.TYPE_ERROR, "Incompatible type for ! operation")
+                stack[-1] = bool_value(not value_obj.v)
+
+            elif op == NEW_OBJECT:
+                if meter is not None:
+                    meter.allocate()
+                obj = Object()
+                if memory is not None:
+                    memory.object_created(obj, arg)
+                stack.append(Value(Type.OBJECT, obj))
+
+            elif op == MAKE_LAMBDA:
+                # lam is the running call's, the new one needs a name of its own
+                new_lam = Lambda(arg, env.capture())
+                if memory is not None:
+                    memory.lambda_created(new_lam, arg.line)
+                stack.append(Value(Type.LAMBDA, new_lam))
+
+            elif op == FUNC_REF:
+                name, overloads = arg
+                if len(overloads) >= 2:
+                    interp.error(
+                        ErrorType.NAME_ERROR, "Attempted assignment to overloaded function"
+                    )
+                stack.append(Value(Type.FUNCTION, overloads))
+
+            elif op == THIS_NAME:
+                stack.append(interp.curr_obj)
+
+            elif op == ASSIGN_THIS:
+                value_obj = stack.pop()
+                name = stack.pop()
+                if base is not None:
+                    old_value = env_get(name)
+                    if old_value is not None and old_value.t in (Type.OBJECT, Type.LAMBDA):
+                        env.link_to_caller(name, base)
+                env_set(name, value_obj)
+
+            elif op == PRINT_BEGIN:
+                stack.append("")
+
+            elif op == PRINT_ARG:
+                result = stack.pop()
+                stack[-1] = stack[-1] + get_printable(result)
+
+            elif op == PRINT_END:
+                interp.output(stack.pop())
+                stack.append(nil)
+
+            elif op == INPUT_PROMPT:
+                interp.output(get_printable(stack.pop()))
+
+            elif op == INPUT:
+                as_int, too_many_args = arg
+                if too_many_args:
+                    interp.error(
+                        ErrorType.NAME_ERROR,
+                        "No inputi() function that takes > 1 parameter",
+                    )
+                if as_int:
+                    stack.append(int_value(interp.get_int_input()))
+                else:
+                    stack.append(Value(Type.STRING, interp.get_input()))
+
+            elif op == TRACE:
+                print(arg)
+
+            elif op == LINE:
+                profiled[-1][1] = arg
+
+    def __lookup(self, name, addr):
+        if addr is None:
+            return self.env.get(name)
+        if addr == UNBOUND:
+            return None
+        return self.env.lookup(name, addr)
+
+    def __binary(self, op, left_value_obj, right_value_obj):
+        interp = self.interp
+        if op in ("==", "!=", "||", "&&"):
+            if left_value_obj.t == Type.INT:
+                left_value_obj = bool_value(left_value_obj.v)
+            if right_value_obj.t == Type.INT:
+                right_value_obj = bool_value(right_value_obj.v)
+        if op in ("+", "-", "/", "*"):
+            if left_value_obj.t == Type.BOOL:
+                left_value_obj = int_value(int(left_value_obj.v))
+            if right_value_obj.t == Type.BOOL:
+                right_value_obj = int_value(int(right_value_obj.v))
+        if op not in ("==", "!=") and left_value_obj.t != right_value_obj.t:
+            interp.error(ErrorType.TYPE_ERROR, f"Incompatible types for {op} operation")
+        ops = interp.op_to_lambda[left_value_obj.t]
+        if op not in ops:
+            interp.error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible operator {op} for type {left_value_obj.t}",
+            )
+        return ops[op](left_value_obj, right_value_obj)
+
+    def __field(self, obj_name, field_name, obj_addr):
+        interp = self.interp
+        if obj_name == "this":
+            obj_name = interp.curr_obj
+        obj = self.__lookup(obj_name, obj_addr)
+        if obj is None:
+            interp.error(ErrorType.NAME_ERROR, f"Object {obj_name} not found")
+        if obj.t != Type.OBJECT:
+            interp.error(ErrorType.TYPE_ERROR, f"{obj_name} not an Object")
+        try:
+            return obj.v.get_field(field_name)
+        except:
+            interp.error(
+                ErrorType.NAME_ERROR, f"{field_name} not a field of Object {obj_name}"
+            )
+
+    def __assign_field(self, value_obj, obj_name, field_name, obj_addr):
+        interp = self.interp
+        if obj_name == "this":
+            obj_name = interp.curr_obj
+        obj_candidate = self.__lookup(obj_name, obj_addr)
+        if obj_candidate is None:
+            interp.error(ErrorType.NAME_ERROR, f"{obj_name} not defined!")
+        if obj_candidate.t != Type.OBJECT:
+            interp.error(ErrorType.TYPE_ERROR, f"{obj_name} is not an object!")
+        if field_name == "proto" and value_obj.t not in (Type.OBJECT, Type.NIL):
+            interp.error(
+                ErrorType.TYPE_ERROR, f"{obj_name} cannot be assigned proto of non-Object"
+            )
+        obj_candidate.v.set_field(field_name, value_obj)
+
+    def __check_mcall(self, site):
+        interp = self.interp
+        obj_name = interp.curr_obj if site.obj_is_this else site.objref
+        obj = self.__lookup(obj_name, site.obj_addr)
+        if obj is None:
+            interp.error(ErrorType.NAME_ERROR, f"Object {obj_name} not found")
+        if obj.t != Type.OBJECT:
+            interp.error(ErrorType.TYPE_ERROR, f"{obj_name} not an Object")
+        try:
+            method = site.cache.method(obj.v)
+        except:
+            interp.error(
+                ErrorType.NAME_ERROR, f"{site.name} not a field of Object {obj_name}"
+            )
+        if method.t not in (Type.LAMBDA, Type.FUNCTION):
+            interp.error(ErrorType.TYPE_ERROR, f"{site.name} not a method")
+        interp.curr_obj = obj_name
+        # the CALL_BEGIN right after this reuses the method; calls to the
+        # builtins never get one, so it must not leak to their arguments
+        if site.name not in ("print", "inputi", "inputs"):
+            self.checked_method = method
+
+    # first half of a call, up to where the tree walker starts binding
+    # arguments: find the callee, check its arity and push its frame
+    def __begin_call(self, site):
+        interp = self.interp
+        obj_ref = interp.curr_obj if site.obj_is_this else site.objref
+        func_val = self.__lookup(site.name, site.func_addr)
+        method = self.checked_method
+        self.checked_method = None
+        target = site.cache.resolve(
+            interp, self.env, func_val, obj_ref, self.__get_func_by_name, method
+        )
+        lam = target.lam
+        if lam is not None:
+            self.env.push_lambda(lam)
+        else:
+            self.env.push()
+        return target
+
+    # second half of a call, once the body has returned: drop the callee's
+    # frame and release the Cells made since mark
+    def __finish_call(self, lam, base, mark):
+        env = self.env
+        if lam is not None:
+            env.pop_lambda(lam)
+        else:
+            env.pop()
+        if len(env.environment) > base:
+            # the frame tail calls folded the callers' frames into
+            env.truncate(base)
+        env.release_cells(mark)
+
+    def __get_func_by_name(self, name, num_params):
+        interp = self.interp
+        if name not in interp.func_name_to_ast:
+            interp.error(ErrorType.NAME_ERROR, f"Function {name} not found")
+        candidate_funcs = interp.func_name_to_ast[name]
+        if num_params not in candidate_funcs:
+            interp.error(
+                ErrorType.NAME_ERROR,
+                f"Function {name} taking {num_params} params not found",
+            )
+        return candidate_funcs[num_params]
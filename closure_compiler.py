@@ -0,0 +1,710 @@
+from env_v2 import UNBOUND, Cell
+from intbase import InterpreterBase, ErrorType
+from type_valuev2 import Type, Value, bool_value, copy_value, get_printable, int_value
+from lambda_class import Lambda
+from object_class import Object
+from resolver import BUILTINS, CALL_TYPES
+from tail_calls import TailCall
+
+
+# Compiles the Element tree produced by parse_program into pre-bound Python
+# closures. Every statement becomes a closure that returns None to keep going
+# or a Value when a return statement fired; every expression becomes a closure
+# returning a Value. The behaviour mirrors Interpreter's tree walker exactly,
+# including its error messages and the order in which things get evaluated.
+class ClosureCompiler:
+    def __init__(self, interpreter):
+        self.interp = interpreter
+        self.env = interpreter.env
+        self.blocks = {}  # id(statement list) -> compiled block
+        # (base, lam, mark) of the running call, see tail_calls.py
+        self.level = None
+
+    def run_function(self, func_ast):
+        return self.__block(func_ast.statements)()
+
+    # function and lambda bodies are compiled on first use, so unused
+    # functions cost nothing and a lambda is compiled once per ast node
+    def __block(self, statements):
+        block = self.blocks.get(id(statements))
+        if block is None:
+            block = self.__compile_block(statements)
+            self.blocks[id(statements)] = block
+        return block
+
+    def __get_func_by_name(self, name, num_params):
+        func_name_to_ast = self.interp.func_name_to_ast
+        if name not in func_name_to_ast:
+            self.interp.error(ErrorType.NAME_ERROR, f"Function {name} not found")
+        candidate_funcs = func_name_to_ast[name]
+        if num_params not in candidate_funcs:
+            self.interp.error(
+                ErrorType.NAME_ERROR,
+                f"Function {name} taking {num_params} params not found",
+            )
+        return candidate_funcs[num_params]
+
+    # turns the address resolver.py gave a name into a reader or writer for it
+    def __reader(self, addr):
+        if addr is None:
+            return self.env.get
+        if addr == UNBOUND:
+            return lambda name: None
+        environment = self.env.environment
+
+        def read(name):
+            value = environment[addr].get(name)
+            if value.__class__ is Cell:
+                return value.value
+            return value
+
+        return read
+
+    def __writer(self, addr):
+        if addr is None:
+            return self.env.set
+        environment = self.env.environment
+        writable = self.env.writable
+
+        def write(name, value):
+            held = environment[addr].get(name)
+            if held.__class__ is Cell:
+                held.value = value
+            else:
+                writable(addr)[name] = value
+
+        return write
+
+    # statements
+
+    def __compile_block(self, statements):
+        compiled = []
+        for statement in statements:
+            stmt = self.__compile_statement(statement)
+            if self.interp.trace_output:
+                stmt = self.__traced(statement, stmt)
+            if stmt is not None and self.interp.profiler is not None:
+                stmt = self.__profiled(statement.line, stmt)
+            if stmt is not None:
+                compiled.append(stmt)
+        push = self.env.push
+        pop = self.env.pop
+
+        def run_block():
+            push()
+            for stmt in compiled:
+                return_val = stmt()
+                if return_val is not None:
+                    pop()
+                    return return_val
+            pop()
+            return None
+
+        return run_block
+
+    def __traced(self, statement, stmt):
+        def traced():
+            print(statement)
+            if stmt is not None:
+                return stmt()
+            return None
+
+        return traced
+
+    # stmt, first setting the line of the running call's profiler frame
+    def __profiled(self, line, stmt):
+        stack = self.interp.profiler.stack
+
+        def profiled():
+            stack[-1][1] = line
+            return stmt()
+
+        return profiled
+
+    def __compile_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_DEF:
+            return self.__discard(self.__compile_call(statement))
+        if kind == "=":
+            return self.__compile_assign(statement)
+        if kind == InterpreterBase.FIELD_ASSIGN_DEF:
+            return self.__compile_field_assign(statement)
+        if kind == InterpreterBase.RETURN_DEF:
+            return self.__compile_return(statement)
+        if kind == InterpreterBase.IF_DEF:
+            return self.__compile_if(statement)
+        if kind == InterpreterBase.WHILE_DEF:
+            return self.__compile_while(statement)
+        if kind == InterpreterBase.MCALL_DEF:
+            return self.__discard(self.__compile_mcall(statement))
+        # bare expressions are never evaluated by the tree walker either
+        return None
+
+    def __discard(self, expr):
+        def stmt():
+            expr()
+
+        return stmt
+
+    def __compile_assign(self, assign_ast):
+        interp = self.interp
+        var_name = assign_ast.name
+        expr = self.__compile_expr(assign_ast.expression)
+        is_this = var_name == InterpreterBase.THIS_DEF
+        get_var = self.__reader(assign_ast.addrs[var_name])
+        set_var = self.__writer(assign_ast.addrs[var_name])
+        env = self.env
+
+        def assign():
+            name = interp.curr_obj if is_this else var_name
+            value_obj = expr()
+            # same rebinding of the caller's variable as the tree walker
+            existing = get_var(name)
+            if existing is not None and existing.t in (Type.OBJECT, Type.LAMBDA):
+                if self.level is not None:
+                    env.link_to_caller(name, self.level[0])
+            set_var(name, value_obj)
+
+        return assign
+
+    def __compile_field_assign(self, assign_ast):
+        interp = self.interp
+        obj_name = assign_ast.objref
+        field_name = assign_ast.field
+        expr = self.__compile_expr(assign_ast.expression)
+        obj_is_this = obj_name == InterpreterBase.THIS_DEF
+        is_proto = field_name == "proto"
+        get_obj = self.__reader(assign_ast.addrs[obj_name])
+
+        def assign_field():
+            value_obj = expr()
+            name = interp.curr_obj if obj_is_this else obj_name
+            obj_candidate = get_obj(name)
+            if obj_candidate is None:
+                interp.error(ErrorType.NAME_ERROR, f"{name} not defined!")
+            if obj_candidate.t != Type.OBJECT:
+                interp.error(ErrorType.TYPE_ERROR, f"{name} is not an object!")
+            if is_proto and value_obj.t not in (Type.OBJECT, Type.NIL):
+                interp.error(
+                    ErrorType.TYPE_ERROR,
+                    f"{name} cannot be assigned proto of non-Object",
+                )
+            obj_candidate.v.set_field(field_name, value_obj)
+
+        return assign_field
+
+    def __compile_return(self, return_ast):
+        expr_ast = return_ast.expression
+        if expr_ast is None:
+            nil = self.interp.NIL_VALUE
+            return lambda: nil
+        kind = expr_ast.elem_type
+        if kind in CALL_TYPES and expr_ast.name not in BUILTINS:
+            if kind == InterpreterBase.FCALL_DEF:
+                return self.__compile_call(expr_ast, tail=True)
+            return self.__compile_mcall(expr_ast, tail=True)
+        expr = self.__compile_expr(expr_ast)
+        memory = self.interp.memory
+        if memory is not None:
+            line = return_ast.line
+            return lambda: memory.copy(expr(), line)
+        return lambda: copy_value(expr())
+
+    def __compile_if(self, if_ast):
+        interp = self.interp
+        cond = self.__compile_expr(if_ast.condition)
+        then_block = self.__block(if_ast.statements)
+        else_statements = if_ast.else_statements
+        else_block = None
+        if else_statements is not None:
+            else_block = self.__block(else_statements)
+
+        def do_if():
+            result = cond()
+            if result.t != Type.BOOL and result.t != Type.INT:
+                interp.error(ErrorType.TYPE_ERROR, "Incompatible type for if condition")
+            if result.v:
+                return then_block()
+            if else_block is not None:
+                return else_block()
+            return None
+
+        return do_if
+
+    def __compile_while(self, while_ast):
+        interp = self.interp
+        cond = self.__compile_expr(while_ast.condition)
+        body = self.__block(while_ast.statements)
+        meter = interp.meter
+
+        def do_while():
+            while True:
+                result = cond()
+                if result.t != Type.BOOL and result.t != Type.INT:
+                    interp.error(
+                        ErrorType.TYPE_ERROR, "Incompatible type for while condition"
+                    )
+                if not result.v:
+                    return None
+                return_val = body()
+                if return_val is not None:
+                    return return_val
+
+        # the same loop, metered on every iteration
+        def do_metered_while():
+            step = meter.step
+            while True:
+                result = cond()
+                if result.t != Type.BOOL and result.t != Type.INT:
+                    interp.error(
+                        ErrorType.TYPE_ERROR, "Incompatible type for while condition"
+                    )
+                if not result.v:
+                    return None
+                return_val = body()
+                if return_val is not None:
+                    return return_val
+                step()
+
+        if meter is not None:
+            return do_metered_while
+        return do_while
+
+    # expressions
+
+    def __compile_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.NIL_DEF:
+            nil = self.interp.NIL_VALUE
+            return lambda: nil
+        if kind == InterpreterBase.INT_DEF:
+            const = int_value(expr_ast.val)
+            return lambda: const
+        if kind == InterpreterBase.STRING_DEF:
+            const = Value(Type.STRING, expr_ast.val)
+            return lambda: const
+        if kind == InterpreterBase.BOOL_DEF:
+            const = bool_value(expr_ast.val)
+            return lambda: const
+        if kind == InterpreterBase.VAR_DEF:
+            return self.__compile_var(expr_ast)
+        if kind == InterpreterBase.FIELD_DEF:
+            return self.__compile_field(expr_ast)
+        if kind == InterpreterBase.FCALL_DEF:
+            return self.__compile_call(expr_ast)
+        if kind in self.interp.BIN_OPS:
+            return self.__compile_binop(expr_ast)
+        if kind == InterpreterBase.NEG_DEF:
+            return self.__compile_neg(expr_ast)
+        if kind == InterpreterBase.NOT_DEF:
+            return self.__compile_not(expr_ast)
+        if kind == InterpreterBase.LAMBDA_DEF:
+            return self.__compile_lambda(expr_ast)
+        if kind == InterpreterBase.OBJ_DEF:
+            return self.__compile_obj(expr_ast)
+        if kind == InterpreterBase.MCALL_DEF:
+            return self.__compile_mcall(expr_ast)
+        return lambda: None
+
+    def __compile_field(self, field_ast):
+        interp = self.interp
+        obj_name = field_ast.objref
+        field_name = field_ast.field
+        obj_is_this = obj_name == InterpreterBase.THIS_DEF
+        get_obj = self.__reader(field_ast.addrs[obj_name])
+
+        def field():
+            name = interp.curr_obj if obj_is_this else obj_name
+            obj = get_obj(name)
+            if obj is None:
+                interp.error(ErrorType.NAME_ERROR, f"Object {name} not found")
+            if obj.t != Type.OBJECT:
+                interp.error(ErrorType.TYPE_ERROR, f"{name} not an Object")
+            try:
+                return obj.v.get_field(field_name)
+            except:
+                interp.error(
+                    ErrorType.NAME_ERROR,
+                    f"{field_name} not a field of Object {name}",
+                )
+
+        return field
+
+    def __compile_var(self, var_ast):
+        interp = self.interp
+        env = self.env
+        var_name = var_ast.name
+
+        # function names win over variables, as in the tree walker
+        if var_name in interp.func_name_to_ast:
+            overloads = interp.func_name_to_ast[var_name]
+            func_value = Value(Type.FUNCTION, overloads)
+
+            def function_ref():
+                if len(overloads) >= 2:
+                    interp.error(
+                        ErrorType.NAME_ERROR,
+                        "Attempted assignment to overloaded function",
+                    )
+                return func_value
+
+            return function_ref
+
+        addr = var_ast.addrs[var_name]
+        if addr == UNBOUND:
+            def unbound():
+                interp.error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
+
+            return unbound
+
+        if addr is not None:
+            environment = env.environment
+
+            def addressed():
+                val = environment[addr].get(var_name)
+                if val is None:
+                    interp.error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
+                if val.__class__ is Cell:
+                    return val.value
+                return val
+
+            return addressed
+
+        get = env.get
+
+        def variable():
+            val = get(var_name)
+            if val is None:
+                interp.error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
+            return val
+
+        return variable
+
+    def __compile_binop(self, arith_ast):
+        interp = self.interp
+        op = arith_ast.elem_type
+        left = self.__compile_expr(arith_ast.op1)
+        right = self.__compile_expr(arith_ast.op2)
+        op_to_lambda = interp.op_to_lambda
+
+        def apply(left_value_obj, right_value_obj):
+            if left_value_obj.t != right_value_obj.t:
+                interp.error(
+                    ErrorType.TYPE_ERROR, f"Incompatible types for {op} operation"
+                )
+            ops = op_to_lambda[left_value_obj.t]
+            if op not in ops:
+                interp.error(
+                    ErrorType.TYPE_ERROR,
+                    f"Incompatible operator {op} for type {left_value_obj.t}",
+                )
+            return ops[op](left_value_obj, right_value_obj)
+
+        if op in ("==", "!="):
+            # anything compares against anything, ints are compared as bools
+            def equality():
+                left_value_obj = left()
+                right_value_obj = right()
+                if left_value_obj.t == Type.INT:
+                    left_value_obj = bool_value(left_value_obj.v)
+                if right_value_obj.t == Type.INT:
+                    right_value_obj = bool_value(right_value_obj.v)
+                return op_to_lambda[left_value_obj.t][op](left_value_obj, right_value_obj)
+
+            return equality
+
+        if op in ("||", "&&"):
+            def logical():
+                left_value_obj = left()
+                right_value_obj = right()
+                if left_value_obj.t == Type.INT:
+                    left_value_obj = bool_value(left_value_obj.v)
+                if right_value_obj.t == Type.INT:
+                    right_value_obj = bool_value(right_value_obj.v)
+                return apply(left_value_obj, right_value_obj)
+
+            return logical
+
+        if op in ("+", "-", "*", "/"):
+            int_op = op_to_lambda[Type.INT][op]
+
+            def arithmetic():
+                left_value_obj = left()
+                right_value_obj = right()
+                if left_value_obj.t == Type.BOOL:
+                    left_value_obj = int_value(int(left_value_obj.v))
+                if right_value_obj.t == Type.BOOL:
+                    right_value_obj = int_value(int(right_value_obj.v))
+                if left_value_obj.t == Type.INT and right_value_obj.t == Type.INT:
+                    return int_op(left_value_obj, right_value_obj)
+                return apply(left_value_obj, right_value_obj)
+
+            return arithmetic
+
+        int_op = op_to_lambda[Type.INT][op]
+
+        def comparison():
+            left_value_obj = left()
+            right_value_obj = right()
+            if left_value_obj.t == Type.INT and right_value_obj.t == Type.INT:
+                return int_op(left_value_obj, right_value_obj)
+            return apply(left_value_obj, right_value_obj)
+
+        return comparison
+
+    def __compile_neg(self, neg_ast):
+        interp = self.interp
+        operand = self.__compile_expr(neg_ast.op1)
+
+        def neg():
+            value_obj = operand()
+            if value_obj.t != Type.INT:
+                interp.error(
+                    ErrorType.TYPE_ERROR,
+                    f"Incompatible type for {InterpreterBase.NEG_DEF} operation",
+                )
+            return int_value(-1 * value_obj.v)
+
+        return neg
+
+    def __compile_not(self, not_ast):
+        interp = self.interp
+        operand = self.__compile_expr(not_ast.op1)
+
+        def logical_not():
+            value_obj = operand()
+            if value_obj.t != Type.BOOL and value_obj.t != Type.INT:
+                interp.error(
+                    ErrorType.TYPE_ERROR,
+                    f"Incompatible type for {InterpreterBase.NOT_DEF} operation",
+                )
+            return bool_value(not value_obj.v)
+
+        return logical_not
+
+    def __compile_lambda(self, lambda_ast):
+        capture = self.env.capture
+        memory = self.interp.memory
+        if memory is not None:
+
+            def make_tracked_lambda():
+                lam = Lambda(lambda_ast, capture())
+                memory.lambda_created(lam, lambda_ast.line)
+                return Value(Type.LAMBDA, lam)
+
+            return make_tracked_lambda
+
+        def make_lambda():
+            return Value(Type.LAMBDA, Lambda(lambda_ast, capture()))
+
+        return make_lambda
+
+    def __compile_obj(self, obj_ast):
+        meter = self.interp.meter
+        memory = self.interp.memory
+        if meter is not None or memory is not None:
+
+            def new_object():
+                if meter is not None:
+                    meter.allocate()
+                obj = Object()
+                if memory is not None:
+                    memory.object_created(obj, obj_ast.line)
+                return Value(Type.OBJECT, obj)
+
+            return new_object
+        return lambda: Value(Type.OBJECT, Object())
+
+    def __compile_mcall(self, mcall_ast, tail=False):
+        interp = self.interp
+        env = self.env
+        objref = mcall_ast.objref
+        obj_is_this = objref == InterpreterBase.THIS_DEF
+        func_name = mcall_ast.name
+        call = self.__compile_call(mcall_ast, tail)
+        if func_name in ("print", "inputi", "inputs"):
+            # the builtins win over the method, as in the tree walker
+            builtin = call
+            call = lambda method: builtin()
+        get_obj = self.__reader(mcall_ast.addrs[objref])
+        cache = mcall_ast.cache
+
+        def mcall():
+            obj_name = interp.curr_obj if obj_is_this else objref
+            obj = get_obj(obj_name)
+            if obj is None:
+                interp.error(ErrorType.NAME_ERROR, f"Object {obj_name} not found")
+            if obj.t != Type.OBJECT:
+                interp.error(ErrorType.TYPE_ERROR, f"{obj_name} not an Object")
+            try:
+                method = cache.method(obj.v)
+            except:
+                interp.error(
+                    ErrorType.NAME_ERROR,
+                    f"{func_name} not a field of Object {obj_name}",
+                )
+            if method.t not in (Type.LAMBDA, Type.FUNCTION):
+                interp.error(ErrorType.TYPE_ERROR, f"{func_name} not a method")
+            interp.curr_obj = obj_name
+            return call(method)
+
+        return mcall
+
+    def __compile_print(self, call_ast):
+        interp = self.interp
+        args = [self.__compile_expr(arg) for arg in call_ast.args]
+        nil = interp.NIL_VALUE
+
+        def do_print():
+            output = ""
+            for arg in args:
+                output = output + get_printable(arg())
+            interp.output(output)
+            return nil
+
+        return do_print
+
+    def __compile_input(self, call_ast):
+        interp = self.interp
+        args = call_ast.args
+        prompt = self.__compile_expr(args[0]) if len(args) == 1 else None
+        as_int = call_ast.name == "inputi"
+
+        def do_input():
+            if prompt is not None:
+                interp.output(get_printable(prompt()))
+            elif len(args) > 1:
+                interp.error(
+                    ErrorType.NAME_ERROR,
+                    "No inputi() function that takes > 1 parameter",
+                )
+            if as_int:
+                return int_value(interp.get_int_input())
+            return Value(Type.STRING, interp.get_input())
+
+        return do_input
+
+    # with tail set, compiles `return call_ast` instead: the closure returns a
+    # TailCall for run_call when the call can be eliminated
+    def __compile_call(self, call_ast, tail=False):
+        func_name = call_ast.name
+        if func_name == "print":
+            return self.__compile_print(call_ast)
+        if func_name == "inputi" or func_name == "inputs":
+            return self.__compile_input(call_ast)
+
+        interp = self.interp
+        env = self.env
+        environment = env.environment
+        cells = env.cells
+        bind_ref = env.bind_ref
+        get_func_by_name = self.__get_func_by_name
+        run_call = self.__run_call
+        cache = call_ast.cache
+        copy = copy_value
+        memory = interp.memory
+        if memory is not None:
+            line = call_ast.line
+
+            def copy(val):
+                return memory.copy(val, line)
+
+        actual_args = call_ast.args
+        # only a variable can be shared with a ref parameter, anything else
+        # is passed to it by value
+        actuals = [
+            (
+                self.__compile_expr(arg),
+                arg.name if arg.elem_type == InterpreterBase.VAR_DEF else None,
+            )
+            for arg in actual_args
+        ]
+        objref = call_ast.objref
+        obj_is_this = objref == InterpreterBase.THIS_DEF
+        func_addr = call_ast.addrs[func_name]
+        get_func = self.__reader(func_addr) if func_addr != UNBOUND else None
+
+        # resolve the callee, push its frame and bind the arguments
+        def begin(method):
+            obj_ref = interp.curr_obj if obj_is_this else objref
+            func_val = get_func(func_name) if get_func is not None else None
+            target = cache.resolve(
+                interp, env, func_val, obj_ref, get_func_by_name, method
+            )
+            lam = target.lam
+            if lam is not None:
+                env.push_lambda(lam)
+            else:
+                environment.append({})
+
+            for (formal_name, is_ref), (actual, var_name) in zip(target.formals, actuals):
+                if is_ref:
+                    result = actual()
+                    if var_name is not None and bind_ref(formal_name, var_name):
+                        continue
+                else:
+                    result = copy(actual())
+                env.create(formal_name, result)
+            return target
+
+        if not tail:
+
+            def call(method=None):
+                mark = len(cells)
+                return run_call(begin(method), mark)
+
+            return call
+
+        def tail_call(method=None):
+            mark = len(cells)
+            target = begin(method)
+            level = self.level
+            if level is None or level[1] is not None:
+                return copy(run_call(target, mark))
+            base, _, level_mark = level
+            return TailCall(target, env.fold(base, level_mark))
+
+        return tail_call
+
+    # run the body of a call begun by begin, and of every tail call it ends
+    # in, then release the Cells made since mark
+    def __run_call(self, target, mark):
+        env = self.env
+        base = len(env.environment) - 1
+        outer_level = self.level
+        meter = self.interp.meter
+        if meter is not None:
+            meter.enter()
+        profiler = self.interp.profiler
+        if profiler is not None:
+            profiler.enter(target)
+        if self.interp.memory is not None:
+            self.interp.memory.check()
+        while True:
+            self.level = (base, target.lam, mark)
+            return_val = self.__block(target.statements)()
+            if return_val.__class__ is not TailCall:
+                break
+            target = return_val.target
+            env.restack(base, return_val.frames)
+            if meter is not None:
+                meter.step()
+            if profiler is not None:
+                profiler.tail_call(target)
+        self.level = outer_level
+        if meter is not None:
+            meter.leave()
+        if profiler is not None:
+            profiler.leave()
+        if return_val is None:
+            return_val = self.interp.NIL_VALUE
+
+        if target.lam is not None:
+            env.pop_lambda(target.lam)
+        else:
+            env.pop()
+        if len(env.environment) > base:
+            # the frame tail calls folded the callers' frames into
+            env.truncate(base)
+        env.release_cells(mark)
+        return return_val
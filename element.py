@@ -1,23 +1,29 @@
-class Element:
-    def __init__(self, elem_type, **kwargs):
-        self.elem_type = elem_type
-        self.dict = {}
-        for key, value in kwargs.items():
-            self.dict[key] = value
+from sys import intern
+
+# Base of every AST node. FIELDS lists the node's fields in the order
+# __str__ prints them, so traces look the same whichever class built the node.
+# `line` is the source line of the node's first token, None for a node no
+# parser built.
+class Node:
+    __slots__ = ("elem_type", "line")
+    FIELDS = ()
 
     def get(self, key):
-        if key not in self.dict:
+        if key not in self.FIELDS:
             return None
-        return self.dict[key]
+        return getattr(self, key)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.FIELDS]
 
     def __str__(self):
         s = f"{self.elem_type}: "
-        for key, value in self.dict.items():
+        for key, value in self.items():
             s += key + ": " + self.__val(value) + ", "
         return s[0:-2]
 
     def __val(self, v):
-        if isinstance(v, Element):
+        if isinstance(v, Node):
             return "[" + str(v) + "]"
         if isinstance(v, list):
             s = ""
@@ -27,3 +33,212 @@ class Element:
                 return "[" + s[0:-2] + "]"
             return "[" + s + "]"
         return str(v)
+
+
+# Generic node holding its fields in a dict, for code that builds ASTs by
+# hand. parse_program builds the typed nodes below instead.
+class Element(Node):
+    def __init__(self, elem_type, line=None, **kwargs):
+        self.elem_type = elem_type
+        self.line = line
+        self.dict = {}
+        for key, value in kwargs.items():
+            self.dict[key] = value
+
+    def get(self, key):
+        if key not in self.dict:
+            return None
+        return self.dict[key]
+
+    def items(self):
+        return self.dict.items()
+
+
+# Typed nodes: one class per node shape, with slots instead of a dict, so
+# the engines can load fields as plain attributes. Every field is always set
+# (to None when absent) and `addrs`/`cache` are filled in by resolver.py.
+class Program(Node):
+    __slots__ = ("functions",)
+    FIELDS = ("functions",)
+
+    def __init__(self, elem_type, functions, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.functions = functions
+
+
+class FuncDef(Node):
+    __slots__ = ("name", "args", "statements")
+    FIELDS = ("name", "args", "statements")
+
+    def __init__(self, elem_type, name, args, statements, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.name = name
+        self.args = args
+        self.statements = statements
+
+
+# a lambda is a nameless function; `name` is always None
+class LambdaDef(FuncDef):
+    __slots__ = ()
+    FIELDS = ("args", "statements")
+
+    def __init__(self, elem_type, args, statements, line=None):
+        super().__init__(elem_type, None, args, statements, line)
+
+
+class Arg(Node):
+    __slots__ = ("name",)
+    FIELDS = ("name",)
+
+    def __init__(self, elem_type, name, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.name = name
+
+
+class Assign(Node):
+    __slots__ = ("name", "expression", "addrs")
+    FIELDS = ("name", "expression")
+
+    def __init__(self, elem_type, name, expression, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.name = name
+        self.expression = expression
+        self.addrs = None
+
+
+# obj.field = expression. `name` is the dotted spelling, for traces
+class FieldAssign(Assign):
+    __slots__ = ("objref", "field")
+
+    def __init__(self, elem_type, objref, field, expression, line=None):
+        super().__init__(elem_type, intern(objref + "." + field), expression, line)
+        self.objref = intern(objref)
+        self.field = intern(field)
+
+
+class If(Node):
+    __slots__ = ("condition", "statements", "else_statements")
+    FIELDS = ("condition", "statements", "else_statements")
+
+    def __init__(self, elem_type, condition, statements, else_statements, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+
+class While(Node):
+    __slots__ = ("condition", "statements")
+    FIELDS = ("condition", "statements")
+
+    def __init__(self, elem_type, condition, statements, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.condition = condition
+        self.statements = statements
+
+
+class Return(Node):
+    __slots__ = ("expression",)
+    FIELDS = ("expression",)
+
+    def __init__(self, elem_type, expression, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.expression = expression
+
+
+class UnaryOp(Node):
+    __slots__ = ("op1",)
+    FIELDS = ("op1",)
+
+    def __init__(self, elem_type, op1, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.op1 = op1
+
+
+# elem_type is the operator itself, e.g. "+" or "<="
+class BinOp(Node):
+    __slots__ = ("op1", "op2")
+    FIELDS = ("op1", "op2")
+
+    def __init__(self, elem_type, op1, op2, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.op1 = op1
+        self.op2 = op2
+
+
+# int, bool and string constants
+class Literal(Node):
+    __slots__ = ("val",)
+    FIELDS = ("val",)
+
+    def __init__(self, elem_type, val, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.val = val
+
+
+# nil and @, which carry nothing but their type
+class Leaf(Node):
+    __slots__ = ()
+
+    def __init__(self, elem_type, line=None):
+        self.elem_type = elem_type
+        self.line = line
+
+
+class Var(Node):
+    __slots__ = ("name", "addrs")
+    FIELDS = ("name",)
+
+    def __init__(self, elem_type, name, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.name = name
+        self.addrs = None
+
+
+# obj.field read as an expression, split by the parser so the engines never
+# take names apart at runtime; `name` is the dotted spelling, for traces
+class FieldVar(Node):
+    __slots__ = ("objref", "field", "name", "addrs")
+    FIELDS = ("name",)
+
+    def __init__(self, elem_type, objref, field, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.objref = intern(objref)
+        self.field = intern(field)
+        self.name = intern(objref + "." + field)
+        self.addrs = None
+
+
+# a function call; `objref` is always None
+class Call(Node):
+    __slots__ = ("objref", "name", "args", "addrs", "cache")
+    FIELDS = ("name", "args")
+
+    def __init__(self, elem_type, name, args, objref=None, line=None):
+        self.elem_type = elem_type
+        self.line = line
+        self.objref = objref
+        self.name = name
+        self.args = args
+        self.addrs = None
+        self.cache = None
+
+
+class MethodCall(Call):
+    __slots__ = ()
+    FIELDS = ("objref", "name", "args")
+
+    def __init__(self, elem_type, objref, name, args, line=None):
+        super().__init__(elem_type, name, args, objref, line)
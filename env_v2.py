@@ -1,30 +1,176 @@
+# addresses handed out by resolver.py: a frame index, UNBOUND for names that can
+# never be variables, or None when only a runtime scan can find the symbol
+UNBOUND = "unbound"
+
+
+# A variable passed to a ref parameter. bind_ref puts the same Cell in the
+# variable's frame and under the parameter's name in the callee's frame, so a
+# write through either name is seen through the other straight away.
+class Cell:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+# frame itself, or a copy of it holding the values of its Cells instead
+def without_cells(frame):
+    for value in frame.values():
+        if value.__class__ is Cell:
+            return {
+                name: held.value if held.__class__ is Cell else held
+                for name, held in frame.items()
+            }
+    return frame
+
+
 # The EnvironmentManager class keeps a mapping between each variable name (aka symbol)
 # in a brewin program and the Value object, which stores a type, and a value.
+#
+# Lambdas capture the environment with capture(), which only copies the list of
+# frames. Every frame on the stack at that point becomes shared with the capture,
+# so the first write to one of them afterwards copies the frame and swaps the copy
+# into the stack (copy-on-write). frozen_below marks how far up the stack the last
+# capture reached, thawed holds the indices under it that have been copied since.
+#
+# cells lists (frame index, name, Cell) for every variable bind_ref or
+# link_to_caller turned into a Cell. The call that did so hands the mark it
+# took before binding its arguments to release_cells when it returns, which
+# turns them back into plain variables. Captures never see a Cell: while there
+# are any, capture copies the frames holding one with the values they hold at
+# that point.
 class EnvironmentManager:
     def __init__(self):
         self.environment = [{}]
+        self.frozen_below = 0
+        self.thawed = set()
+        self.cells = []
 
     # returns a VariableDef object
     def get(self, symbol):
         for env in reversed(self.environment):
             if symbol in env:
-                return env[symbol]
+                value = env[symbol]
+                if value.__class__ is Cell:
+                    return value.value
+                return value
 
         return None
 
     def set(self, symbol, value):
-        for env in reversed(self.environment):
-            if symbol in env:
-                env[symbol] = value
+        environment = self.environment
+        for index in range(len(environment) - 1, -1, -1):
+            if symbol in environment[index]:
+                held = environment[index][symbol]
+                if held.__class__ is Cell:
+                    held.value = value
+                else:
+                    self.writable(index)[symbol] = value
                 return
 
         # symbol not found anywhere in the environment
-        self.environment[-1][symbol] = value
+        self.writable(-1)[symbol] = value
+
+    # same as get, but goes straight to the frame the resolver picked for the symbol
+    def lookup(self, symbol, addr):
+        if addr is None:
+            return self.get(symbol)
+        if addr == UNBOUND:
+            return None
+        value = self.environment[addr].get(symbol)
+        if value.__class__ is Cell:
+            return value.value
+        return value
+
+    # same as set, but goes straight to the frame the resolver picked for the symbol
+    def assign(self, symbol, value, addr):
+        if addr is None:
+            self.set(symbol, value)
+            return
+        held = self.environment[addr].get(symbol)
+        if held.__class__ is Cell:
+            held.value = value
+        else:
+            self.writable(addr)[symbol] = value
 
     # create a new symbol in the top-most environment, regardless of whether that symbol exists
     # in a lower environment
     def create(self, symbol, value):
-        self.environment[-1][symbol] = value
+        self.writable(-1)[symbol] = value
+
+    # returns the frame at index, first copying it if a capture still shares it
+    def writable(self, index):
+        environment = self.environment
+        if index < 0:
+            index += len(environment)
+        if index < self.frozen_below and index not in self.thawed:
+            environment[index] = dict(environment[index])
+            self.thawed.add(index)
+        return environment[index]
+
+    # snapshot of every frame, for a lambda to flatten into its scope when first called
+    def capture(self):
+        self.frozen_below = len(self.environment)
+        self.thawed = set()
+        if not self.cells:
+            return tuple(self.environment)
+        return tuple(without_cells(frame) for frame in self.environment)
+
+    # binds the ref parameter formal in the top frame to the variable name in
+    # the frames under it, making the variable a Cell first if it isn't one.
+    # Returns False when there is no such variable to share.
+    def bind_ref(self, formal, name):
+        environment = self.environment
+        for index in range(len(environment) - 2, -1, -1):
+            held = environment[index].get(name)
+            if held is not None:
+                if held.__class__ is not Cell:
+                    held = Cell(held)
+                    self.writable(index)[name] = held
+                    self.cells.append((index, name, held))
+                self.writable(-1)[formal] = held
+                return True
+        return False
+
+    # Rebinding an object or lambda variable of its own inside a call rebinds
+    # the caller's variable of the same name too, which is how a closure
+    # points a variable it captured at a new object. Called before such an
+    # assignment in the call whose frame is at base: the call's binding of
+    # name and the caller's one (created in the caller's top frame if there
+    # is none) become the same Cell, so the assignment reaches both.
+    def link_to_caller(self, name, base):
+        environment = self.environment
+        for index in range(len(environment) - 1, base - 1, -1):
+            held = environment[index].get(name)
+            if held is not None:
+                break
+        else:
+            # the binding already is the caller's
+            return
+        if held.__class__ is Cell:
+            return
+        outer = None
+        for below in range(base - 1, -1, -1):
+            outer = environment[below].get(name)
+            if outer is not None:
+                break
+        if outer is None:
+            below = base - 1
+            outer = held
+        if outer.__class__ is not Cell:
+            outer = Cell(outer)
+            self.writable(below)[name] = outer
+            self.cells.append((below, name, outer))
+        self.writable(index)[name] = outer
+
+    # turns the variables made Cells since mark back into plain ones
+    def release_cells(self, mark):
+        cells = self.cells
+        environment = self.environment
+        while len(cells) > mark:
+            index, name, cell = cells.pop()
+            if index < len(environment) and environment[index].get(name) is cell:
+                self.writable(index)[name] = cell.value
 
     # used when we enter a nested block to create a new environment for that block
     def push(self):
@@ -33,3 +179,65 @@ class EnvironmentManager:
     # used when we exit a nested block to discard the environment for that block
     def pop(self):
         self.environment.pop()
+        if len(self.environment) < self.frozen_below:
+            self.frozen_below = len(self.environment)
+
+    # drop every frame from index length upwards
+    def truncate(self, length):
+        del self.environment[length:]
+        if length < self.frozen_below:
+            self.frozen_below = length
+
+    # for a tail call: takes the callee's frame off the top, and returns it with
+    # a single frame holding every binding the frames from index base up to it
+    # make visible, innermost first. restack puts the pair back at base once
+    # the caller's frames are done with. The caller's own variables the callee
+    # was passed by ref stop being Cells, as they would once the caller
+    # returned; mark is the one the caller's call took.
+    def fold(self, base, mark):
+        environment = self.environment
+        top = len(environment) - 1
+        callee = environment[top]
+        if top < self.frozen_below and top not in self.thawed:
+            callee = dict(callee)
+        self.pop()
+        merged = {}
+        for frame in environment[base:]:
+            merged.update(frame)
+        cells = self.cells
+        if any(index >= base for index, _, _ in cells[mark:]):
+            kept = []
+            for entry in cells[mark:]:
+                index, name, cell = entry
+                if index < base:
+                    kept.append(entry)
+                    continue
+                for frame in (merged, callee):
+                    for key, value in frame.items():
+                        if value is cell:
+                            frame[key] = cell.value
+            cells[mark:] = kept
+        return merged, callee
+
+    def restack(self, base, frames):
+        self.truncate(base)
+        self.environment.extend(frames)
+
+    # a lambda call runs in the lambda's own scope, which outlives the call
+    def push_lambda(self, lam):
+        lam.running += 1
+        self.environment.append(lam.scope_for_call())
+
+    # hand the scope back to the lambda, noting whether a capture made during the
+    # call still shares it. Its ref parameters keep the values they ended with.
+    def pop_lambda(self, lam):
+        index = len(self.environment) - 1
+        if self.cells:
+            scope = self.environment[index]
+            for name, value in scope.items():
+                if value.__class__ is Cell:
+                    self.writable(index)[name] = value.value
+        lam.lambda_scope = self.environment[index]
+        lam.shared = index < self.frozen_below and index not in self.thawed
+        lam.running -= 1
+        self.pop()
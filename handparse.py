@@ -0,0 +1,433 @@
+import gc
+import re
+
+from element import (
+    Arg,
+    Assign,
+    BinOp,
+    Call,
+    FieldAssign,
+    FieldVar,
+    FuncDef,
+    If,
+    LambdaDef,
+    Leaf,
+    Literal,
+    MethodCall,
+    Program,
+    Return,
+    UnaryOp,
+    Var,
+    While,
+)
+from intbase import InterpreterBase
+
+# Hand-written front end: a single regex scan for the lexer and a
+# recursive-descent parser over it, building the same ast as
+# brewparse.parse_program without importing ply.
+#
+# It mirrors the ply pair closely enough to print the same messages too.
+# "Illegal character" lines are printed when the parser reaches them rather
+# than when the source is scanned, which is when ply's lazy lexer prints
+# them, and the parser never looks more than one token ahead, so a syntax
+# error is reported at the same token yacc reports it at. Error recovery also matches yacc's with no error
+# rules: everything parsed so far is dropped, tokens are skipped up to the
+# next `func`, and parsing starts over there. Another error is only reported
+# once ERROR_COUNT tokens have been consumed since the last one, and the
+# functions parsed after the last error are what a malformed program parses
+# to (None when there are none).
+
+# one match per token or comment; whitespace the lexer ignores is skipped
+# between matches, and anything else falls through to a single character
+TOKEN_RE = re.compile(
+    r"""
+    /\*[\s\S]*?\*/
+    |\d+
+    |[A-Za-z_]\w*
+    |".*?"
+    |[=!<>]=|&&|\|\||[(){},.;@=<>+\-*/!]
+    |\n+
+    |[^ \t\n]
+    """,
+    re.VERBOSE,
+)
+
+KEYWORDS = {
+    "func": "FUNC",
+    "if": "IF",
+    "else": "ELSE",
+    "while": "WHILE",
+    "return": "RETURN",
+    "true": "TRUE",
+    "false": "FALSE",
+    "nil": "NIL",
+    "lambda": "LAMBDA",
+    "ref": "REF",
+}
+
+OPERATORS = {
+    "(": "LPAREN",
+    ")": "RPAREN",
+    "{": "LBRACE",
+    "}": "RBRACE",
+    ",": "COMMA",
+    ".": "DOT",
+    ";": "SEMI",
+    "@": "AT",
+    "==": "EQ",
+    "!=": "NOT_EQ",
+    ">=": "GREATER_EQ",
+    ">": "GREATER",
+    "<=": "LESS_EQ",
+    "<": "LESS",
+    "=": "ASSIGN",
+    "+": "PLUS",
+    "-": "MINUS",
+    "*": "MULTIPLY",
+    "/": "DIVIDE",
+    "&&": "AND",
+    "||": "OR",
+    "!": "NOT",
+}
+
+# binary operator token -> precedence level, as in brewparse.precedence
+BINARY_LEVELS = {
+    "OR": 1,
+    "AND": 2,
+    "EQ": 3,
+    "NOT_EQ": 3,
+    "GREATER_EQ": 3,
+    "GREATER": 3,
+    "LESS_EQ": 3,
+    "LESS": 3,
+    "PLUS": 4,
+    "MINUS": 4,
+    "MULTIPLY": 5,
+    "DIVIDE": 5,
+}
+
+# operators and keywords, whose text decides their type
+TOKEN_KINDS = {**OPERATORS, **KEYWORDS}
+
+END = "$end"
+ERROR_COUNT = 3  # yacc's error_count
+
+
+# (token type, value, line) triples like the ply lexer's, ending in
+# (END, None, line). Characters ply would report as illegal stay in the list
+# as ("error", char, line) so the parser can report them when it gets that
+# far, as ply does. Lines are counted the way brewlex counts them: newlines
+# between tokens and inside comments.
+def tokens(program):
+    kinds = TOKEN_KINDS
+    out = []
+    append = out.append
+    line = 1
+    for text in TOKEN_RE.findall(program):
+        kind = kinds.get(text)
+        if kind is not None:
+            append((kind, text, line))
+            continue
+        c = text[0]
+        if c == "\n":
+            line += len(text)
+        elif c == "_" or "a" <= c <= "z" or "A" <= c <= "Z":
+            append(("NAME", text, line))
+        elif c.isdecimal():
+            append(("NUMBER", int(text), line))
+        elif c == '"':
+            if len(text) > 1:
+                append(("STRING", text[1:-1], line))
+            else:
+                # listed in brewlex.literals, so ply passes it to the parser
+                append((text, text, line))
+        elif c != "/":
+            append(("error", text, line))
+        else:
+            # a comment
+            line += text.count("\n")
+    append((END, None, line))
+    return out
+
+
+class ParseError(Exception):
+    pass
+
+
+class Parser:
+    def __init__(self, program):
+        self.tokens = tokens(program)
+        self.index = -1
+        self.error_count = 0
+        self.__next()
+
+    def parse(self):
+        functions = []
+        while True:
+            try:
+                functions.append(self.__func())
+                if self.kind == END:
+                    return Program(
+                        InterpreterBase.PROGRAM_DEF,
+                        functions=functions,
+                        line=functions[0].line,
+                    )
+            except ParseError:
+                if self.error_count == 0:
+                    if self.kind == END:
+                        print("Syntax error at EOF")
+                    else:
+                        print(f"Syntax error at '{self.value}'")
+                self.error_count = ERROR_COUNT
+                functions = []
+                # drop the offending token, then everything up to the next func
+                while self.kind != END:
+                    self.__next()
+                    if self.kind == "FUNC":
+                        break
+                if self.kind == END:
+                    return None
+
+    # consume the current token
+    def __advance(self):
+        if self.error_count:
+            self.error_count -= 1
+        self.index += 1
+        self.kind, self.value, self.line = self.tokens[self.index]
+        if self.kind == "error":
+            self.__skip_illegal()
+
+    def __next(self):
+        self.index += 1
+        self.kind, self.value, self.line = self.tokens[self.index]
+        if self.kind == "error":
+            self.__skip_illegal()
+
+    def __skip_illegal(self):
+        while self.kind == "error":
+            print(f"Illegal character {self.value}")
+            self.index += 1
+            self.kind, self.value, self.line = self.tokens[self.index]
+
+    def __expect(self, kind):
+        if self.kind != kind:
+            raise ParseError()
+        value = self.value
+        self.__advance()
+        return value
+
+    def __func(self):
+        line = self.line
+        self.__expect("FUNC")
+        name = self.__expect("NAME")
+        args, statements = self.__body()
+        return FuncDef(
+            InterpreterBase.FUNC_DEF, name=name, args=args, statements=statements, line=line
+        )
+
+    def __lambda(self):
+        line = self.line
+        self.__advance()
+        args, statements = self.__body()
+        return LambdaDef(
+            InterpreterBase.LAMBDA_DEF, args=args, statements=statements, line=line
+        )
+
+    # ( formal_args ) { statements }
+    def __body(self):
+        self.__expect("LPAREN")
+        args = []
+        if self.kind != "RPAREN":
+            args.append(self.__formal_arg())
+            while self.kind == "COMMA":
+                self.__advance()
+                args.append(self.__formal_arg())
+        self.__expect("RPAREN")
+        return args, self.__block()
+
+    def __formal_arg(self):
+        line = self.line
+        if self.kind == "REF":
+            self.__advance()
+            return Arg(InterpreterBase.REFARG_DEF, name=self.__expect("NAME"), line=line)
+        return Arg(InterpreterBase.ARG_DEF, name=self.__expect("NAME"), line=line)
+
+    # { statements }, which may not be empty
+    def __block(self):
+        self.__expect("LBRACE")
+        statements = [self.__statement()]
+        while self.kind != "RBRACE":
+            statements.append(self.__statement())
+        self.__advance()
+        return statements
+
+    def __statement(self):
+        kind = self.kind
+        line = self.line
+        if kind == "NAME":
+            # a variable, then = decides between an assignment and an
+            # expression starting with that variable
+            name = self.value
+            self.__advance()
+            if self.kind == "DOT":
+                self.__advance()
+                field = self.__expect("NAME")
+            else:
+                field = None
+            if self.kind == "ASSIGN":
+                self.__advance()
+                expression = self.__expression()
+                self.__expect("SEMI")
+                if field is not None:
+                    return FieldAssign(
+                        InterpreterBase.FIELD_ASSIGN_DEF,
+                        objref=name,
+                        field=field,
+                        expression=expression,
+                        line=line,
+                    )
+                return Assign("=", name=name, expression=expression, line=line)
+            expression = self.__expression(1, self.__name(name, field, line))
+            self.__expect("SEMI")
+            return expression
+        if kind == "IF":
+            self.__advance()
+            condition = self.__condition()
+            statements = self.__block()
+            else_statements = None
+            if self.kind == "ELSE":
+                self.__advance()
+                else_statements = self.__block()
+            return If(
+                InterpreterBase.IF_DEF,
+                condition=condition,
+                statements=statements,
+                else_statements=else_statements,
+                line=line,
+            )
+        if kind == "WHILE":
+            self.__advance()
+            condition = self.__condition()
+            return While(
+                InterpreterBase.WHILE_DEF,
+                condition=condition,
+                statements=self.__block(),
+                line=line,
+            )
+        if kind == "RETURN":
+            self.__advance()
+            expression = None
+            if self.kind != "SEMI":
+                expression = self.__expression()
+            self.__expect("SEMI")
+            return Return(InterpreterBase.RETURN_DEF, expression=expression, line=line)
+        expression = self.__expression()
+        self.__expect("SEMI")
+        return expression
+
+    def __condition(self):
+        self.__expect("LPAREN")
+        condition = self.__expression()
+        self.__expect("RPAREN")
+        return condition
+
+    # binary operators at level or above, by precedence climbing; left is
+    # an operand the caller already parsed
+    def __expression(self, level=1, left=None):
+        if left is None:
+            left = self.__unary()
+        while True:
+            op_level = BINARY_LEVELS.get(self.kind)
+            if op_level is None or op_level < level:
+                return left
+            op = self.value
+            self.__advance()
+            right = self.__expression(op_level + 1)
+            left = BinOp(op, op1=left, op2=right, line=left.line)
+
+    def __unary(self):
+        kind = self.kind
+        line = self.line
+        if kind == "NOT":
+            self.__advance()
+            return UnaryOp(InterpreterBase.NOT_DEF, op1=self.__unary(), line=line)
+        if kind == "MINUS":
+            self.__advance()
+            return UnaryOp(InterpreterBase.NEG_DEF, op1=self.__unary(), line=line)
+        return self.__primary()
+
+    def __primary(self):
+        kind = self.kind
+        value = self.value
+        line = self.line
+        if kind == "NAME":
+            self.__advance()
+            field = None
+            if self.kind == "DOT":
+                self.__advance()
+                field = self.__expect("NAME")
+            return self.__name(value, field, line)
+        if kind == "NUMBER":
+            self.__advance()
+            return Literal(InterpreterBase.INT_DEF, val=value, line=line)
+        if kind == "STRING":
+            self.__advance()
+            return Literal(InterpreterBase.STRING_DEF, val=value, line=line)
+        if kind == "TRUE" or kind == "FALSE":
+            self.__advance()
+            return Literal(
+                InterpreterBase.BOOL_DEF, val=value == InterpreterBase.TRUE_DEF, line=line
+            )
+        if kind == "LPAREN":
+            self.__advance()
+            expression = self.__expression()
+            self.__expect("RPAREN")
+            return expression
+        if kind == "NIL":
+            self.__advance()
+            return Leaf(InterpreterBase.NIL_DEF, line=line)
+        if kind == "AT":
+            self.__advance()
+            return Leaf(InterpreterBase.OBJ_DEF, line=line)
+        if kind == "LAMBDA":
+            return self.__lambda()
+        raise ParseError()
+
+    # what follows name or name.field, which started on line: a call, a
+    # method call or a variable
+    def __name(self, name, field, line):
+        if self.kind != "LPAREN":
+            if field is not None:
+                return FieldVar(
+                    InterpreterBase.FIELD_DEF, objref=name, field=field, line=line
+                )
+            return Var(InterpreterBase.VAR_DEF, name=name, line=line)
+        self.__advance()
+        args = []
+        if self.kind != "RPAREN":
+            args.append(self.__expression())
+            while self.kind == "COMMA":
+                self.__advance()
+                args.append(self.__expression())
+        self.__expect("RPAREN")
+        if field is None:
+            return Call(InterpreterBase.FCALL_DEF, name=name, args=args, line=line)
+        return MethodCall(
+            InterpreterBase.MCALL_DEF, objref=name, name=field, args=args, line=line
+        )
+
+
+# exported function, a drop-in for brewparse.parse_program
+def parse_program(program):
+    # tokens and nodes never form cycles, so collecting while millions of
+    # them pile up would only cost time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        ast = Parser(program).parse()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if ast is None:
+        raise SyntaxError("Syntax error")
+    return ast
@@ -0,0 +1,164 @@
+from intbase import ErrorType, InterpreterBase
+from type_valuev2 import Type
+
+# Polymorphic inline caches for fcall/mcall sites, shared by every engine.
+# resolver.py hangs a CallCache on each call node. Resolving a callee Value
+# to the function ast and formals to run only depends on the function it
+# holds: the overloads of a named function, or a lambda's ast. A site
+# remembers the last few of those it called by identity, and hands a lambda's
+# target the scope to run in per call. It never keeps a lambda itself, which
+# would keep alive the scope it captured, and through it the objects of a run
+# that has finished, since a compiled program's ast outlives its runs. A site
+# that sees more than MAX_ENTRIES different callees goes megamorphic and
+# resolves every call from scratch.
+#
+# A compiled program's sites are shared by every run of it, on any thread, so
+# what a site remembers together is kept in one tuple that is swapped in
+# whole: a reader never sees the callee of one update with the target of
+# another.
+MAX_ENTRIES = 4
+
+
+# everything a call needs once its callee is known
+class CallTarget:
+    __slots__ = ("func_ast", "statements", "lam", "formals", "site", "cached")
+
+    def __init__(self, func_ast, lam, site):
+        self.func_ast = func_ast
+        self.statements = func_ast.statements
+        # the lambda whose scope the call runs in, None for a fresh frame
+        self.lam = lam
+        self.formals = [
+            (arg.name, arg.elem_type == InterpreterBase.REFARG_DEF)
+            for arg in func_ast.args
+        ]
+        # the CallCache of the site calling it
+        self.site = site
+        # the CachedCall shared by every call of func_ast from site
+        self.cached = None
+
+    # the same target, running in lam's scope; lam keeps the latest one made
+    def bind(self, lam):
+        target = lam.bound
+        if target is not None and target.cached is self.cached:
+            return target
+        target = lam.bound = CallTarget.__new__(CallTarget)
+        target.func_ast = self.func_ast
+        target.statements = self.statements
+        target.lam = lam
+        target.formals = self.formals
+        target.site = self.site
+        target.cached = self.cached
+        return target
+
+
+# What a site keeps about one callee: its target without a scope, and the
+# name profiler.py gives the call, filled in by the first profiled run making it.
+class CachedCall:
+    __slots__ = ("target", "label")
+
+    def __init__(self, target):
+        self.target = target
+        self.label = None
+        target.cached = self
+
+
+class CallCache:
+    def __init__(self, call_ast):
+        self.name = call_ast.name
+        self.objref = call_ast.objref
+        self.num_args = len(call_ast.args)
+        self.obj_addr = call_ast.addrs.get(call_ast.objref)
+        # (key, CallTarget) seen last, checked before the polymorphic entries
+        self.last = (None, None)
+        # (key, CallTarget), where the key is a lambda's ast or the overloads
+        # of a function; the targets have no lam
+        self.entries = []
+        self.megamorphic = False
+        self.named = None  # target when the call goes to a top-level function
+        # (shape, slot) of the method in the last object called through this site
+        self.seen = (None, None)
+
+    # the method field of obj, straight from the slot when obj has the
+    # shape seen last time; raises like get_field when there is none
+    def method(self, obj):
+        shape = obj.shape
+        seen_shape, seen_slot = self.seen
+        if shape is seen_shape:
+            return obj.slots[seen_slot]
+        slot = shape.slot(self.name)
+        if slot is None:
+            return obj.get_field(self.name)
+        self.seen = (shape, slot)
+        return obj.slots[slot]
+
+    # same lookup order and errors as the tree walker's __call_func: a
+    # lambda or function variable, then the object's field, then a function.
+    # An mcall passes the method its check just found as method.
+    def resolve(self, interp, env, func_val, obj_ref, get_func_by_name, method=None):
+        if func_val is not None and (
+            func_val.t == Type.LAMBDA or func_val.t == Type.FUNCTION
+        ):
+            callee = func_val
+        elif method is not None:
+            callee = method
+        elif obj_ref is not None:
+            obj = env.lookup(obj_ref, self.obj_addr)
+            if obj.t != Type.OBJECT:
+                interp.error(ErrorType.TYPE_ERROR, f"{obj_ref} is not an object!")
+            obj = obj.v
+            try:
+                seen_shape, seen_slot = self.seen
+                if obj.shape is seen_shape:
+                    callee = obj.slots[seen_slot]
+                else:
+                    callee = self.method(obj)
+            except:
+                interp.error(
+                    ErrorType.NAME_ERROR, f"{self.name} not a field of Object {obj_ref}"
+                )
+        elif func_val is not None:
+            interp.error(ErrorType.TYPE_ERROR, "Invalid Function/Lambda call")
+        else:
+            if self.named is None:
+                target = CallTarget(
+                    get_func_by_name(self.name, self.num_args), None, self
+                )
+                CachedCall(target)
+                self.named = target
+            return self.named
+
+        lam = None
+        key = callee.v
+        if callee.t == Type.LAMBDA:
+            lam = key
+            key = lam.lambda_func
+        last_key, last_target = self.last
+        if key is last_key:
+            return last_target if lam is None else last_target.bind(lam)
+        for entry_key, target in self.entries:
+            if entry_key is key:
+                self.last = (key, target)
+                return target if lam is None else target.bind(lam)
+        if lam is not None:
+            target = CallTarget(key, None, self)
+        else:
+            for index in key:
+                target = CallTarget(key[index], None, self)
+                break
+        if self.num_args != len(target.formals):
+            if func_val is not None:
+                interp.error(ErrorType.TYPE_ERROR, "Invalid args for functions")
+            interp.error(
+                ErrorType.NAME_ERROR,
+                f"Function {target.func_ast.name} with {self.num_args} args not found",
+            )
+        CachedCall(target)
+        if not self.megamorphic:
+            if len(self.entries) < MAX_ENTRIES:
+                self.entries.append((key, target))
+            else:
+                self.entries = []
+                self.megamorphic = True
+        self.last = (key, target)
+        return target if lam is None else target.bind(lam)
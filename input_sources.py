@@ -0,0 +1,189 @@
+import mmap
+import os
+from itertools import islice
+
+# Where inputi() and inputs() read their values from. A source has read(),
+# the next value as a str, or None once it has run out, and read_int(), the
+# next value as an int (int(None) raises, as it always has past the end of an
+# input list). interactive is set on sources that wait for a person to type,
+# so pending output is flushed before reading from them.
+#
+# Sources that read from a file keep only the chunk they are working through
+# in memory, so an input of any size can be streamed into a long run.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+# the values of a list, one after the other
+class ListSource:
+    interactive = False
+
+    def __init__(self, values):
+        self.values = values
+        self.cursor = 0
+
+    def read(self):
+        if self.cursor < len(self.values):
+            value = self.values[self.cursor]
+            self.cursor += 1
+            return value
+        return None
+
+    def read_int(self):
+        return int(self.read())
+
+
+# the values of any iterable; a str loses its line ending, so a file's lines work
+class IteratorSource:
+    interactive = False
+
+    def __init__(self, iterable, chunk_size=1024):
+        self.iterator = iter(iterable)
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.next = 0
+
+    # takes values off the iterator chunk_size at a time
+    def __next_value(self):
+        if self.next == len(self.chunk):
+            self.chunk = list(islice(self.iterator, self.chunk_size))
+            self.next = 0
+            if not self.chunk:
+                return None
+        value = self.chunk[self.next]
+        self.next += 1
+        return value
+
+    def read(self):
+        value = self.__next_value()
+        if value.__class__ is str:
+            return value.rstrip("\r\n")
+        return value
+
+    def read_int(self):
+        return int(self.__next_value())
+
+
+# Lines of a file object opened in text or binary mode, read chunk_size at a
+# time. read_int hands a line of a binary file straight to int(), which
+# takes bytes, so integers are never decoded first.
+class StreamSource:
+    interactive = False
+
+    def __init__(self, stream, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8"):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.lines = []
+        self.next = 0
+        # the start of a line the last chunk ended in the middle of
+        self.partial = None
+        self.at_end = False
+
+    # reads chunks until at least one whole line is buffered or the stream ends
+    def __fill(self):
+        while not self.at_end:
+            chunk = self.stream.read(self.chunk_size)
+            partial = self.partial
+            if not chunk:
+                self.at_end = True
+                self.lines = [partial] if partial else []
+                self.next = 0
+                self.partial = None
+                return
+            if partial:
+                chunk = partial + chunk
+            lines = chunk.split(b"\n" if chunk.__class__ is bytes else "\n")
+            self.partial = lines.pop()
+            if lines:
+                self.lines = lines
+                self.next = 0
+                return
+
+    def __next_line(self):
+        if self.next == len(self.lines):
+            self.__fill()
+            if self.next == len(self.lines):
+                return None
+        line = self.lines[self.next]
+        self.next += 1
+        return line
+
+    def read(self):
+        line = self.__next_line()
+        if line is None:
+            return None
+        if line.__class__ is bytes:
+            line = line.decode(self.encoding)
+        return line.rstrip("\r")
+
+    def read_int(self):
+        return int(self.__next_line())
+
+
+# Lines of a memory-mapped file, given as a path or an mmap.mmap (or any
+# buffer with find). Each line is sliced straight out of the mapping, so the
+# file is paged in by the OS as it is read and never copied as a whole.
+class MmapSource:
+    interactive = False
+
+    def __init__(self, file, encoding="utf-8"):
+        self.encoding = encoding
+        self.pos = 0
+        if isinstance(file, (str, bytes, os.PathLike)):
+            with open(file, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # an empty file can't be mapped
+                    self.mapped = b""
+                else:
+                    self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.mapped = file
+
+    def __next_line(self):
+        mapped = self.mapped
+        pos = self.pos
+        if pos >= len(mapped):
+            return None
+        end = mapped.find(b"\n", pos)
+        if end < 0:
+            end = len(mapped)
+        self.pos = end + 1
+        return mapped[pos:end]
+
+    def read(self):
+        line = self.__next_line()
+        if line is None:
+            return None
+        return line.decode(self.encoding).rstrip("\r")
+
+    def read_int(self):
+        return int(self.__next_line())
+
+
+# the keyboard
+class ConsoleSource:
+    interactive = True
+
+    def read(self):
+        return input()
+
+    def read_int(self):
+        return int(input())
+
+
+# the source for what was passed as an interpreter's inp: nothing (or an
+# empty list) reads the keyboard, a list its values, an mmap or a file
+# object its lines, anything else iterable its values, and a source is used
+# as it is
+def input_source(inp):
+    if not inp and (inp is None or isinstance(inp, (list, tuple))):
+        return ConsoleSource()
+    if isinstance(inp, (list, tuple)):
+        return ListSource(inp)
+    if hasattr(inp, "read_int"):
+        return inp
+    if isinstance(inp, mmap.mmap):
+        return MmapSource(inp)
+    if hasattr(inp, "read"):
+        return StreamSource(inp)
+    return IteratorSource(inp)
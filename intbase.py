@@ -1,11 +1,19 @@
 # Base class for our interpreter
 from enum import Enum
 
+from input_sources import input_source
+from output_sinks import ListSink, StreamSink, TeeSink
+
 
 class ErrorType(Enum):
     TYPE_ERROR = 1
     NAME_ERROR = 2  # if a variable or function name can't be found
     FAULT_ERROR = 3  # used if an object reference is null and used to make a call
+    # raised when a run goes over a limit of its budget.Budget
+    STEP_LIMIT_ERROR = 4
+    DEPTH_LIMIT_ERROR = 5
+    OBJECT_LIMIT_ERROR = 6
+    TIME_LIMIT_ERROR = 7
     # Add others here
 
 
@@ -30,41 +38,65 @@ class InterpreterBase:
     FALSE_DEF = "false"
     THIS_DEF = "this"
     VAR_DEF = "var"
+    FIELD_DEF = "field"
+    FIELD_ASSIGN_DEF = "field="
     OBJ_DEF = "@"
     NOT_DEF = "!"
 
     # methods
-    def __init__(self, console_output=True, inp=None):
+    # output_sink is one of the sinks in output_sinks.py, taking the place of
+    # the default: a list, plus stdout if console_output is set
+    def __init__(self, console_output=True, inp=None, output_sink=None):
         self.console_output = console_output
-        self.inp = inp  # if not none, then read input from passed-in list
+        # if not none, then read input from passed-in list, iterable, file
+        # object, mmap or source from input_sources.py
+        self.inp = inp
+        self.output_sink = output_sink
         self.reset()
 
     # Call to reset I/O for another run of the program
     def reset(self):
-        self.output_log = []
-        self.input_cursor = 0
+        log = ListSink()
+        if self.output_sink is not None:
+            self.sink = self.output_sink
+            log = self.sink if isinstance(self.sink, ListSink) else None
+        elif self.console_output:
+            self.sink = TeeSink(StreamSink(), log)
+        else:
+            self.sink = log
+        # the lines printed so far, as before output sinks; None when the
+        # sink given keeps no list of them
+        self.output_log = log.log if log is not None else None
+        self.source = input_source(self.inp)
         self.error_type = None
         self.error_line = None
 
+    # how many values of an input list have been read, as before input sources
+    @property
+    def input_cursor(self):
+        return getattr(self.source, "cursor", 0)
+
     # Students must implement this in their derived class
     def run(self, program):
         pass
 
     def get_input(self):
-        if not self.inp:
-            return input()  # Get input from keyboard if not input list provided
+        if self.source.interactive:
+            self.sink.flush()  # the prompt has to be out before we wait
+        return self.source.read()
 
-        if self.input_cursor < len(self.inp):
-            cur_input = self.inp[self.input_cursor]
-            self.input_cursor += 1
-            return cur_input
-        return None
+    # the next input as an int, for inputi()
+    def get_int_input(self):
+        if self.source.interactive:
+            self.sink.flush()
+        return self.source.read_int()
 
     # students must call this for any errors that they run into
     def error(self, error_type, description=None, line_num=None):
         # log the error before we throw
         self.error_line = line_num
         self.error_type = error_type
+        self.sink.flush()
 
         if description:
             description = ": " + description
@@ -75,12 +107,17 @@ class InterpreterBase:
         raise Exception(f"{error_type} on line {line_num}{description}")
 
     def output(self, v):
-        if self.console_output:
-            print(v)
-        self.output_log.append(v)
+        self.sink.write(v)
+
+    def flush_output(self):
+        self.sink.flush()
 
+    # every line printed so far, or as many as the sink keeps
     def get_output(self):
-        return self.output_log
+        lines = self.sink.lines()
+        if lines is None:
+            return []
+        return lines
 
     def get_error_type_and_line(self):
         return self.error_type, self.error_line
@@ -8,17 +8,21 @@ class Interpreter(InterpreterBase):
 
     
     def run(self, program):
-        self.ast = parse_program(program)
-        self.variable_map = {}
-        main_func_node = (self.ast.get('functions'))[0] 
+        try:
+            self.ast = parse_program(program)
+            self.variable_map = {}
+            main_func_node = (self.ast.get('functions'))[0] 
         
-        if main_func_node.get('name') != 'main':
-            super().error(
-                ErrorType.NAME_ERROR,
-                 "No main() function was found",
-            )
+            if main_func_node.get('name') != 'main':
+                super().error(
+                    ErrorType.NAME_ERROR,
+                     "No main() function was found",
+                )
 
-        self.run_func(main_func_node)                                
+            self.run_func(main_func_node)                                
+        finally:
+            # buffered output goes out even when the program fails
+            super().flush_output()
 
 
     def run_func(self, func_node):                  # function handling :(
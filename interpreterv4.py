@@ -1,12 +1,25 @@
-import copy
 from enum import Enum
 
 from brewparse import parse_program
+from bytecode_vm import VM
+from closure_compiler import ClosureCompiler
 from env_v2 import EnvironmentManager
+from handparse import parse_program as hand_parse_program
 from intbase import InterpreterBase, ErrorType
-from type_valuev2 import Type, Value, create_value, get_printable
+from type_valuev2 import (
+    Type,
+    Value,
+    bool_value,
+    copy_value,
+    create_value,
+    get_printable,
+    int_value,
+)
 from lambda_class import Lambda
 from object_class import Object
+from optimizer import optimize_program
+from resolver import BUILTINS, CALL_TYPES, resolve_program
+from tail_calls import TailCall
 
 class ExecStatus(Enum):
     CONTINUE = 1
@@ -18,31 +31,148 @@ class Interpreter(InterpreterBase):
     NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
     TRUE_VALUE = create_value(InterpreterBase.TRUE_DEF)
     BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+    # "tree" walks the ast directly, "closure" compiles it to python closures first,
+    # "vm" compiles it to bytecode and runs that without recursing on brewin calls
+    ENGINES = ("tree", "closure", "vm")
+    # "ply" is the brewparse front end, "hand" the hand-written one in handparse
+    PARSERS = ("ply", "hand")
 
     # methods
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    # program_cache is an optional program_cache.ProgramCache that parsed
+    # programs are loaded from and stored in. optimize runs optimizer.py over
+    # each program before it is resolved; it is off unless asked for, so a
+    # program runs the tree it was parsed to. output_sink is passed on to
+    # InterpreterBase, see output_sinks.py.
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        engine="tree",
+        program_cache=None,
+        parser="ply",
+        optimize=False,
+        output_sink=None,
+    ):
+        super().__init__(console_output, inp, output_sink)
+        if engine not in Interpreter.ENGINES:
+            raise ValueError(f"Unknown engine {engine}")
+        if parser not in Interpreter.PARSERS:
+            raise ValueError(f"Unknown parser {parser}")
         self.trace_output = trace_output
+        self.engine = engine
+        self.parser = parser
+        self.optimize = optimize
+        self.nodes_removed = 0  # by the optimizer, in the last program run
+        self.program_cache = program_cache
         self.__setup_ops()
         self.curr_obj = None
-        self.referenced_names = []
         self.closures = {}
+        # budget.Meter of the running program, None when it has no budget
+        self.meter = None
+        # profiler.Profiler of the running program, None when not profiled
+        self.profiler = None
+        # memory.MemoryTracker of the running program, None when not tracked
+        self.memory = None
+        # (base, lam, mark) of the running call, see tail_calls.py
+        self.call_level = None
 
     # run a program that's provided in a string
     # usese the provided Parser found in brewparse.py to parse the program
     # into an abstract syntax tree (ast)
-    def run(self, program):
-        ast = parse_program(program)
-        self.__set_up_function_table(ast)
-        self.env = EnvironmentManager()
+    # budget, a budget.Budget, limits what the program may use while it runs
+    # and profiler, a profiler.Profiler, samples where it spends its time;
+    # memory, a memory.MemoryTracker, accounts for what it allocates and copies
+    def run(self, program, budget=None, profiler=None, memory=None):
+        try:
+            self.__load_program(program)
+            self.__run_main(None, budget, profiler, memory)
+        finally:
+            # buffered output goes out even when the program fails
+            super().flush_output()
+
+    # parse, optimize and resolve program without running it, for
+    # program.compile; returns the function table and the optimizer's count
+    def load(self, program):
+        self.__load_program(program)
+        return self.func_name_to_ast, self.nodes_removed
+
+    # run a program.Program; compiler is its BytecodeCompiler for the vm
+    # engine, shared by every run of it
+    def run_program(
+        self, program, compiler=None, budget=None, profiler=None, memory=None
+    ):
+        self.func_name_to_ast = program.func_name_to_ast
+        self.nodes_removed = program.nodes_removed
+        try:
+            self.__run_main(compiler, budget, profiler, memory)
+        finally:
+            super().flush_output()
+
+    def __run_main(self, compiler, budget, profiler, memory):
+        self.call_level = None
+        self.meter = budget.start(self) if budget is not None else None
+        self.profiler = profiler
+        self.memory = memory
+        if memory is not None:
+            # the tracker's environment reports the frames it copies
+            self.env = memory.start(self)
+        else:
+            self.env = EnvironmentManager()
         main_func = self.__get_func_by_name("main", 0)
-        self.__run_statements(main_func.get("statements"))
+        if profiler is not None:
+            # shared bytecode has no line numbers for the profiler
+            compiler = None
+            profiler.start(main_func.line)
+        try:
+            if self.engine == "closure":
+                ClosureCompiler(self).run_function(main_func)
+            elif self.engine == "vm":
+                VM(self, compiler).run_function(main_func)
+            else:
+                self.__run_statements(main_func.statements)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+            if memory is not None:
+                memory.stop()
+
+    # a warm program cache hands back the function table directly
+    def __load_program(self, program):
+        variant = "optimized" if self.optimize else ""
+        if self.program_cache is not None:
+            entry = self.program_cache.load(program, variant)
+            if entry is not None:
+                self.func_name_to_ast, self.nodes_removed = entry
+                return
+        if self.parser == "hand":
+            ast = hand_parse_program(program)
+        else:
+            ast = parse_program(program)
+        self.nodes_removed = 0
+        if self.optimize:
+            self.nodes_removed = optimize_program(ast, self.__eval_constant)
+        self.__set_up_function_table(resolve_program(ast))
+        if self.program_cache is not None:
+            self.program_cache.store(
+                program, (self.func_name_to_ast, self.nodes_removed), variant
+            )
+
+    # the optimizer's evaluate: the value of an expression made of
+    # constants, or None if evaluating it raises
+    def __eval_constant(self, expr_ast):
+        error_type, error_line = self.error_type, self.error_line
+        try:
+            return self.__eval_expr(expr_ast)
+        except Exception:
+            self.error_type, self.error_line = error_type, error_line
+            return None
 
     def __set_up_function_table(self, ast):
         self.func_name_to_ast = {}
-        for func_def in ast.get("functions"):
-            func_name = func_def.get("name")
-            num_params = len(func_def.get("args"))
+        for func_def in ast.functions:
+            func_name = func_def.name
+            num_params = len(func_def.args)
             if func_name not in self.func_name_to_ast:
                 self.func_name_to_ast[func_name] = {}
             self.func_name_to_ast[func_name][num_params] = func_def
@@ -60,15 +190,21 @@ class Interpreter(InterpreterBase):
 
     def __run_statements(self, statements):
         self.env.push()
+        # the running call's frame in the profiler's stack
+        frame = self.profiler.stack[-1] if self.profiler is not None else None
         for statement in statements:
             if self.trace_output:
                 print(statement)
+            if frame is not None:
+                frame[1] = statement.line
             status = ExecStatus.CONTINUE
             if statement.elem_type == InterpreterBase.FCALL_DEF:
                 self.__call_func(statement)
             
             elif statement.elem_type == "=":
                 self.__assign(statement)
+            elif statement.elem_type == InterpreterBase.FIELD_ASSIGN_DEF:
+                self.__assign_field(statement)
             elif statement.elem_type == InterpreterBase.RETURN_DEF:
                 status, return_val = self.__do_return(statement)
             elif statement.elem_type == Interpreter.IF_DEF:
@@ -86,8 +222,8 @@ class Interpreter(InterpreterBase):
         self.env.pop()
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
-    def __call_func(self, call_node):
-        func_name = call_node.get("name")
+    def __call_func(self, call_node, method=None):
+        func_name = call_node.name
         
         if func_name == "print":
             return self.__call_print(call_node)
@@ -96,111 +232,103 @@ class Interpreter(InterpreterBase):
         if func_name == "inputs":
             return self.__call_input(call_node)
 
-        actual_args = call_node.get("args")
-        obj_ref = call_node.get('objref')
+        mark = len(self.env.cells)
+        return self.__run_call(self.__begin_call(call_node, method), mark)
+
+    # resolve the callee, push its frame and bind the arguments; a variable
+    # passed to a ref parameter is shared with it through a Cell
+    def __begin_call(self, call_node, method):
+        actual_args = call_node.args
+        obj_ref = call_node.objref
         if obj_ref == "this":
             obj_ref = self.curr_obj
-        
-        func_flag = False
-        obj_flag = False
-        
-        if self.env.get(func_name) is not None:
-            func_flag = True
-        #lambdas
-        if func_flag and self.env.get(func_name).type() == Type.LAMBDA:
-            func_ast = self.env.get(func_name).value().lambda_func
-            
-        #first class functions
-        elif func_flag and self.env.get(func_name).type() == Type.FUNCTION:
-            for index in self.env.get(func_name).value():
-                func_ast = self.env.get(func_name).value()[index]
-                break
-        
-        #object method call
-        elif obj_ref is not None:
-            obj_flag = True
-            obj = self.env.get(obj_ref)
-            if obj.t != Type.OBJECT:
-                super().error(
-                ErrorType.TYPE_ERROR,
-                f"{obj_ref} is not an object!",
-            )
-            try:
-                func_obj = obj.v.get_field(func_name)
-            except:
-                super().error(ErrorType.NAME_ERROR, f"{func_name} not a field of Object {obj_ref}")
-            if func_obj.t == Type.LAMBDA:
-                func_ast = func_obj.v.lambda_func
-                
-            elif func_obj.t == Type.FUNCTION:
-                for index in func_obj.v:
-                    func_ast = func_obj.v[index]
-                    break
-         
-        #base case       
-        elif func_flag:
-            super().error(
-                ErrorType.TYPE_ERROR,
-                f"Invalid Function/Lambda call",
-            )
-        
-        else:
-            func_ast = self.__get_func_by_name(func_name, len(actual_args))
-            
-        formal_args = func_ast.get("args")
-        if len(actual_args) != len(formal_args):
-            if self.env.get(func_name): #not None when first class or lambda -- call TYPE ERROR
-                super().error(
-                    ErrorType.TYPE_ERROR,
-                    f"Invalid args for functions",
-                )
-            super().error(
-                ErrorType.NAME_ERROR,
-                f"Function {func_ast.get('name')} with {len(actual_args)} args not found",
-            )
-        if func_flag and self.env.get(func_name).type() == Type.LAMBDA:
-            self.env.environment.append(self.env.get(func_name).value().lambda_scope)
-        elif obj_flag and self.env.get(obj_ref).value().get_field(func_name).type() == Type.LAMBDA:
-            self.env.environment.append(self.env.get(obj_ref).value().get_field(func_name).value().lambda_scope)
+
+        func_name = call_node.name
+        func_val = self.env.lookup(func_name, call_node.addrs[func_name])
+        target = call_node.cache.resolve(
+            self, self.env, func_val, obj_ref, self.__get_func_by_name, method
+        )
+        if target.lam is not None:
+            self.env.push_lambda(target.lam)
         else:
             self.env.push()
         
-        self.referenced_names.append({})
-        for formal_ast, actual_ast in zip(formal_args, actual_args):
-            if formal_ast.elem_type == Interpreter.REFARG_DEF:
+        for (arg_name, is_ref), actual_ast in zip(target.formals, actual_args):
+            if is_ref:
                 result = self.__eval_expr(actual_ast)
-                self.referenced_names[-1][actual_ast.get('name')] = formal_ast.get('name')
+                if actual_ast.elem_type == InterpreterBase.VAR_DEF and self.env.bind_ref(
+                    arg_name, actual_ast.name
+                ):
+                    continue
+            elif self.memory is not None:
+                result = self.memory.copy(self.__eval_expr(actual_ast), call_node.line)
             else:
-                result = copy.deepcopy(self.__eval_expr(actual_ast))
-            arg_name = formal_ast.get("name")
+                result = copy_value(self.__eval_expr(actual_ast))
             self.env.create(arg_name, result)
-        _, return_val = self.__run_statements(func_ast.get("statements"))
-        
-        for ref in self.referenced_names[-1]:
-            if '.' in ref:
-                obj_cand = ref[:ref.index(".")]
-                obj_field = ref[ref.index(".")+1:]
-                self.referenced_names[-1][ref] = self.env.get(obj_cand).v.get_field(obj_field)
-            else:
-                self.referenced_names[-1][ref] = self.env.get(self.referenced_names[-1][ref])
-                
-        self.env.pop()
+        return target
+
+    # run the body of a call begun by __begin_call, and of every tail call it
+    # ends in, then release the Cells made since mark
+    def __run_call(self, target, mark):
+        base = len(self.env.environment) - 1
+        outer_level = self.call_level
+        meter = self.meter
+        if meter is not None:
+            meter.enter()
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.enter(target)
+        if self.memory is not None:
+            self.memory.check()
+        while True:
+            self.call_level = (base, target.lam, mark)
+            _, return_val = self.__run_statements(target.statements)
+            if return_val.__class__ is not TailCall:
+                break
+            target = return_val.target
+            self.env.restack(base, return_val.frames)
+            if meter is not None:
+                meter.step()
+            if profiler is not None:
+                profiler.tail_call(target)
+        self.call_level = outer_level
+        if meter is not None:
+            meter.leave()
+        if profiler is not None:
+            profiler.leave()
         
-        for ref in self.referenced_names[-1]:
-            self.env.set(ref, self.referenced_names[-1][ref])
-        self.referenced_names.pop()
+        if target.lam is not None:
+            self.env.pop_lambda(target.lam)
+        else:
+            self.env.pop()
+        if len(self.env.environment) > base:
+            # the frame tail calls folded the callers' frames into
+            self.env.truncate(base)
+        self.env.release_cells(mark)
         return return_val
 
+    # return f(...): either a TailCall for __run_call to run in place of the
+    # running body, or f's return value when the call can't be eliminated
+    def __tail_call(self, call_node, method=None):
+        mark = len(self.env.cells)
+        target = self.__begin_call(call_node, method)
+        base, lam, level_mark = self.call_level
+        if lam is not None:
+            if self.memory is not None:
+                return self.memory.copy(self.__run_call(target, mark), call_node.line)
+            return copy_value(self.__run_call(target, mark))
+        return TailCall(target, self.env.fold(base, level_mark))
+
     def __call_print(self, call_ast):
         output = ""
-        for arg in call_ast.get("args"):
+        for arg in call_ast.args:
             result = self.__eval_expr(arg)  # result is a Value object
             output = output + get_printable(result)
         super().output(output)
         return Interpreter.NIL_VALUE
 
     def __call_input(self, call_ast):
-        args = call_ast.get("args")
+        args = call_ast.args
         if args is not None and len(args) == 1:
             result = self.__eval_expr(args[0])
             super().output(get_printable(result))
@@ -208,50 +336,53 @@ class Interpreter(InterpreterBase):
             super().error(
                 ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
             )
-        inp = super().get_input()
-        if call_ast.get("name") == "inputi":
-            return Value(Type.INT, int(inp))
-        if call_ast.get("name") == "inputs":
-            return Value(Type.STRING, inp)
+        if call_ast.name == "inputi":
+            return int_value(super().get_int_input())
+        if call_ast.name == "inputs":
+            return Value(Type.STRING, super().get_input())
 
     def __assign(self, assign_ast):
-        var_name = assign_ast.get("name")
+        var_name = assign_ast.name
+        var_addr = assign_ast.addrs[var_name]
         if var_name == "this":
             var_name = self.curr_obj
-        value_obj = self.__eval_expr(assign_ast.get("expression"))
+        value_obj = self.__eval_expr(assign_ast.expression)
         
-        # handle class field assignment!!
-        if self.env.get(var_name) is not None and self.env.get(var_name).t in [Type.OBJECT, Type.LAMBDA]:
-            self.referenced_names.append({})
-            self.referenced_names[-1][var_name] = var_name
+        old_value = self.env.lookup(var_name, var_addr)
+        if old_value is not None and old_value.t in [Type.OBJECT, Type.LAMBDA]:
+            if self.call_level is not None:
+                self.env.link_to_caller(var_name, self.call_level[0])
         
-        if '.' in var_name:
-            obj_name = var_name[:var_name.index('.')]
-            if obj_name == "this": 
-                obj_name = self.curr_obj 
-            obj_candidate = self.env.get(obj_name)
-            if obj_candidate is None:
-                super().error(
-                ErrorType.NAME_ERROR,
-                f"{obj_name} not defined!",
-            )
-            if obj_candidate.t == Type.OBJECT:
-                field_name = var_name[var_name.index('.')+1:]
-                if field_name == "proto" and value_obj.t not in [Type.OBJECT, Type.NIL]:
-                    super().error(
-                        ErrorType.TYPE_ERROR,
-                        f"{obj_name} cannot be assigned proto of non-Object",
-                    ) 
-                (obj_candidate.v).set_field(field_name, value_obj)
-                
-            else:
+        self.env.assign(var_name, value_obj, var_addr)
+
+    # handle class field assignment!!
+    def __assign_field(self, assign_ast):
+        value_obj = self.__eval_expr(assign_ast.expression)
+        
+        obj_name = assign_ast.objref
+        obj_addr = assign_ast.addrs[obj_name]
+        if obj_name == "this": 
+            obj_name = self.curr_obj 
+        obj_candidate = self.env.lookup(obj_name, obj_addr)
+        if obj_candidate is None:
+            super().error(
+            ErrorType.NAME_ERROR,
+            f"{obj_name} not defined!",
+        )
+        if obj_candidate.t == Type.OBJECT:
+            field_name = assign_ast.field
+            if field_name == "proto" and value_obj.t not in [Type.OBJECT, Type.NIL]:
                 super().error(
-                ErrorType.TYPE_ERROR,
-                f"{obj_name} is not an object!",
-            )
+                    ErrorType.TYPE_ERROR,
+                    f"{obj_name} cannot be assigned proto of non-Object",
+                ) 
+            (obj_candidate.v).set_field(field_name, value_obj)
             
         else:
-            self.env.set(var_name, value_obj)    
+            super().error(
+            ErrorType.TYPE_ERROR,
+            f"{obj_name} is not an object!",
+        )
 
     def __eval_expr(self, expr_ast):
         # print("here expr")
@@ -260,39 +391,26 @@ class Interpreter(InterpreterBase):
             # print("getting as nil")
             return Interpreter.NIL_VALUE
         if expr_ast.elem_type == InterpreterBase.INT_DEF:
-            return Value(Type.INT, expr_ast.get("val"))
+            return int_value(expr_ast.val)
         if expr_ast.elem_type == InterpreterBase.STRING_DEF:
             # print("getting as str")
-            return Value(Type.STRING, expr_ast.get("val"))
+            return Value(Type.STRING, expr_ast.val)
         if expr_ast.elem_type == InterpreterBase.BOOL_DEF:
-            return Value(Type.BOOL, expr_ast.get("val"))
+            return bool_value(expr_ast.val)
         if expr_ast.elem_type == InterpreterBase.VAR_DEF:
-            var_name = expr_ast.get("name")
+            var_name = expr_ast.name
             # handle variable assignment to function name
             if var_name in self.func_name_to_ast:
                 if len(self.func_name_to_ast[var_name]) >= 2:  #check if assigned to overloaded func -- throw an error if so :(
                     super().error(ErrorType.NAME_ERROR, f"Attempted assignment to overloaded function")
                 return Value(Type.FUNCTION, self.func_name_to_ast[var_name])
             
-            if '.' in var_name:
-                obj_name = var_name[:var_name.index('.')]
-                if obj_name == "this":
-                    obj_name = self.curr_obj
-                field_name = var_name[var_name.index('.')+1:]
-                obj = self.env.get(obj_name)
-                if obj is None:
-                    super().error(ErrorType.NAME_ERROR, f"Object {obj_name} not found")
-                if obj.t != Type.OBJECT:
-                    super().error(ErrorType.TYPE_ERROR, f"{obj_name} not an Object")
-                try:
-                    return (obj.v).get_field(field_name)
-                except:
-                    super().error(ErrorType.NAME_ERROR, f"{field_name} not a field of Object {obj_name}")
-                
-            val = self.env.get(var_name)
+            val = self.env.lookup(var_name, expr_ast.addrs[var_name])
             if val is None:
                 super().error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
             return val
+        if expr_ast.elem_type == InterpreterBase.FIELD_DEF:
+            return self.__eval_field(expr_ast)
         if expr_ast.elem_type == InterpreterBase.FCALL_DEF:
             return self.__call_func(expr_ast)
         if expr_ast.elem_type in Interpreter.BIN_OPS:
@@ -304,25 +422,41 @@ class Interpreter(InterpreterBase):
         if expr_ast.elem_type == Interpreter.LAMBDA_DEF:
             return self.__handle_lambda(expr_ast)
         if expr_ast.elem_type == Interpreter.OBJ_DEF:
-            return self.__instantiate_obj()
+            return self.__instantiate_obj(expr_ast)
         if expr_ast.elem_type == Interpreter.MCALL_DEF:
             return self.__do_mcall(expr_ast)
 
+    def __eval_field(self, field_ast):
+        obj_name = field_ast.objref
+        obj_addr = field_ast.addrs[obj_name]
+        if obj_name == "this":
+            obj_name = self.curr_obj
+        field_name = field_ast.field
+        obj = self.env.lookup(obj_name, obj_addr)
+        if obj is None:
+            super().error(ErrorType.NAME_ERROR, f"Object {obj_name} not found")
+        if obj.t != Type.OBJECT:
+            super().error(ErrorType.TYPE_ERROR, f"{obj_name} not an Object")
+        try:
+            return (obj.v).get_field(field_name)
+        except:
+            super().error(ErrorType.NAME_ERROR, f"{field_name} not a field of Object {obj_name}")
+
     def __eval_op(self, arith_ast):
-        left_value_obj = self.__eval_expr(arith_ast.get("op1"))
-        right_value_obj = self.__eval_expr(arith_ast.get("op2"))
+        left_value_obj = self.__eval_expr(arith_ast.op1)
+        right_value_obj = self.__eval_expr(arith_ast.op2)
             
         if arith_ast.elem_type in ['==', '!=', '||', '&&']:
             if left_value_obj.type() == Type.INT:
-                left_value_obj = Value(Type.BOOL, bool(left_value_obj.value()))
+                left_value_obj = bool_value(left_value_obj.value())
             if right_value_obj.type() == Type.INT:
-                right_value_obj = Value(Type.BOOL, bool(right_value_obj.value()))
+                right_value_obj = bool_value(right_value_obj.value())
                 
         if arith_ast.elem_type in ['+', '-', '/', '*']:
             if left_value_obj.type() == Type.BOOL:
-                left_value_obj = Value(Type.INT, int(left_value_obj.value()))
+                left_value_obj = int_value(int(left_value_obj.value()))
             if right_value_obj.type() == Type.BOOL:
-                right_value_obj = Value(Type.INT, int(right_value_obj.value()))
+                right_value_obj = int_value(int(right_value_obj.value()))
                 
         if not self.__compatible_types(
             arith_ast.elem_type, left_value_obj, right_value_obj
@@ -352,111 +486,113 @@ class Interpreter(InterpreterBase):
         return obj1.type() == obj2.type()
 
     def __eval_unary(self, arith_ast, t, f):
-        value_obj = self.__eval_expr(arith_ast.get("op1"))
+        value_obj = self.__eval_expr(arith_ast.op1)
         if value_obj.type() != t and value_obj.type() != Type.INT:
             super().error(
                 ErrorType.TYPE_ERROR,
                 f"Incompatible type for {arith_ast.elem_type} operation",
             )
-        return Value(t, f(value_obj.value()))
+        if t == Type.BOOL:
+            return bool_value(f(value_obj.value()))
+        return int_value(f(value_obj.value()))
 
     def __setup_ops(self):
         self.op_to_lambda = {}
         # set up operations on integers
         self.op_to_lambda[Type.INT] = {}
-        self.op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
+        self.op_to_lambda[Type.INT]["+"] = lambda x, y: int_value(
+            x.value() + y.value()
         )
-        self.op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
-            x.type(), x.value() - y.value()
+        self.op_to_lambda[Type.INT]["-"] = lambda x, y: int_value(
+            x.value() - y.value()
         )
-        self.op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
-            x.type(), x.value() * y.value()
+        self.op_to_lambda[Type.INT]["*"] = lambda x, y: int_value(
+            x.value() * y.value()
         )
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
-            x.type(), x.value() // y.value()
+        self.op_to_lambda[Type.INT]["/"] = lambda x, y: int_value(
+            x.value() // y.value()
         )
-        self.op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.INT]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.INT]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
-        self.op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
-            Type.BOOL, x.value() < y.value()
+        self.op_to_lambda[Type.INT]["<"] = lambda x, y: bool_value(
+            x.value() < y.value()
         )
-        self.op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
-            Type.BOOL, x.value() <= y.value()
+        self.op_to_lambda[Type.INT]["<="] = lambda x, y: bool_value(
+            x.value() <= y.value()
         )
-        self.op_to_lambda[Type.INT][">"] = lambda x, y: Value(
-            Type.BOOL, x.value() > y.value()
+        self.op_to_lambda[Type.INT][">"] = lambda x, y: bool_value(
+            x.value() > y.value()
         )
-        self.op_to_lambda[Type.INT][">="] = lambda x, y: Value(
-            Type.BOOL, x.value() >= y.value()
+        self.op_to_lambda[Type.INT][">="] = lambda x, y: bool_value(
+            x.value() >= y.value()
         )
         #  set up operations on strings
         self.op_to_lambda[Type.STRING] = {}
         self.op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
             x.type(), x.value() + y.value()
         )
-        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: bool_value(
+            x.value() == y.value()
         )
-        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: bool_value(
+            x.value() != y.value()
         )
         #  set up operations on bools
         self.op_to_lambda[Type.BOOL] = {}
-        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: Value(
-            x.type(), x.value() and y.value()
+        self.op_to_lambda[Type.BOOL]["&&"] = lambda x, y: bool_value(
+            x.value() and y.value()
         )
-        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: Value(
-            x.type(), x.value() or y.value()
+        self.op_to_lambda[Type.BOOL]["||"] = lambda x, y: bool_value(
+            x.value() or y.value()
         )
-        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
 
         #  set up operations on nil
         self.op_to_lambda[Type.NIL] = {}
-        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
         
         #setting up lambda
         self.op_to_lambda[Type.LAMBDA] = {}
-        self.op_to_lambda[Type.LAMBDA]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.LAMBDA]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.LAMBDA]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.LAMBDA]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
         
         #setting up functions
         self.op_to_lambda[Type.FUNCTION] = {}
-        self.op_to_lambda[Type.FUNCTION]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.FUNCTION]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.FUNCTION]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.FUNCTION]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
         
         self.op_to_lambda[Type.OBJECT] = {}
-        self.op_to_lambda[Type.OBJECT]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.OBJECT]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.OBJECT]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.OBJECT]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
         
     def __do_if(self, if_ast):
-        cond_ast = if_ast.get("condition")
+        cond_ast = if_ast.condition
         result = self.__eval_expr(cond_ast)
         if result.type() != Type.BOOL and result.type() != Type.INT:
             super().error(
@@ -464,11 +600,11 @@ class Interpreter(InterpreterBase):
                 "Incompatible type for if condition",
             )
         if result.value():
-            statements = if_ast.get("statements")
+            statements = if_ast.statements
             status, return_val = self.__run_statements(statements)
             return (status, return_val)
         else:
-            else_statements = if_ast.get("else_statements")
+            else_statements = if_ast.else_statements
             if else_statements is not None:
                 status, return_val = self.__run_statements(else_statements)
                 return (status, return_val)
@@ -476,7 +612,7 @@ class Interpreter(InterpreterBase):
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     def __do_while(self, while_ast):
-        cond_ast = while_ast.get("condition")
+        cond_ast = while_ast.condition
         run_while = Interpreter.TRUE_VALUE
         while run_while.value():
             run_while = self.__eval_expr(cond_ast)
@@ -486,49 +622,71 @@ class Interpreter(InterpreterBase):
                     "Incompatible type for while condition",
                 )
             if run_while.value():
-                statements = while_ast.get("statements")
+                statements = while_ast.statements
                 status, return_val = self.__run_statements(statements)
                 if status == ExecStatus.RETURN:
                     return status, return_val
+                if self.meter is not None:
+                    self.meter.step()
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     def __do_return(self, return_ast):
-        expr_ast = return_ast.get("expression")
+        expr_ast = return_ast.expression
         if expr_ast is None:
             return (ExecStatus.RETURN, Interpreter.NIL_VALUE)
-        value_obj = copy.deepcopy(self.__eval_expr(expr_ast))
+        if (
+            self.call_level is not None
+            and expr_ast.elem_type in CALL_TYPES
+            and expr_ast.name not in BUILTINS
+        ):
+            method = None
+            if expr_ast.elem_type == Interpreter.MCALL_DEF:
+                method = self.__get_method(expr_ast)
+            return (ExecStatus.RETURN, self.__tail_call(expr_ast, method))
+        if self.memory is not None:
+            value_obj = self.memory.copy(self.__eval_expr(expr_ast), return_ast.line)
+        else:
+            value_obj = copy_value(self.__eval_expr(expr_ast))
         return (ExecStatus.RETURN, value_obj)
     
     def __handle_lambda(self, lambda_ast):
-        lambda_env = {}
-        env_copy = copy.deepcopy(self.env).environment
-        for item in reversed(env_copy):
-            for elem in item:
-                lambda_env[elem] = self.env.get(elem) 
-        return Value(Type.LAMBDA, Lambda(lambda_ast, lambda_env))
+        lam = Lambda(lambda_ast, self.env.capture())
+        if self.memory is not None:
+            self.memory.lambda_created(lam, lambda_ast.line)
+        return Value(Type.LAMBDA, lam)
     
-    def __instantiate_obj(self):
-        return Value(Type.OBJECT, Object())
+    def __instantiate_obj(self, obj_ast):
+        if self.meter is not None:
+            self.meter.allocate()
+        obj = Object()
+        if self.memory is not None:
+            self.memory.object_created(obj, obj_ast.line)
+        return Value(Type.OBJECT, obj)
     
     def __do_mcall(self, mcall_ast):
-        obj_name = mcall_ast.get('objref')
+        return self.__call_func(mcall_ast, self.__get_method(mcall_ast))
+
+    # the method an mcall calls, after checking there is one
+    def __get_method(self, mcall_ast):
+        obj_name = mcall_ast.objref
+        obj_addr = mcall_ast.addrs[obj_name]
         if obj_name == "this":
             obj_name = self.curr_obj
-        obj = self.env.get(obj_name)
+        obj = self.env.lookup(obj_name, obj_addr)
         if obj is None:
             super().error(ErrorType.NAME_ERROR, f"Object {obj_name} not found")
         if obj.t != Type.OBJECT:
             super().error(ErrorType.TYPE_ERROR, f"{obj_name} not an Object")
-        func_name = mcall_ast.get('name')
+        func_name = mcall_ast.name
         try:
-            method = obj.v.get_field(func_name)
+            method = mcall_ast.cache.method(obj.v)
         except:
             super().error(ErrorType.NAME_ERROR, f"{func_name} not a field of Object {obj_name}")
         if method.t not in [Type.LAMBDA, Type.FUNCTION]:
             super().error(ErrorType.TYPE_ERROR, f"{func_name} not a method")
         self.curr_obj = obj_name
-        return self.__call_func(mcall_ast)
+        return method
         
 
         
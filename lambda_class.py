@@ -1,7 +1,57 @@
+from env_v2 import Cell
+from type_valuev2 import Type, copy_value
+
+
 class Lambda():
-    def __init__(self, lam_func, scope):
-        self.lambda_scope = scope
+    def __init__(self, lam_func, captured):
         self.lambda_func = lam_func
-        
-    
-    
\ No newline at end of file
+        # frames from EnvironmentManager.capture, flattened on the first call
+        self.captured = captured
+        self.lambda_scope = None
+        # set when a lambda created during a call captured this scope, or a
+        # copy of this lambda shares it
+        self.shared = False
+        # calls in progress, which write to the scope in place
+        self.running = 0
+        # the inline_cache.CallTarget of the latest call, bound to this lambda
+        self.bound = None
+
+    # every captured variable plus the lambda's parameters, innermost frames win
+    def scope(self):
+        if self.lambda_scope is None:
+            self.lambda_scope = {}
+            for frame in self.captured:
+                self.lambda_scope.update(frame)
+            self.captured = None
+        return self.lambda_scope
+
+    def scope_for_call(self):
+        if self.shared:
+            self.lambda_scope = dict(self.lambda_scope)
+            self.shared = False
+        return self.scope()
+
+    # pass-by-value copy, memo maps id(original) to its copy so shared objects
+    # stay shared. Primitives are immutable, so a scope holding nothing else
+    # is shared with the copy until either is called (see scope_for_call).
+    def copy(self, memo):
+        clone = memo.get(id(self))
+        if clone is None:
+            clone = Lambda(self.lambda_func, None)
+            memo[id(self)] = clone
+            scope = self.scope()
+            refs = [
+                (name, val)
+                for name, val in scope.items()
+                if val.__class__ is Cell or val.t is Type.OBJECT or val.t is Type.LAMBDA
+            ]
+            if not refs and not self.running:
+                clone.lambda_scope = scope
+                clone.shared = self.shared = True
+            else:
+                scope = clone.lambda_scope = dict(scope)
+                for name, val in refs:
+                    if val.__class__ is Cell:
+                        val = val.value
+                    scope[name] = copy_value(val, memo)
+        return clone
@@ -0,0 +1,311 @@
+# Memory accounting for Brewin# programs: how much a run allocates, how much
+# of it the program keeps alive at its peak, and which source lines made the
+# copies:
+#
+#   tracker = MemoryTracker()
+#   Interpreter().run(source, memory=tracker)
+#   print(tracker.report())
+#
+# or from the command line:
+#
+#   python memory.py PROGRAM [--engine ENGINE] [--optimize] [--top N]
+#
+# Three things are measured:
+#
+#   heap     the bytes Python allocated during the run, now and at the peak,
+#            from tracemalloc, which the tracker starts for the run if it
+#            isn't tracing already. A trace that was already running keeps
+#            its own peak, so the run's peak is only known when it goes past
+#            that one; otherwise it is the most the heap held at any call,
+#            @, lambda or copy, and the report says it is at least that
+#   live     objects and lambdas are counted exactly: each one the run makes
+#            with @, lambda or a copy is held weakly until it is freed, and
+#            the peak is the most held at once (one caught in a reference
+#            cycle, like an object holding a lambda that captured it, is held
+#            until Python's cycle collector frees it). Values and environment
+#            frames are sampled: counting them walks everything reachable
+#            from the environment, so it is done at calls, @, lambdas and
+#            copies, and only once the heap has grown by CENSUS_GROWTH since
+#            the last count. Their peak is the most seen by any count.
+#   copies   what the run allocated and copied, by the line that caused it:
+#              @          objects created
+#              lambda     lambdas created
+#              copy       pass-by-value copies of arguments and return values
+#              frame      frames a lambda's capture shared, copied when next
+#                         written to (charged to the latest lambda created)
+#              scope      a lambda's captured frames merged into its scope on
+#                         its first call, or its scope copied because a lambda
+#                         made during a call captured it
+#            Bytes are sys.getsizeof estimates of the copied containers and
+#            of the Values, objects and lambdas made, not of what they share.
+#
+# Runs without a tracker only pay a None check per call, @ and copy, and in
+# the closure engine per call only. A MemoryTracker accumulates over
+# every run it is given, one run at a time; tracemalloc covers the whole
+# process, so the heap numbers only mean something when nothing else runs.
+import argparse
+import sys
+import tracemalloc
+import weakref
+from collections import Counter
+
+from env_v2 import Cell, EnvironmentManager
+from interpreterv4 import Interpreter
+from lambda_class import Lambda
+from object_class import Object
+from type_valuev2 import Type, Value, copy_value
+
+CENSUS_GROWTH = 1.25
+CENSUS_MIN_STEP = 4096  # bytes
+EXACT_KINDS = ("Object", "Lambda")
+SAMPLED_KINDS = ("Value", "frame")
+VALUE_SIZE = sys.getsizeof(Value(Type.NIL))
+
+
+# bytes of an object or lambda with the dict of its attributes
+def attributes_size(instance):
+    return sys.getsizeof(instance) + sys.getsizeof(instance.__dict__)
+
+
+OBJECT_SIZE = attributes_size(Object())
+LAMBDA_SIZE = attributes_size(Lambda(None, None))
+
+
+class MemoryTracker:
+    def __init__(self):
+        self.counts = Counter()  # (line, kind) -> instances allocated or copied
+        self.copied = Counter()  # (line, kind) -> bytes
+        # kind -> Objects or Lambdas made and not freed yet
+        self.alive = {kind: weakref.WeakSet() for kind in EXACT_KINDS}
+        self.made_total = Counter()  # kind -> Objects or Lambdas made
+        self.live = Counter()  # kind -> instances reachable at the last count
+        self.peak = Counter()  # kind -> most alive at once, or reachable at any count
+        self.peak_reachable = 0  # bytes of the largest count
+        self.peak_heap = 0
+        self.peak_heap_exact = True
+        self.end_heap = 0
+        self.high = 0  # most bytes traced at any check this run
+        self.base_peak = 0
+        self.censuses = 0
+        self.runs = 0
+        self.interp = None
+        self.capture_line = None
+        self.base = 0
+        self.next_census = 0
+        self.started_tracing = False
+
+    # called by the interpreter before a run; returns the environment the run
+    # uses, which reports the frames it copies
+    def start(self, interp):
+        self.interp = interp
+        self.runs += 1
+        self.capture_line = None
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        # the peak is left alone, it may belong to whoever else is tracing
+        self.base, self.base_peak = tracemalloc.get_traced_memory()
+        self.high = self.base
+        self.next_census = self.base
+        return TrackedEnvironment(self)
+
+    def stop(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.end_heap = current - self.base
+        if peak > self.base_peak:
+            run_peak, exact = peak - self.base, True
+        else:
+            run_peak, exact = max(self.high, current) - self.base, False
+        if run_peak > self.peak_heap:
+            self.peak_heap, self.peak_heap_exact = run_peak, exact
+        if self.started_tracing:
+            tracemalloc.stop()
+        self.interp = None
+
+    # an Object or Lambda the run made, counted as alive until it is freed
+    def made(self, instance):
+        kind = instance.__class__.__name__
+        alive = self.alive[kind]
+        alive.add(instance)
+        self.made_total[kind] += 1
+        self.peak[kind] = max(self.peak[kind], len(alive))
+
+    # an object created with @ on line
+    def object_created(self, obj, line):
+        self.made(obj)
+        self.counts[(line, "@")] += 1
+        self.copied[(line, "@")] += VALUE_SIZE + OBJECT_SIZE
+        self.check()
+
+    def lambda_created(self, lam, line):
+        self.made(lam)
+        self.counts[(line, "lambda")] += 1
+        self.copied[(line, "lambda")] += VALUE_SIZE + LAMBDA_SIZE
+        self.capture_line = line
+        self.check()
+
+    # copy_value(val), for an argument or return value on line
+    def copy(self, val, line):
+        if val.t is not Type.OBJECT and val.t is not Type.LAMBDA:
+            return val
+        memo = {}
+        result = copy_value(val, memo)
+        size = 0
+        for clone in memo.values():
+            self.made(clone)
+            size += VALUE_SIZE + attributes_size(clone)
+            if clone.__class__ is Object:
+                if not clone.shared:
+                    size += sys.getsizeof(clone.slots)
+            elif not clone.shared:
+                size += sys.getsizeof(clone.lambda_scope)
+        self.counts[(line, "copy")] += len(memo)
+        self.copied[(line, "copy")] += size
+        self.check()
+        return result
+
+    def frame_copied(self, kind, frame, line):
+        self.counts[(line, kind)] += 1
+        self.copied[(line, kind)] += sys.getsizeof(frame)
+
+    # counts what is reachable once the heap has grown enough since the last count
+    def check(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self.high:
+            self.high = current
+        if current >= self.next_census:
+            self.census()
+            self.next_census = max(current * CENSUS_GROWTH, current + CENSUS_MIN_STEP)
+
+    def census(self):
+        live = Counter()
+        reachable = 0
+        seen = set()
+        todo = list(self.interp.env.environment)
+        while todo:
+            item = todo.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            kind = item.__class__
+            if kind is Value:
+                live["Value"] += 1
+                reachable += VALUE_SIZE
+                if item.t is Type.OBJECT or item.t is Type.LAMBDA:
+                    todo.append(item.v)
+            elif kind is dict:
+                live["frame"] += 1
+                reachable += sys.getsizeof(item)
+                todo.extend(item.values())
+            elif kind is Cell:
+                todo.append(item.value)
+            elif kind is Object:
+                reachable += attributes_size(item)
+                if id(item.slots) not in seen:
+                    seen.add(id(item.slots))
+                    reachable += sys.getsizeof(item.slots)
+                    todo.extend(item.slots)
+            elif kind is Lambda:
+                reachable += attributes_size(item)
+                if item.captured is not None:
+                    todo.extend(item.captured)
+                if item.lambda_scope is not None:
+                    todo.append(item.lambda_scope)
+        self.censuses += 1
+        self.live = live
+        for kind in SAMPLED_KINDS:
+            self.peak[kind] = max(self.peak[kind], live[kind])
+        self.peak_reachable = max(self.peak_reachable, reachable)
+
+    # a text report: heap, live instances and the top lines by bytes copied
+    def report(self, top=20):
+        at_least = "" if self.peak_heap_exact else "at least "
+        lines = [
+            f"heap: peak {at_least}{self.peak_heap} bytes, {self.end_heap} bytes after the run",
+            "",
+            "alive at once, exact:",
+            f"{'':<10}{'peak':>12}{'made':>12}",
+        ]
+        for kind in EXACT_KINDS:
+            lines.append(f"{kind:<10}{self.peak[kind]:>12}{self.made_total[kind]:>12}")
+        lines.append(
+            f"reachable, sampled by {self.censuses} counts"
+            f" (peak {self.peak_reachable} bytes):"
+        )
+        lines.append(f"{'':<10}{'peak':>12}{'last':>12}")
+        for kind in SAMPLED_KINDS:
+            lines.append(f"{kind:<10}{self.peak[kind]:>12}{self.live[kind]:>12}")
+        lines.append("")
+        lines.append(
+            f"copied: {sum(self.copied.values())} bytes in"
+            f" {sum(self.counts.values())} instances"
+        )
+        lines.append(f"{'line':>6}  {'kind':<8}{'instances':>12}{'bytes':>14}")
+        keys = sorted(
+            self.copied,
+            key=lambda key: (-self.copied[key], -self.counts[key], str(key)),
+        )
+        for key in keys[:top]:
+            line, kind = key
+            lines.append(
+                f"{'?' if line is None else line:>6}  {kind:<8}"
+                f"{self.counts[key]:>12}{self.copied[key]:>14}"
+            )
+        return "\n".join(lines)
+
+
+# An EnvironmentManager that tells its MemoryTracker about the frames it copies.
+class TrackedEnvironment(EnvironmentManager):
+    def __init__(self, tracker):
+        super().__init__()
+        self.tracker = tracker
+
+    def writable(self, index):
+        environment = self.environment
+        frame = environment[index]
+        copy = super().writable(index)
+        if copy is not frame:
+            self.tracker.frame_copied("frame", copy, self.tracker.capture_line)
+        return copy
+
+    def push_lambda(self, lam):
+        scope = lam.lambda_scope
+        super().push_lambda(lam)
+        if lam.lambda_scope is not scope:
+            self.tracker.frame_copied("scope", lam.lambda_scope, lam.lambda_func.line)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description="Report what a Brewin# program allocates and copies."
+    )
+    arg_parser.add_argument("program", help="the .br program to run")
+    arg_parser.add_argument("--input", help="file inputi()/inputs() read from")
+    arg_parser.add_argument("--engine", choices=Interpreter.ENGINES, default="tree")
+    arg_parser.add_argument("--parser", choices=Interpreter.PARSERS, default="ply")
+    arg_parser.add_argument(
+        "--optimize", action="store_true", help="run optimizer.py over the program first"
+    )
+    arg_parser.add_argument("--top", type=int, default=20, help="lines in the table")
+    args = arg_parser.parse_args(argv)
+
+    with open(args.program) as f:
+        source = f.read()
+    inp = open(args.input, "rb") if args.input else None
+    tracker = MemoryTracker()
+    try:
+        interpreter = Interpreter(
+            inp=inp, engine=args.engine, parser=args.parser, optimize=args.optimize
+        )
+        try:
+            interpreter.run(source, memory=tracker)
+        finally:
+            print(tracker.report(args.top), file=sys.stderr)
+    finally:
+        if inp is not None:
+            inp.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
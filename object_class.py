@@ -1,37 +1,165 @@
+import threading
+from itertools import count
+
+from type_valuev2 import Type, copy_value
+
+
+def is_reference(val):
+    return val is not None and (val.t == Type.OBJECT or val.t == Type.LAMBDA)
+
+
+# Hidden class: objects that gain the same fields in the same order share one
+# Shape, which maps each field name to the index of its value in Object.slots.
+# A shape and the first shape grown from it share their index and layout, the
+# entries at or past a shape's size belong to its descendants; any later shape
+# grown from it starts from a copy of the prefix.
+class Shape:
+    def __init__(self, parent=None, name=None):
+        self.transitions = {}  # field name -> Shape
+        self.extended = False
+        if parent is None:
+            self.size = 0
+            self.index = {}  # field name -> slot
+            self.layout = []  # field name per slot
+            return
+        self.size = parent.size + 1
+        if parent.extended:
+            self.layout = parent.layout[: parent.size]
+            self.index = {field: slot for slot, field in enumerate(self.layout)}
+        else:
+            parent.extended = True
+            self.layout = parent.layout
+            self.index = parent.index
+        self.layout.append(name)
+        self.index[name] = parent.size
+
+    def slot(self, name):
+        slot = self.index.get(name)
+        if slot is not None and slot < self.size:
+            return slot
+        return None
+
+    def add(self, name):
+        shape = self.transitions.get(name)
+        if shape is None:
+            # shapes are shared by every run, which may be on other threads
+            with transition_lock:
+                shape = self.transitions.get(name)
+                if shape is None:
+                    shape = Shape(self, name)
+                    self.transitions[name] = shape
+        return shape
+
+
+transition_lock = threading.Lock()
+EMPTY_SHAPE = Shape()
+# Object.epoch values. Each bump takes a fresh one, so runs on other threads
+# bumping at the same time can never bring back an epoch a cache was filled in.
+epochs = count(1)
+
+
+# Fields an object does not have itself are looked up on its proto chain at
+# access time. Each object caches which object along its chain holds such a
+# field. Fields never move once added, so the cache only goes stale when an
+# object that is somebody's proto gains a field or gets a new proto, which
+# sets a new Object.epoch and throws every cache away.
 class Object():
+    epoch = 0
+
     def __init__(self):
-        self.dict = {}
-        self.inherited = []
+        self.shape = EMPTY_SHAPE
+        self.slots = []
+        # slots holding objects or lambdas, the only ones a copy has to
+        # follow; None while there are none
+        self.ref_slots = None
+        # set when slots is also used by a copy of this object, whoever writes first copies it
+        self.shared = False
+        self.is_proto = False
+        self.cache = None  # field name -> (object holding it, slot)
+        self.cache_epoch = 0
     
     def set_field(self, field_or_method_name, val):
+        if self.shared:
+            self.slots = list(self.slots)
+            self.shared = False
         if field_or_method_name == "proto":
-            if val.v is None:
-                temp = {}
-                for field in self.dict:
-                    if field not in self.inherited:
-                        temp[field] = self.dict[field]
-                self.dict = temp
-                self.inherited = []
-            else:
-                new_inherited = []
-                for field in self.inherited:
-                    self.dict.pop(field)
-                for field in val.v.dict:
-                    # only change if object did not originally defined field OR object inherited field
-                    if field not in self.dict or field in self.inherited:
-                        self.dict[field] = val.v.dict[field]
-                        new_inherited.append(field)
-                self.inherited = new_inherited
-                      
-        self.dict[field_or_method_name] = val
+            if self.is_proto:
+                Object.epoch = next(epochs)
+            self.cache = None
+            if val.v is not None:
+                val.v.is_proto = True
+
+        shape = self.shape
+        slot = shape.index.get(field_or_method_name)
+        if slot is not None and slot < shape.size:
+            if is_reference(val):
+                self.__add_ref(slot)
+            elif self.ref_slots is not None:
+                self.ref_slots.discard(slot)
+            self.slots[slot] = val
+        else:
+            if self.is_proto:
+                Object.epoch = next(epochs)
+            self.shape = shape.add(field_or_method_name)
+            self.slots.append(val)
+            if is_reference(val):
+                self.__add_ref(len(self.slots) - 1)
+
+    def __add_ref(self, slot):
+        if self.ref_slots is None:
+            self.ref_slots = {slot}
+        else:
+            self.ref_slots.add(slot)
         
     def get_field(self, field_or_method_name):
-        if field_or_method_name in self.dict:
-            return self.dict[field_or_method_name]
-        return self.dict["proto"].v.get_field(field_or_method_name)
-    
-    
-    
-        
-        
-    
\ No newline at end of file
+        shape = self.shape
+        slot = shape.index.get(field_or_method_name)
+        if slot is not None and slot < shape.size:
+            return self.slots[slot]
+        if self.cache is None or self.cache_epoch != Object.epoch:
+            self.cache = {}
+            self.cache_epoch = Object.epoch
+        found = self.cache.get(field_or_method_name)
+        if found is None:
+            found = self.__find_inherited(field_or_method_name)
+            self.cache[field_or_method_name] = found
+        holder, slot = found
+        return holder.slots[slot]
+
+    def __find_inherited(self, field_or_method_name):
+        seen = {id(self)}
+        holder = self
+        while True:
+            slot = holder.shape.slot("proto")
+            if slot is None or holder.slots[slot].v is None:
+                raise KeyError(field_or_method_name)
+            holder = holder.slots[slot].v
+            if id(holder) in seen:
+                # a proto cycle without the field
+                raise KeyError(field_or_method_name)
+            seen.add(id(holder))
+            slot = holder.shape.slot(field_or_method_name)
+            if slot is not None:
+                return (holder, slot)
+
+    # pass-by-value copy, memo maps id(original) to its copy so shared objects stay shared
+    def copy(self, memo):
+        clone = memo.get(id(self))
+        if clone is not None:
+            return clone
+        clone = Object()
+        memo[id(self)] = clone
+        clone.shape = self.shape
+        clone.is_proto = self.is_proto
+        if not self.ref_slots:
+            # nothing but primitives, share the slots until one side writes
+            clone.slots = self.slots
+            clone.shared = self.shared = True
+        else:
+            # primitives are immutable, only the objects and lambdas need
+            # copies of their own
+            slots = clone.slots = list(self.slots)
+            for slot in self.ref_slots:
+                slots[slot] = copy_value(slots[slot], memo)
+            clone.ref_slots = set(self.ref_slots)
+        return clone
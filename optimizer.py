@@ -0,0 +1,149 @@
+from element import BinOp, Literal, UnaryOp
+from intbase import InterpreterBase
+from resolver import collect_nodes
+from type_valuev2 import Type
+
+# Optimizer pass run between parse_program and resolve_program unless the
+# interpreter was made with optimize=False. It rewrites the tree in place:
+#
+#   - an operator whose operands are all constants is replaced by its result.
+#     The interpreter evaluates it (evaluate below), so the coercions are
+#     exactly the runtime's; an operation that would raise is left in the
+#     tree so it still raises, and only if it ever runs
+#   - an if whose condition is a constant keeps only the branch that runs
+#     (still as a block, so variables it creates stay local to it), and an
+#     if(false) without an else or a while(false) is removed
+#   - statements after one that always returns are removed, and so are bare
+#     expression statements other than calls, which no engine evaluates
+#
+# A constant condition of a type if/while reject is left alone for the
+# runtime to report.
+
+CONSTANT_TYPES = (
+    InterpreterBase.INT_DEF,
+    InterpreterBase.BOOL_DEF,
+    InterpreterBase.STRING_DEF,
+    InterpreterBase.NIL_DEF,
+)
+CALL_TYPES = (InterpreterBase.FCALL_DEF, InterpreterBase.MCALL_DEF)
+# the literal node type for each type an operator can produce
+LITERAL_TYPES = {
+    Type.INT: InterpreterBase.INT_DEF,
+    Type.BOOL: InterpreterBase.BOOL_DEF,
+    Type.STRING: InterpreterBase.STRING_DEF,
+}
+
+
+# evaluate(expr_ast) returns the Value of an expression made of constants,
+# or None if evaluating it raises. Returns the number of nodes removed.
+def optimize_program(ast, evaluate):
+    before = count_nodes(ast)
+    optimizer = Optimizer(evaluate)
+    for func in ast.functions:
+        optimizer.statements(func.statements)
+    return before - count_nodes(ast)
+
+
+def count_nodes(ast):
+    nodes = []
+    collect_nodes(ast, nodes)
+    return len(nodes)
+
+
+class Optimizer:
+    def __init__(self, evaluate):
+        self.evaluate = evaluate
+
+    # rewrites the list in place
+    def statements(self, statements):
+        kept = []
+        for statement in statements:
+            statement = self.statement(statement)
+            if statement is None:
+                continue
+            kept.append(statement)
+            if self.returns(statement):
+                break
+        statements[:] = kept
+
+    # the statement to keep in place of statement, None to drop it
+    def statement(self, statement):
+        kind = statement.elem_type
+        if kind == "=" or kind == InterpreterBase.FIELD_ASSIGN_DEF:
+            statement.expression = self.expr(statement.expression)
+        elif kind in CALL_TYPES:
+            self.expr(statement)
+        elif kind == InterpreterBase.RETURN_DEF:
+            if statement.expression is not None:
+                statement.expression = self.expr(statement.expression)
+        elif kind == InterpreterBase.IF_DEF:
+            statement.condition = self.expr(statement.condition)
+            self.statements(statement.statements)
+            if statement.else_statements is not None:
+                self.statements(statement.else_statements)
+            taken = self.truth(statement.condition)
+            if taken is False:
+                if statement.else_statements is None:
+                    return None
+                statement.condition = Literal(
+                    InterpreterBase.BOOL_DEF, val=True, line=statement.condition.line
+                )
+                statement.statements = statement.else_statements
+            if taken is not None:
+                statement.else_statements = None
+        elif kind == InterpreterBase.WHILE_DEF:
+            statement.condition = self.expr(statement.condition)
+            self.statements(statement.statements)
+            if self.truth(statement.condition) is False:
+                return None
+        else:
+            return None
+        return statement
+
+    def expr(self, expr_ast):
+        if isinstance(expr_ast, BinOp):
+            expr_ast.op1 = self.expr(expr_ast.op1)
+            expr_ast.op2 = self.expr(expr_ast.op2)
+            if self.is_constant(expr_ast.op1) and self.is_constant(expr_ast.op2):
+                return self.fold(expr_ast)
+        elif isinstance(expr_ast, UnaryOp):
+            expr_ast.op1 = self.expr(expr_ast.op1)
+            if self.is_constant(expr_ast.op1):
+                return self.fold(expr_ast)
+        elif expr_ast.elem_type in CALL_TYPES:
+            expr_ast.args[:] = [self.expr(arg) for arg in expr_ast.args]
+        elif expr_ast.elem_type == InterpreterBase.LAMBDA_DEF:
+            self.statements(expr_ast.statements)
+        return expr_ast
+
+    def fold(self, expr_ast):
+        value = self.evaluate(expr_ast)
+        if value is None or value.t not in LITERAL_TYPES:
+            return expr_ast
+        return Literal(LITERAL_TYPES[value.t], val=value.v, line=expr_ast.line)
+
+    def is_constant(self, expr_ast):
+        return expr_ast.elem_type in CONSTANT_TYPES
+
+    # True/False for a constant condition if/while accept, else None
+    def truth(self, condition):
+        if condition.elem_type in (InterpreterBase.BOOL_DEF, InterpreterBase.INT_DEF):
+            return bool(condition.val)
+        return None
+
+    def returns(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.RETURN_DEF:
+            return True
+        if kind != InterpreterBase.IF_DEF or not self.block_returns(statement.statements):
+            return False
+        if statement.else_statements is None:
+            # only left without an else when the condition is always true,
+            # or when there never was one
+            return self.truth(statement.condition) is True
+        return self.block_returns(statement.else_statements)
+
+    # statements() stops a block at its first statement that always returns
+    def block_returns(self, statements):
+        return len(statements) > 0 and self.returns(statements[-1])
+
@@ -0,0 +1,106 @@
+import sys
+from collections import deque
+
+# Where InterpreterBase.output sends the lines a program prints. A sink has
+# write(line), called once per line; flush(), which pushes out whatever the
+# sink is holding back, called when a run ends or raises an error; and
+# lines(), the lines it kept for get_output(), or None when it keeps none.
+DEFAULT_FLUSH_AT = 64 * 1024
+
+
+# keeps every line, which is what get_output() has always returned
+class ListSink:
+    def __init__(self):
+        self.log = []
+
+    def write(self, line):
+        self.log.append(line)
+
+    def flush(self):
+        pass
+
+    def lines(self):
+        return self.log
+
+
+# Writes lines to stream (sys.stdout as it is at the time, if None) in
+# batches: lines are joined and written once flush_at characters are
+# pending, so printing a line costs no write of its own. flush_at=0 writes
+# every line as it comes.
+class StreamSink:
+    def __init__(self, stream=None, flush_at=DEFAULT_FLUSH_AT):
+        self.stream = stream
+        self.flush_at = flush_at
+        self.pending = []
+        self.pending_size = 0
+
+    def write(self, line):
+        line = str(line)
+        self.pending.append(line)
+        self.pending_size += len(line) + 1
+        if self.pending_size >= self.flush_at:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout
+        self.pending.append("")
+        text = "\n".join(self.pending)
+        self.pending = []
+        self.pending_size = 0
+        stream.write(text)
+        stream.flush()
+
+    def lines(self):
+        return None
+
+
+# keeps only the last capacity lines; written counts every line ever written
+class RingSink:
+    def __init__(self, capacity):
+        self.ring = deque(maxlen=capacity)
+        self.written = 0
+
+    def write(self, line):
+        self.ring.append(line)
+        self.written += 1
+
+    def flush(self):
+        pass
+
+    def lines(self):
+        return list(self.ring)
+
+
+# throws every line away, for runs where only the side effects matter
+class DiscardSink:
+    def write(self, line):
+        pass
+
+    def flush(self):
+        pass
+
+    def lines(self):
+        return None
+
+
+# sends every line to each of sinks; lines() comes from the first that keeps any
+class TeeSink:
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write(self, line):
+        for sink in self.sinks:
+            sink.write(line)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def lines(self):
+        for sink in self.sinks:
+            lines = sink.lines()
+            if lines is not None:
+                return lines
+        return None
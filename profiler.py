@@ -0,0 +1,217 @@
+# Sampling profiler for Brewin# programs. It charges time to Brewin#
+# functions, lambdas, methods and source lines, not to the interpreter's own
+# Python functions:
+#
+#   profiler = Profiler()
+#   Interpreter().run(source, profiler=profiler)
+#   print(profiler.report())
+#   sys.stdout.writelines(profiler.collapsed())
+#
+# or from the command line:
+#
+#   python profiler.py PROGRAM [--engine ENGINE] [--optimize] [--top N]
+#                      [--collapsed FILE]
+#
+# During a profiled run, the engine keeps a shadow stack of the Brewin# calls
+# in progress. Each frame is a [label, line] list, where line is the line of
+# the statement the call last started (of the function itself before that).
+# Every `interval` seconds, a thread records a copy of the stack. Calls are
+# counted exactly. Time is estimated from the samples, each weighted by the
+# time since the previous one. The sampler only runs when the program's
+# thread gives up the GIL, so samples can be up to sys.getswitchinterval()
+# further apart than the interval.
+#
+# A frame is labelled by how it was called:
+#   fib                          a function, called by name or through a variable
+#   o.greet                      a method, by object and field name
+#   adder (lambda at line 12)    a lambda called through a variable
+#
+# Runs without a profiler only pay a None check per call and, in the tree
+# walker, per statement list. A Profiler accumulates over every run it is
+# given, one run at a time.
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+
+from interpreterv4 import Interpreter
+from intbase import InterpreterBase
+
+MAIN = "main"
+DEFAULT_INTERVAL = 0.001
+
+
+class Profiler:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.calls = Counter()  # label -> calls
+        self.samples = Counter()  # ((label, line), ...) stack -> samples
+        self.seconds = Counter()  # the same stacks -> seconds they stand for
+        self.stack = []
+        self.stopped = None
+        self.sampler = None
+
+    # called by the interpreter around a run, main being defined on line
+    def start(self, line=None):
+        self.stack = [[MAIN, line]]
+        self.calls[MAIN] += 1
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(
+            target=self.__sample, args=(self.stack, self.stopped), daemon=True
+        )
+        self.sampler.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.sampler.join()
+        self.sampler = None
+
+    # a call to target, an inline_cache.CallTarget
+    def enter(self, target):
+        cached = target.cached
+        label = cached.label
+        if label is None:
+            label = cached.label = call_label(target)
+        self.calls[label] += 1
+        self.stack.append([label, target.func_ast.line])
+
+    # a tail call to target, which takes over the caller's frame
+    def tail_call(self, target):
+        cached = target.cached
+        label = cached.label
+        if label is None:
+            label = cached.label = call_label(target)
+        self.calls[label] += 1
+        frame = self.stack[-1]
+        frame[0] = label
+        frame[1] = target.func_ast.line
+
+    def leave(self):
+        self.stack.pop()
+
+    def __sample(self, stack, stopped):
+        samples = self.samples
+        seconds = self.seconds
+        last = time.perf_counter()
+        while not stopped.wait(self.interval):
+            now = time.perf_counter()
+            # the copy of the list is atomic, its frames may change while
+            # they are read, which only mixes up a line with the next one
+            frames = tuple([(frame[0], frame[1]) for frame in stack[:]])
+            samples[frames] += 1
+            seconds[frames] += now - last
+            last = now
+
+    # a text report of the top functions, by their own time, and lines
+    def report(self, top=20):
+        total = sum(self.seconds.values())
+        own = Counter()
+        inclusive = Counter()
+        line_own = Counter()
+        line_inclusive = Counter()
+        for frames, seconds in self.seconds.items():
+            own[frames[-1][0]] += seconds
+            line_own[frames[-1]] += seconds
+            # recursion must not count a sample more than once
+            for label in {label for label, _ in frames}:
+                inclusive[label] += seconds
+            for frame in set(frames):
+                line_inclusive[frame] += seconds
+
+        def percent(seconds):
+            return seconds / total * 100 if total else 0.0
+
+        lines = [
+            f"{sum(self.samples.values())} samples over {total:.3f}s",
+            "",
+            f"{'function':<40}{'calls':>10}{'self s':>10}{'self %':>8}{'total %':>9}",
+        ]
+        labels = sorted(
+            set(self.calls) | set(own),
+            key=lambda label: (-own[label], -inclusive[label], -self.calls[label], label),
+        )
+        for label in labels[:top]:
+            lines.append(
+                f"{label:<40}{self.calls[label]:>10}{own[label]:>10.3f}"
+                f"{percent(own[label]):>8.1f}{percent(inclusive[label]):>9.1f}"
+            )
+        lines.append("")
+        lines.append(f"{'line':>6}  {'function':<32}{'self s':>10}{'self %':>8}{'total %':>9}")
+        frames = sorted(
+            line_inclusive,
+            key=lambda frame: (-line_own[frame], -line_inclusive[frame], str(frame)),
+        )
+        for frame in frames[:top]:
+            label, line = frame
+            lines.append(
+                f"{'?' if line is None else line:>6}  {label:<32}{line_own[frame]:>10.3f}"
+                f"{percent(line_own[frame]):>8.1f}{percent(line_inclusive[frame]):>9.1f}"
+            )
+        return "\n".join(lines)
+
+    # the samples in the collapsed stack format flame graph tools read, one
+    # "main;f;g count" line per stack; with lines, each frame is label:line
+    def collapsed(self, lines=False):
+        stacks = Counter()
+        for frames, count in self.samples.items():
+            if lines:
+                names = [f"{label}:{'?' if line is None else line}" for label, line in frames]
+            else:
+                names = [label for label, _ in frames]
+            stacks[";".join(names)] += count
+        return [f"{stack} {count}\n" for stack, count in sorted(stacks.items())]
+
+
+def call_label(target):
+    site = target.site
+    if site.objref is not None:
+        return f"{site.objref}.{site.name}"
+    func_ast = target.func_ast
+    if func_ast.elem_type == InterpreterBase.LAMBDA_DEF:
+        return f"{site.name} (lambda at line {func_ast.line})"
+    return func_ast.name
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Profile a Brewin# program.")
+    arg_parser.add_argument("program", help="the .br program to run")
+    arg_parser.add_argument("--input", help="file inputi()/inputs() read from")
+    arg_parser.add_argument("--engine", choices=Interpreter.ENGINES, default="tree")
+    arg_parser.add_argument("--parser", choices=Interpreter.PARSERS, default="ply")
+    arg_parser.add_argument(
+        "--optimize", action="store_true", help="run optimizer.py over the program first"
+    )
+    arg_parser.add_argument(
+        "--interval", type=float, default=DEFAULT_INTERVAL, help="seconds between samples"
+    )
+    arg_parser.add_argument("--top", type=int, default=20, help="rows per table")
+    arg_parser.add_argument("--collapsed", help="write collapsed stacks here")
+    arg_parser.add_argument(
+        "--lines", action="store_true", help="put line numbers in the collapsed stacks"
+    )
+    args = arg_parser.parse_args(argv)
+
+    with open(args.program) as f:
+        source = f.read()
+    inp = open(args.input, "rb") if args.input else None
+    profiler = Profiler(args.interval)
+    try:
+        interpreter = Interpreter(
+            inp=inp, engine=args.engine, parser=args.parser, optimize=args.optimize
+        )
+        try:
+            interpreter.run(source, profiler=profiler)
+        finally:
+            print(profiler.report(args.top), file=sys.stderr)
+            if args.collapsed:
+                with open(args.collapsed, "w") as f:
+                    f.writelines(profiler.collapsed(args.lines))
+    finally:
+        if inp is not None:
+            inp.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+from bytecode_compiler import BytecodeCompiler
+from input_sources import ListSource
+from interpreterv4 import Interpreter
+
+# Compile once, run many times:
+#
+#   program = compile(source, engine="vm")
+#   output = program.run(["3", "4"])
+#
+# compile parses, optimizes and resolves the source once. Each run of the
+# Program gets a fresh Interpreter for everything a run changes (the
+# environment, the object the running method was called on, its input and
+# its output), so runs can go on at the same time on any number of threads.
+# What runs share is never changed by them, apart from the caches that are
+# built to be shared: the inline caches on call sites, the object shapes and,
+# for the vm engine, the bytecode compiled for each function. The closure
+# engine's closures are bound to the run that made them, so it still compiles
+# each function once per run.
+
+
+class Program:
+    __slots__ = ("func_name_to_ast", "nodes_removed", "options", "compiler")
+
+    def __init__(self, func_name_to_ast, nodes_removed, options, compiler):
+        self.func_name_to_ast = func_name_to_ast
+        self.nodes_removed = nodes_removed
+        self.options = options
+        self.compiler = compiler
+
+    # Runs the program with inputs, anything Interpreter takes as inp (None
+    # means no input at all, not the keyboard), sending what it prints to
+    # sink (see output_sinks.py; a list by default) and within budget (see
+    # budget.py), sampled by profiler (see profiler.py) and accounted for by
+    # memory (see memory.py). Returns get_output() and raises like
+    # Interpreter.run.
+    def run(self, inputs=None, sink=None, budget=None, profiler=None, memory=None):
+        if inputs is None or inputs == [] or inputs == ():
+            inputs = ListSource(())
+        interpreter = Interpreter(
+            console_output=False, inp=inputs, output_sink=sink, **self.options
+        )
+        interpreter.run_program(self, self.compiler, budget, profiler, memory)
+        return interpreter.get_output()
+
+
+# the Program for source, with the same options as Interpreter
+def compile(
+    source,
+    engine="tree",
+    parser="ply",
+    optimize=False,
+    trace_output=False,
+    program_cache=None,
+):
+    options = {"engine": engine, "trace_output": trace_output}
+    interpreter = Interpreter(
+        console_output=False,
+        parser=parser,
+        optimize=optimize,
+        program_cache=program_cache,
+        **options,
+    )
+    func_name_to_ast, nodes_removed = interpreter.load(source)
+    compiler = None
+    if engine == "vm":
+        compiler = BytecodeCompiler(interpreter)
+    return Program(func_name_to_ast, nodes_removed, options, compiler)
@@ -0,0 +1,148 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+
+# On-disk cache of parsed programs. An entry is whatever the interpreter
+# stores for a source: the resolved function table (name -> param count ->
+# FuncDef, the form Interpreter.func_name_to_ast uses) pickled right after
+# resolve_program, before any run could fill in its inline caches. It is
+# stored as <key>.pickle in the cache directory.
+#
+# The key hashes the source together with a version string and a variant,
+# which names the options the entry was built with. The version
+# covers FORMAT and the code of every module that decides what the cached
+# ast looks like, so editing the parser, the node classes or the resolver
+# makes old entries unreachable; they then age out like any other entry.
+# The optimizer folds constants with the interpreter's own operators, so
+# interpreterv4 and type_valuev2 are among those modules too.
+#
+# Eviction is LRU by file mtime: a hit touches its file, and a store that
+# takes the directory over max_bytes deletes the least recently used
+# entries until it fits again. Writes go through a temporary file and
+# os.replace, so processes can share one directory.
+FORMAT = 1
+VERSIONED_MODULES = (
+    "brewlex",
+    "brewparse",
+    "brewparsetab",
+    "element",
+    "env_v2",
+    "handparse",
+    "inline_cache",
+    "intbase",
+    "interpreterv4",
+    "optimizer",
+    "resolver",
+    "type_valuev2",
+)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SUFFIX = ".pickle"
+
+version = None
+
+
+def cache_version():
+    global version
+    if version is None:
+        digest = hashlib.sha256(f"format {FORMAT}".encode())
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in VERSIONED_MODULES:
+            with open(os.path.join(here, name + ".py"), "rb") as f:
+                digest.update(f.read())
+        version = digest.hexdigest()
+    return version
+
+
+class ProgramCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, variant=""):
+        digest = hashlib.sha256(cache_version().encode())
+        digest.update(variant.encode() + b"\0")
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    # the cached entry for source, or None on a miss
+    def load(self, source, variant=""):
+        path = self.__path(self.key(source, variant))
+        # unpickling allocates every node at once, which would otherwise set
+        # off a series of cyclic collections that find nothing to free
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, "rb") as f:
+                entry_version, entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # truncated or unreadable, drop it
+            self.__remove(path)
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if entry_version != cache_version():
+            self.__remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def store(self, source, entry, variant=""):
+        try:
+            data = pickle.dumps(
+                (cache_version(), entry), protocol=pickle.HIGHEST_PROTOCOL
+            )
+        except (pickle.PicklingError, RecursionError):
+            # too deeply nested to pickle, just don't cache it
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self.__path(self.key(source, variant)))
+        except OSError:
+            self.__remove(temp_path)
+            return
+        self.__evict()
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                self.__remove(os.path.join(self.directory, name))
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def __evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.__remove(path)
+            total -= size
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,166 @@
+from env_v2 import UNBOUND
+from inline_cache import CallCache
+from intbase import InterpreterBase
+
+# Resolver pass run once after parse_program. It annotates every node that
+# looks a name up in the environment (var, field, =, field=, fcall, mcall)
+# with an `addrs` dict mapping each name the node uses to an address:
+#
+#   int      the index into EnvironmentManager.environment of the frame that
+#            holds the name whenever it is bound (-2 is the frame under the
+#            innermost block, 1 is main's body, ...)
+#   UNBOUND  the name can never be a variable in this program
+#   None     dynamic scoping makes the location unknowable, scan at runtime
+#
+# Constant-time lookup covers only parameters and main's top-level names.
+# Brewin# is dynamically scoped, so those are the only two kinds of names
+# with a fixed frame: parameters always live in the frame created by their
+# call, and names main assigns at its top level before use stay in main's
+# body as long as nothing calls main again. Any other local, in a function,
+# a block or a lambda, may already be bound by a caller, and assigning it
+# then writes the caller's binding, so it gets no slot of its own even when
+# no callee reads it. Call arguments are evaluated with the callee's frame
+# already pushed, so everything inside them falls back to the runtime scan.
+#
+# The scan looks through the frames from the top down, so its cost grows with
+# the depth of the stack. A recursive function's own locals are the bad case:
+# in `x = f(n - 1); return x + 1;` every active call of f has to be scanned
+# before x is found to be unbound, so recursing to depth n costs O(n^2). The
+# same goes for a lambda calling itself through a variable of main's.
+#
+# Every non-builtin call node also gets the inline_cache.CallCache the
+# engines resolve its callee through.
+
+CALL_TYPES = (InterpreterBase.FCALL_DEF, InterpreterBase.MCALL_DEF)
+BUILTINS = ("print", "inputi", "inputs")
+
+
+def resolve_program(ast):
+    functions = ast.functions
+    nodes = []
+    for func in functions:
+        collect_nodes(func.statements, nodes)
+    bindable = bindable_names(functions, nodes)
+    main_reentered = any(
+        (node.elem_type in CALL_TYPES or node.elem_type == InterpreterBase.VAR_DEF)
+        and node.name == "main"
+        for node in nodes
+    )
+    for func in functions:
+        is_main = func.name == "main" and not func.args
+        scope = Scope(func, bindable, is_main and not main_reentered)
+        scope.statements(func.statements, 1)
+    return ast
+
+
+def collect_nodes(node, out):
+    if isinstance(node, list):
+        for item in node:
+            collect_nodes(item, out)
+        return
+    if not hasattr(node, "elem_type"):
+        return
+    out.append(node)
+    for _, value in node.items():
+        if isinstance(value, list) or hasattr(value, "elem_type"):
+            collect_nodes(value, out)
+
+
+# names that some statement could ever bind as a variable: assignment
+# targets and formal parameters
+def bindable_names(functions, nodes):
+    bindable = set()
+    rebinds_this = False
+    for node in list(functions) + nodes:
+        if node.elem_type in (InterpreterBase.FUNC_DEF, InterpreterBase.LAMBDA_DEF):
+            for arg in node.args:
+                bindable.add(arg.name)
+        elif node.elem_type == "=":
+            bindable.add(node.name)
+            rebinds_this = rebinds_this or node.name == InterpreterBase.THIS_DEF
+    if rebinds_this:
+        # `this = ...` binds the name of the object the method was called on
+        for node in nodes:
+            if node.elem_type in CALL_TYPES and node.objref is not None:
+                bindable.add(node.objref)
+    return bindable
+
+
+class Scope:
+    def __init__(self, func_ast, bindable, is_main):
+        self.params = {arg.name for arg in func_ast.args}
+        self.bindable = bindable
+        self.is_main = is_main
+        self.main_defined = set()
+
+    # depth counts the frames pushed above the function's own call frame,
+    # pending counts callee frames pushed while evaluating call arguments
+    def address(self, name, depth, pending=0):
+        if name == InterpreterBase.THIS_DEF:
+            return None
+        if name not in self.bindable:
+            return UNBOUND
+        if pending:
+            return None
+        if name in self.params:
+            return -1 - depth
+        if self.is_main and name in self.main_defined:
+            return 1
+        return None
+
+    def statements(self, statements, depth):
+        for statement in statements:
+            self.statement(statement, depth)
+
+    def statement(self, statement, depth):
+        kind = statement.elem_type
+        if kind == InterpreterBase.FIELD_ASSIGN_DEF:
+            self.expr(statement.expression, depth, 0)
+            objref = statement.objref
+            statement.addrs = {objref: self.address(objref, depth)}
+        elif kind == "=":
+            self.expr(statement.expression, depth, 0)
+            name = statement.name
+            if self.is_main and depth == 1:
+                # main's first top-level assignment creates the name in its body
+                self.main_defined.add(name)
+            statement.addrs = {name: self.address(name, depth)}
+        elif kind == InterpreterBase.RETURN_DEF:
+            if statement.expression is not None:
+                self.expr(statement.expression, depth, 0)
+        elif kind in (InterpreterBase.IF_DEF, InterpreterBase.WHILE_DEF):
+            self.expr(statement.condition, depth, 0)
+            self.statements(statement.statements, depth + 1)
+            if kind == InterpreterBase.IF_DEF and statement.else_statements is not None:
+                self.statements(statement.else_statements, depth + 1)
+        else:
+            self.expr(statement, depth, 0)
+
+    def expr(self, expr_ast, depth, pending):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.VAR_DEF:
+            name = expr_ast.name
+            expr_ast.addrs = {name: self.address(name, depth, pending)}
+        elif kind == InterpreterBase.FIELD_DEF:
+            objref = expr_ast.objref
+            expr_ast.addrs = {objref: self.address(objref, depth, pending)}
+        elif kind in CALL_TYPES:
+            name = expr_ast.name
+            expr_ast.addrs = {name: self.address(name, depth, pending)}
+            objref = expr_ast.objref
+            if objref is not None:
+                expr_ast.addrs[objref] = self.address(objref, depth, pending)
+            if kind == InterpreterBase.FCALL_DEF and name in BUILTINS:
+                callee_frames = 0
+            else:
+                callee_frames = 1
+                expr_ast.cache = CallCache(expr_ast)
+            for arg in expr_ast.args:
+                self.expr(arg, depth, pending + callee_frames)
+        elif kind == InterpreterBase.LAMBDA_DEF:
+            scope = Scope(expr_ast, self.bindable, False)
+            scope.statements(expr_ast.statements, 1)
+        else:
+            for key in ("op1", "op2"):
+                if expr_ast.get(key) is not None:
+                    self.expr(expr_ast.get(key), depth, pending)
@@ -0,0 +1,26 @@
+# Proper tail calls, shared by every engine.
+#
+# Once the callee of a `return f(...)` returns, all that is left of its caller
+# is bookkeeping: popping the caller's frames and releasing the Cells its call
+# made of the variables passed to its ref parameters. A tail call that is
+# eliminated keeps a single call level for a whole chain of such calls
+# instead. The frames of the function making the call are folded into one
+# frame just under the callee's (EnvironmentManager.fold), so dynamic scoping
+# still finds every binding they held, and the level releases every Cell made
+# for a frame under it when it returns.
+#
+# A call level is described by base, the index of its call frame in the
+# environment, and mark, the length of EnvironmentManager.cells before its
+# arguments were bound. Only a level running in a fresh frame can be folded
+# away; a lambda's scope outlives the call and has to be handed back to the
+# lambda.
+
+
+# what a body returns instead of a Value when its tail call was eliminated:
+# the callee to run in its place, and the frames to run it in
+class TailCall:
+    __slots__ = ("target", "frames")
+
+    def __init__(self, target, frames):
+        self.target = target
+        self.frames = frames
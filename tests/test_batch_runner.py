@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+
+import batch_runner
+from batch_runner import find_jobs, run_batch
+
+PROGRAMS = {
+    "ok": 'func main() { print("hi"); }',
+    "reads": "func main() { print(inputi() + 1); }",
+    "error": 'func main() { print(1 + "s"); }',
+    "syntax": "func main() { print(1 }",
+    "forever": "func main() { i = 0; while (true) { i = i + 1; } }",
+    # deep enough to overflow the tree walker's Python stack
+    "crash": "func f(n) { if (n == 0) { return 0; } return 1 + f(n - 1); }\n"
+    "func main() { print(f(100000)); }",
+}
+RESULT_FIELDS = {
+    "program",
+    "status",
+    "output",
+    "error_type",
+    "error_line",
+    "error",
+    "log",
+    "passed",
+    "wall_time",
+}
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def programs(tmp_path):
+    for name, source in PROGRAMS.items():
+        write(str(tmp_path / "progs" / (name + ".br")), source)
+    write(str(tmp_path / "progs" / "reads.in"), "41\n")
+    write(str(tmp_path / "progs" / "reads.out"), "42\n")
+    write(str(tmp_path / "progs" / "ok.out"), "bye\n")
+    return tmp_path
+
+
+def by_name(results):
+    return {os.path.basename(r["program"])[:-3]: r for r in results}
+
+
+def test_directory_finds_programs_with_their_input_and_expected_output(programs):
+    write(str(programs / "progs" / "nested" / "deep.br"), PROGRAMS["ok"])
+    jobs = find_jobs(str(programs / "progs"))
+    names = [os.path.relpath(job["program"], str(programs / "progs")) for job in jobs]
+    expected = [name + ".br" for name in PROGRAMS] + [os.path.join("nested", "deep.br")]
+    assert names == sorted(expected)
+    reads = [job for job in jobs if job["program"].endswith("reads.br")][0]
+    assert reads["input"].endswith("reads.in")
+    assert reads["expected"].endswith("reads.out")
+    deep = [job for job in jobs if job["program"].endswith("deep.br")][0]
+    assert deep["input"] is None and deep["expected"] is None
+
+
+def test_text_manifest_is_relative_to_itself(programs):
+    write(str(programs / "list.txt"), "progs/ok.br\n\nprogs/reads.br\n")
+    jobs = find_jobs(str(programs / "list.txt"))
+    assert [job["program"] for job in jobs] == [
+        str(programs / "progs" / "ok.br"),
+        str(programs / "progs" / "reads.br"),
+    ]
+    assert jobs[1]["input"] == str(programs / "progs" / "reads.in")
+
+
+def test_json_manifest_names_input_and_expected_output(programs):
+    write(str(programs / "other.in"), "1\n")
+    write(str(programs / "other.out"), "2\n")
+    manifest = [{"program": "progs/reads.br", "input": "other.in", "expected": "other.out"}]
+    write(str(programs / "list.json"), json.dumps(manifest))
+    (job,) = find_jobs(str(programs / "list.json"))
+    assert job["input"] == str(programs / "other.in")
+    assert job["expected"] == str(programs / "other.out")
+    (result,) = run_batch([job], processes=1)
+    assert result["output"] == ["2"]
+    assert result["passed"] is True
+
+
+def test_statuses_and_report_fields(programs):
+    jobs = find_jobs(str(programs / "progs"))
+    results = by_name(run_batch(jobs, processes=2, timeout=2))
+    for result in results.values():
+        assert set(result) == RESULT_FIELDS
+    assert results["ok"]["status"] == "ok"
+    assert results["ok"]["output"] == ["hi"]
+    assert results["ok"]["passed"] is False
+    assert results["reads"]["passed"] is True
+    assert results["error"]["status"] == "error"
+    assert results["error"]["error_type"] == "TYPE_ERROR"
+    assert results["syntax"]["status"] == "syntax_error"
+    assert "Syntax error" in results["syntax"]["log"]
+    assert results["crash"]["status"] == "crash"
+    assert results["crash"]["error"]
+    assert results["forever"]["status"] == "timeout"
+    assert results["forever"]["passed"] is None
+
+
+def test_timed_out_worker_is_replaced(programs):
+    progs = programs / "progs"
+    jobs = [batch_runner.job_for(str(progs / name)) for name in ("forever.br", "ok.br")]
+    # one worker: the program after the timeout runs on its replacement
+    forever, ok = run_batch(jobs, processes=1, timeout=0.5)
+    assert forever["status"] == "timeout"
+    assert forever["wall_time"] == 0.5
+    assert ok["status"] == "ok"
+    assert ok["output"] == ["hi"]
+
+
+def test_command_line_writes_the_report(programs, capsys):
+    report_path = str(programs / "report.json")
+    status = batch_runner.main(
+        [str(programs / "progs"), "--jobs", "2", "--timeout", "2", "--report", report_path]
+    )
+    assert status == 1
+    with open(report_path) as f:
+        report = json.load(f)
+    summary = report["summary"]
+    assert summary["programs"] == len(PROGRAMS)
+    assert (summary["ok"], summary["error"], summary["syntax_error"]) == (2, 1, 1)
+    assert (summary["timeout"], summary["crash"]) == (1, 1)
+    assert (summary["passed"], summary["failed"]) == (1, 1)
+    assert "6 programs" in capsys.readouterr().err
@@ -0,0 +1,131 @@
+import pytest
+
+from budget import Budget
+from interpreterv4 import Interpreter
+from intbase import ErrorType
+
+LOOP = """
+func main() {
+  print("start");
+  i = 0;
+  while (i < 100) {
+    i = i + 1;
+  }
+  print(i);
+}
+"""
+
+RECURSION = """
+func f(n) {
+  if (n == 0) {
+    return 0;
+  }
+  x = f(n - 1);
+  return x + 1;
+}
+
+func main() {
+  print(f(50));
+}
+"""
+
+TAIL_RECURSION = """
+func f(n) {
+  if (n == 0) {
+    return 0;
+  }
+  return f(n - 1);
+}
+
+func main() {
+  print(f(500));
+}
+"""
+
+OBJECTS = """
+func keep(o) {
+  return o;
+}
+
+func main() {
+  i = 0;
+  o = @;
+  while (i < 10) {
+    o = keep(o);
+    i = i + 1;
+  }
+  print(i);
+}
+"""
+
+MANY_OBJECTS = """
+func main() {
+  i = 0;
+  while (i < 10) {
+    o = @;
+    i = i + 1;
+  }
+  print(i);
+}
+"""
+
+FOREVER = """
+func main() {
+  i = 0;
+  while (true) {
+    i = i + 1;
+  }
+}
+"""
+
+
+# output and error type of one run under budget
+def run(source, engine, budget):
+    interpreter = Interpreter(console_output=False, engine=engine)
+    try:
+        interpreter.run(source, budget=budget)
+    except Exception:
+        pass
+    return list(interpreter.get_output()), interpreter.get_error_type_and_line()[0]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_steps(engine):
+    assert run(LOOP, engine, Budget(max_steps=10)) == (
+        ["start"],
+        ErrorType.STEP_LIMIT_ERROR,
+    )
+    assert run(LOOP, engine, Budget(max_steps=1000)) == (["start", "100"], None)
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_depth(engine):
+    assert run(RECURSION, engine, Budget(max_depth=20)) == ([], ErrorType.DEPTH_LIMIT_ERROR)
+    assert run(RECURSION, engine, Budget(max_depth=60)) == (["50"], None)
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_eliminated_tail_calls_add_no_depth(engine):
+    assert run(TAIL_RECURSION, engine, Budget(max_depth=5)) == (["0"], None)
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_objects(engine):
+    assert run(MANY_OBJECTS, engine, Budget(max_objects=5)) == (
+        [],
+        ErrorType.OBJECT_LIMIT_ERROR,
+    )
+    # pass-by-value copies are not made with @
+    assert run(OBJECTS, engine, Budget(max_objects=1)) == (["10"], None)
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_timeout(engine):
+    assert run(FOREVER, engine, Budget(timeout=0.05)) == ([], ErrorType.TIME_LIMIT_ERROR)
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_each_run_starts_a_fresh_meter(engine):
+    budget = Budget(max_steps=1000, max_objects=10)
+    assert run(MANY_OBJECTS, engine, budget) == (["10"], None)
+    assert run(MANY_OBJECTS, engine, budget) == (["10"], None)
@@ -0,0 +1,107 @@
+import pytest
+
+import lambda_class
+import object_class
+import program
+from interpreterv4 import Interpreter
+from lambda_class import Lambda
+from object_class import Object
+from type_valuev2 import Type, Value, copy_value
+
+
+def make_object(fields):
+    proto = Object()
+    proto.set_field("base", Value(Type.INT, 1))
+    obj = Object()
+    for i in range(fields):
+        obj.set_field(f"f{i}", Value(Type.INT, i))
+    obj.set_field("method", Value(Type.LAMBDA, Lambda(None, [{"n": Value(Type.INT, 0)}])))
+    obj.set_field("proto", Value(Type.OBJECT, proto))
+    return obj
+
+
+def count_copies(monkeypatch, val):
+    calls = []
+
+    def counting_copy(val, memo=None):
+        calls.append(val)
+        return copy_value(val, memo)
+
+    monkeypatch.setattr(object_class, "copy_value", counting_copy)
+    monkeypatch.setattr(lambda_class, "copy_value", counting_copy)
+    copy_value(val, {})
+    return len(calls)
+
+
+def test_copy_follows_only_the_reference_fields(monkeypatch):
+    small = Value(Type.OBJECT, make_object(10))
+    large = Value(Type.OBJECT, make_object(3000))
+    # the method and the proto, however many primitive fields sit beside them
+    assert count_copies(monkeypatch, small) == 2
+    assert count_copies(monkeypatch, large) == 2
+
+
+def test_copy_of_a_lambda_shares_a_scope_of_primitives():
+    lam = Lambda(None, [{"n": Value(Type.INT, 0)}])
+    clone = lam.copy({})
+    assert clone.lambda_scope is lam.lambda_scope
+    assert clone.shared and lam.shared
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_copies_stay_apart_and_keep_their_aliases(engine):
+    source = """
+func change(o) {
+  o.n = 100;
+  inner = o.child;
+  inner.n = 200;
+  print(inner == o.same);
+  return o;
+}
+
+func main() {
+  o = @;
+  o.n = 1;
+  child = @;
+  child.n = 2;
+  o.child = child;
+  o.same = child;
+  o.get = lambda() { return 3; };
+  c = change(o);
+  copied = c.child;
+  print(o.n, " ", child.n, " ", c.n, " ", copied.n);
+  same = c.same;
+  same.n = 300;
+  print(copied.n, " ", child.n);
+}
+"""
+    assert program.compile(source, engine=engine).run() == [
+        "true",
+        "1 2 100 200",
+        "300 2",
+    ]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_copy_of_a_running_lambda_keeps_its_scope_at_the_copy(engine):
+    source = """
+func pass(g) {
+  return g;
+}
+
+func main() {
+  k = 0;
+  f = lambda(m) {
+    k = k + m;
+    g = pass(f);
+    k = k + 100;
+    print(k);
+    return g;
+  };
+  h = f(3);
+  print(k);
+  x = h(1);
+  print(k);
+}
+"""
+    assert program.compile(source, engine=engine).run() == ["103", "0", "104", "0"]
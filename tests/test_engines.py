@@ -0,0 +1,66 @@
+import glob
+import os
+
+import pytest
+
+from interpreterv4 import Interpreter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROGRAMS = sorted(glob.glob(os.path.join(HERE, "programs", "*.br")))
+WORKLOADS = sorted(glob.glob(os.path.join(HERE, "..", "benchmarks", "workloads", "*.br")))
+CONFIGS = [
+    (engine, parser, optimize)
+    for engine in Interpreter.ENGINES
+    for parser in Interpreter.PARSERS
+    for optimize in (True, False)
+]
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+# output, error and error line of one run; each run reads its own copy of the inputs
+def run(source, inputs, engine, parser, optimize):
+    interpreter = Interpreter(
+        console_output=False,
+        inp=list(inputs) if inputs is not None else None,
+        engine=engine,
+        parser=parser,
+        optimize=optimize,
+    )
+    try:
+        interpreter.run(source)
+    except Exception:
+        pass
+    return list(interpreter.get_output()), interpreter.get_error_type_and_line()
+
+
+def name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+@pytest.mark.parametrize("path", PROGRAMS, ids=name)
+def test_every_engine_parser_and_optimizer_agree(path, capsys):
+    source = read(path)
+    inputs = None
+    if os.path.exists(path[:-3] + ".in"):
+        inputs = read(path[:-3] + ".in").splitlines()
+    expected = run(source, inputs, "tree", "ply", False)
+    # a program the parser recovered from would test nothing but its errors
+    assert "Syntax error" not in capsys.readouterr().out
+    if os.path.exists(path[:-3] + ".out"):
+        assert expected == (read(path[:-3] + ".out").splitlines(), (None, None))
+    for config in CONFIGS:
+        assert run(source, inputs, *config) == expected, config
+
+
+@pytest.mark.parametrize("path", WORKLOADS, ids=name)
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+@pytest.mark.parametrize("parser", Interpreter.PARSERS)
+def test_workloads_print_their_expected_output(path, engine, parser):
+    expected = read(path[:-3] + ".out").splitlines()
+    output, error = run(read(path), None, engine, parser, True)
+    assert error == (None, None)
+    assert output == expected
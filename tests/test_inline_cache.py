@@ -0,0 +1,191 @@
+import gc
+
+import pytest
+
+import program
+from interpreterv4 import Interpreter
+from lambda_class import Lambda
+
+
+def live_lambdas():
+    gc.collect()
+    return sum(isinstance(obj, Lambda) for obj in gc.get_objects())
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_closures_of_one_lambda_keep_their_own_scope(engine):
+    source = """
+func make(n) {
+  return lambda() { return n; };
+}
+
+func call(g) {
+  return g();
+}
+
+func main() {
+  a = make(1);
+  b = make(2);
+  print(call(a));
+  print(call(b));
+  print(call(a));
+  print(call(b));
+}
+"""
+    assert program.compile(source, engine=engine).run() == ["1", "2", "1", "2"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_call_sites_do_not_keep_a_run_alive(engine):
+    source = """
+func main() {
+  big = @;
+  big.x = 1;
+  f = lambda(a) { return a + big.x; };
+  print(f(1));
+}
+"""
+    compiled = program.compile(source, engine=engine)
+    before = live_lambdas()
+    assert compiled.run() == ["2"]
+    assert live_lambdas() == before
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_replaced_method_is_called(engine):
+    source = """
+func main() {
+  o = @;
+  o.m = lambda() { return 1; };
+  i = 0;
+  while (i < 4) {
+    print(o.m());
+    if (i > 0) {
+      o.m = lambda() { return 2; };
+    }
+    i = i + 1;
+  }
+}
+"""
+    assert program.compile(source, engine=engine).run() == ["1", "1", "2", "2"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_method_slot_is_found_in_each_shape(engine):
+    source = """
+func make(n) {
+  o = @;
+  o.n = n;
+  if (n > 2) {
+    o.pad = n;
+  }
+  o.m = lambda() { return this.n * 10; };
+  return o;
+}
+
+func call(o) {
+  return o.m();
+}
+
+func main() {
+  i = 0;
+  while (i < 8) {
+    print(call(make(i)));
+    i = i + 1;
+  }
+}
+"""
+    output = program.compile(source, engine=engine).run()
+    assert output == ["0", "10", "20", "30", "40", "50", "60", "70"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_variable_shadowing_a_function_is_called(engine):
+    source = """
+func f() {
+  return "function";
+}
+
+func call() {
+  return f();
+}
+
+func main() {
+  print(call());
+  print(call());
+  f = lambda() { return "lambda"; };
+  print(call());
+  print(call());
+}
+"""
+    output = program.compile(source, engine=engine).run()
+    assert output == ["function", "function", "lambda", "lambda"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_own_method_shadows_the_protos(engine):
+    source = """
+func main() {
+  p = @;
+  p.m = lambda() { return "proto"; };
+  c = @;
+  c.proto = p;
+  i = 0;
+  while (i < 3) {
+    print(c.m());
+    if (i == 0) {
+      c.m = lambda() { return "own"; };
+    }
+    i = i + 1;
+  }
+}
+"""
+    assert program.compile(source, engine=engine).run() == ["proto", "own", "own"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_megamorphic_site_calls_each_callee(engine):
+    source = """
+func one() {
+  return 1;
+}
+
+func call(g) {
+  return g();
+}
+
+func main() {
+  print(call(one));
+  print(call(lambda() { return 2; }));
+  print(call(lambda() { return 3; }));
+  print(call(lambda() { return 4; }));
+  print(call(lambda() { return 5; }));
+  print(call(lambda() { return 6; }));
+  print(call(one));
+  print(call(lambda() { return 7; }));
+}
+"""
+    # more callees than the site keeps entries for
+    output = program.compile(source, engine=engine).run()
+    assert output == ["1", "2", "3", "4", "5", "6", "1", "7"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_runs_of_one_program_call_their_own_callees(engine):
+    source = """
+func call(g) {
+  return g();
+}
+
+func main() {
+  if (inputi() < 2) {
+    print(call(lambda() { return "first"; }));
+  } else {
+    print(call(lambda() { return "second"; }));
+  }
+}
+"""
+    compiled = program.compile(source, engine=engine)
+    assert compiled.run(["1"]) == ["first"]
+    assert compiled.run(["2"]) == ["second"]
+    assert compiled.run(["1"]) == ["first"]
@@ -0,0 +1,97 @@
+import io
+import mmap
+
+import pytest
+
+from input_sources import IteratorSource, ListSource, MmapSource, StreamSource
+from interpreterv4 import Interpreter
+
+CONTENTS = [
+    "1\n22\n333\n",
+    "hello world\nno final newline",
+    "",
+    "\n\nafter two empty lines\n",
+    "crlf\r\nline endings\r\n",
+    "  7 \n-12\n",
+    "héllo\nwörld\n",
+]
+CHUNK_SIZES = [1, 2, 3, 5, 64 * 1024]
+
+
+# what the interpreter read before input sources: the lines as a list,
+# None once they run out
+def baseline(content):
+    source = ListSource(content.splitlines())
+    return [source.read() for _ in range(len(content.splitlines()) + 2)]
+
+
+def read_all(source, count):
+    return [source.read() for _ in range(count)]
+
+
+def sources(content, chunk_size):
+    data = content.encode()
+    yield StreamSource(io.StringIO(content, newline=""), chunk_size)
+    yield StreamSource(io.BytesIO(data), chunk_size)
+    yield IteratorSource(io.StringIO(content, newline=""), chunk_size)
+    yield MmapSource(bytearray(data))
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("content", CONTENTS)
+def test_lines_match_the_list_reader(content, chunk_size):
+    expected = baseline(content)
+    for source in sources(content, chunk_size):
+        assert read_all(source, len(expected)) == expected, source
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_ints_straddling_chunks(chunk_size):
+    content = "12345\n-678\n  9 \n1000000000000"
+    expected = [int(line) for line in content.splitlines()]
+    for source in sources(content, chunk_size):
+        assert [source.read_int() for _ in expected] == expected, source
+        # past the end inputi fails, as int(None) always did
+        with pytest.raises(TypeError):
+            source.read_int()
+
+
+def test_mmap_of_a_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"5\nlast")
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        assert read_all(MmapSource(mapped), 3) == ["5", "last", None]
+    finally:
+        mapped.close()
+    assert read_all(MmapSource(str(path)), 3) == ["5", "last", None]
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert MmapSource(str(empty)).read() is None
+
+
+PROGRAM = """
+func main() {
+  n = inputi();
+  total = 0;
+  while (n > 0) {
+    total = total + inputi();
+    n = n - 1;
+  }
+  print(total, " ", inputs(), " ", inputs());
+}
+"""
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_program_reads_a_stream_like_a_list(engine, chunk_size):
+    content = "3\n100\n20\n3\nfirst word\nsecond"
+    expected = Interpreter(console_output=False, inp=content.splitlines(), engine=engine)
+    expected.run(PROGRAM)
+    assert expected.get_output() == ["123 first word second"]
+    stream = StreamSource(io.BytesIO(content.encode()), chunk_size)
+    interpreter = Interpreter(console_output=False, inp=stream, engine=engine)
+    interpreter.run(PROGRAM)
+    assert interpreter.get_output() == expected.get_output()
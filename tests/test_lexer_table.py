@@ -0,0 +1,25 @@
+import brewlex
+import brewlextab
+
+
+def tokenize(lexer, source):
+    lexer.input(source)
+    return [(token.type, token.value) for token in lexer]
+
+
+def test_shipped_table_matches_the_rules():
+    assert brewlextab._lexsignature == brewlex.rules_signature()
+
+
+def test_shipped_table_is_used(monkeypatch):
+    monkeypatch.setattr(brewlex, "lexer", None)
+    assert brewlex.get_lexer().lexoptimize
+
+
+def test_changed_regex_rebuilds_from_the_rules(monkeypatch):
+    monkeypatch.setattr(brewlex, "lexer", None)
+    # same token names, different regex: the table no longer matches
+    monkeypatch.setattr(brewlex.t_NUMBER, "__doc__", r"\d")
+    lexer = brewlex.get_lexer()
+    assert not lexer.lexoptimize
+    assert tokenize(lexer, "12") == [("NUMBER", 1), ("NUMBER", 2)]
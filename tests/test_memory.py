@@ -0,0 +1,77 @@
+import tracemalloc
+
+import pytest
+
+import program
+from interpreterv4 import Interpreter
+from memory import MemoryTracker
+
+CHAIN = """
+func main() {
+  head = nil;
+  i = 0;
+  while (i < 300) {
+    node = @;
+    node.next = head;
+    head = node;
+    i = i + 1;
+  }
+  print(i);
+}
+"""
+
+DROPPED = """
+func main() {
+  i = 0;
+  while (i < 300) {
+    node = @;
+    node.n = i;
+    i = i + 1;
+  }
+  print(i);
+}
+"""
+
+
+def track(source, engine):
+    tracker = MemoryTracker()
+    assert program.compile(source, engine=engine).run(memory=tracker) == ["300"]
+    return tracker
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_objects_are_counted_exactly(engine):
+    tracker = track(CHAIN, engine)
+    assert tracker.peak["Object"] == 300
+    assert tracker.made_total["Object"] == 300
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_freed_objects_stop_counting(engine):
+    tracker = track(DROPPED, engine)
+    # the previous node is freed as soon as the next one replaces it
+    assert tracker.peak["Object"] <= 2
+    assert tracker.made_total["Object"] == 300
+    assert "alive at once, exact" in tracker.report()
+
+
+def test_a_running_trace_keeps_its_peak():
+    tracemalloc.start()
+    try:
+        block = bytearray(10_000_000)
+        del block
+        outer_peak = tracemalloc.get_traced_memory()[1]
+        tracker = track(DROPPED, "tree")
+        assert tracemalloc.get_traced_memory()[1] >= outer_peak
+        assert tracker.peak_heap > 0
+        assert not tracker.peak_heap_exact
+        assert "peak at least" in tracker.report()
+    finally:
+        tracemalloc.stop()
+
+
+def test_own_trace_measures_the_peak_exactly():
+    tracker = track(DROPPED, "tree")
+    assert not tracemalloc.is_tracing()
+    assert tracker.peak_heap_exact
+    assert tracker.peak_heap >= tracker.end_heap
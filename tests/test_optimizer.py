@@ -0,0 +1,44 @@
+import glob
+import os
+
+import pytest
+
+import program
+from interpreterv4 import Interpreter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROGRAMS = sorted(glob.glob(os.path.join(HERE, "programs", "*.br")))
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def run(source, inputs, optimize):
+    interpreter = Interpreter(console_output=False, inp=inputs, optimize=optimize)
+    try:
+        interpreter.run(source)
+    except Exception:
+        pass
+    return list(interpreter.get_output()), interpreter.get_error_type_and_line()
+
+
+def test_off_by_default():
+    source = "func main() { x = 1 + 2; print(x); }"
+    interpreter = Interpreter(console_output=False)
+    interpreter.run(source)
+    assert interpreter.nodes_removed == 0
+    assert program.compile(source).nodes_removed == 0
+    assert program.compile(source, optimize=True).nodes_removed > 0
+
+
+@pytest.mark.parametrize(
+    "path", PROGRAMS, ids=lambda path: os.path.splitext(os.path.basename(path))[0]
+)
+def test_optimized_output_is_the_same(path):
+    inputs = None
+    if os.path.exists(path[:-3] + ".in"):
+        inputs = read(path[:-3] + ".in").splitlines()
+    source = read(path)
+    assert run(source, inputs, True) == run(source, inputs, False)
@@ -0,0 +1,36 @@
+import pytest
+
+import interpreterv1
+from interpreterv4 import Interpreter
+from output_sinks import DiscardSink, ListSink
+
+PRINTS = 'func main() { print("hi"); print(inputi() + 1); }'
+
+
+def test_interpreterv1_flushes_console_output(capsys):
+    interpreterv1.Interpreter().run('func main() { print("hi"); }')
+    assert capsys.readouterr().out == "hi\n"
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_console_output_is_out_when_run_returns(capsys, engine):
+    Interpreter(inp=["1"], engine=engine).run(PRINTS)
+    assert capsys.readouterr().out == "hi\n2\n"
+
+
+def test_output_log_is_the_printed_lines():
+    interpreter = Interpreter(console_output=False, inp=["1"])
+    interpreter.run(PRINTS)
+    assert interpreter.output_log == ["hi", "2"]
+    assert interpreter.output_log is interpreter.get_output()
+    assert interpreter.input_cursor == 1
+
+
+def test_output_log_of_a_given_sink():
+    sink = ListSink()
+    interpreter = Interpreter(console_output=False, inp=["1"], output_sink=sink)
+    interpreter.run(PRINTS)
+    assert interpreter.output_log is sink.log
+    interpreter = Interpreter(console_output=False, inp=["1"], output_sink=DiscardSink())
+    interpreter.run(PRINTS)
+    assert interpreter.output_log is None
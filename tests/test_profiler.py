@@ -0,0 +1,77 @@
+import pytest
+
+import program
+from interpreterv4 import Interpreter
+from profiler import MAIN, Profiler
+
+RECURSIVE = """
+func fib(n) {
+  if (n < 2) {
+    return n;
+  }
+  return fib(n - 1) + fib(n - 2);
+}
+
+func main() {
+  o = @;
+  o.fib = fib;
+  twice = lambda(n) { return 2 * fib(n); };
+  print(fib(18));
+  print(o.fib(10));
+  print(twice(5));
+}
+"""
+
+# fib(n) makes this many calls, itself included
+def fib_calls(n):
+    return 1 if n < 2 else 1 + fib_calls(n - 1) + fib_calls(n - 2)
+
+
+def profile(engine):
+    profiler = Profiler(interval=0.0005)
+    assert program.compile(RECURSIVE, engine=engine).run(profiler=profiler) == [
+        "2584",
+        "55",
+        "10",
+    ]
+    return profiler
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_calls_are_counted_per_function(engine):
+    profiler = profile(engine)
+    # o.fib(10) is a call to o.fib, the recursion inside it and the lambda's
+    # call are to fib by name
+    fib = fib_calls(18) + fib_calls(10) - 1 + fib_calls(5)
+    assert profiler.calls == {
+        MAIN: 1,
+        "fib": fib,
+        "o.fib": 1,
+        "twice (lambda at line 12)": 1,
+    }
+    report = profiler.report()
+    assert "samples over" in report
+    assert f"{'fib':<40}{fib:>10}" in report
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_collapsed_stacks_start_at_main(engine):
+    profiler = profile(engine)
+    stacks = profiler.collapsed()
+    assert stacks
+    assert sum(int(line.split()[-1]) for line in stacks) == sum(profiler.samples.values())
+    for line in stacks:
+        stack, count = line.rsplit(" ", 1)
+        assert stack.split(";")[0] == MAIN
+        assert int(count) > 0
+    for line in profiler.collapsed(lines=True):
+        assert line.startswith(MAIN + ":")
+
+
+def test_a_profiler_accumulates_over_runs():
+    profiler = Profiler()
+    compiled = program.compile(RECURSIVE)
+    compiled.run(profiler=profiler)
+    compiled.run(profiler=profiler)
+    assert profiler.calls[MAIN] == 2
+    assert profiler.calls["o.fib"] == 2
@@ -0,0 +1,116 @@
+import os
+import pickle
+
+import pytest
+
+import interpreterv4
+import program_cache
+from interpreterv4 import Interpreter
+from program_cache import ProgramCache
+
+SOURCE = """
+func main() {
+  print(1 + 2);
+}
+"""
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+
+    def counting_parse(source):
+        calls.append(source)
+        return parse(source)
+
+    parse = interpreterv4.parse_program
+    monkeypatch.setattr(interpreterv4, "parse_program", counting_parse)
+    return calls
+
+
+def run(source, cache, engine="tree", optimize=True):
+    interpreter = Interpreter(
+        console_output=False, engine=engine, optimize=optimize, program_cache=cache
+    )
+    interpreter.run(source)
+    return interpreter.get_output()
+
+
+def entries(cache):
+    return sorted(name for name in os.listdir(cache.directory) if name.endswith(".pickle"))
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_hit_skips_parsing(tmp_path, parses, engine):
+    cache = ProgramCache(str(tmp_path))
+    assert run(SOURCE, cache, engine) == ["3"]
+    assert run(SOURCE, cache, engine) == ["3"]
+    assert run(SOURCE, cache, engine) == ["3"]
+    assert len(parses) == 1
+
+
+def test_changed_source_misses(tmp_path, parses):
+    cache = ProgramCache(str(tmp_path))
+    run(SOURCE, cache)
+    assert run(SOURCE.replace("2", "5"), cache) == ["6"]
+    assert len(parses) == 2
+    assert len(entries(cache)) == 2
+
+
+def test_optimized_and_plain_entries_are_kept_apart(tmp_path, parses):
+    cache = ProgramCache(str(tmp_path))
+    run(SOURCE, cache, optimize=True)
+    run(SOURCE, cache, optimize=False)
+    run(SOURCE, cache, optimize=False)
+    assert len(parses) == 2
+    assert len(entries(cache)) == 2
+
+
+def test_new_interpreter_version_misses(tmp_path, parses, monkeypatch):
+    cache = ProgramCache(str(tmp_path))
+    run(SOURCE, cache)
+    monkeypatch.setattr(program_cache, "version", "edited interpreter")
+    assert run(SOURCE, cache) == ["3"]
+    assert len(parses) == 2
+
+
+def test_entry_of_another_version_is_dropped(tmp_path, parses):
+    cache = ProgramCache(str(tmp_path))
+    path = os.path.join(cache.directory, cache.key(SOURCE, "optimized") + ".pickle")
+    with open(path, "wb") as f:
+        pickle.dump(("older interpreter", None), f)
+    assert run(SOURCE, cache) == ["3"]
+    assert len(parses) == 1
+    with open(path, "rb") as f:
+        assert pickle.load(f)[0] == program_cache.cache_version()
+
+
+def test_unreadable_entry_is_dropped(tmp_path, parses):
+    cache = ProgramCache(str(tmp_path))
+    run(SOURCE, cache)
+    (name,) = entries(cache)
+    with open(os.path.join(cache.directory, name), "wb") as f:
+        f.write(b"truncated")
+    assert cache.load(SOURCE, "optimized") is None
+    assert entries(cache) == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    sources = [SOURCE.replace("2", str(n)) for n in range(3)]
+    for age, source in enumerate(sources):
+        run(source, cache)
+        (path,) = [
+            os.path.join(cache.directory, name)
+            for name in entries(cache)
+            if name.startswith(cache.key(source, "optimized"))
+        ]
+        os.utime(path, (1000 + age, 1000 + age))
+    size = os.path.getsize(path)
+    # a hit makes the oldest entry the most recently used
+    assert cache.load(sources[0], "optimized") is not None
+    cache.max_bytes = 3 * size + size // 2
+    run(SOURCE.replace("2", "7"), cache)
+    assert cache.load(sources[1], "optimized") is None
+    assert cache.load(sources[0], "optimized") is not None
+    assert cache.load(sources[2], "optimized") is not None
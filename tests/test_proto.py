@@ -0,0 +1,58 @@
+import pytest
+
+import program
+from interpreterv4 import Interpreter
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_field_found_up_the_chain_follows_changes(engine):
+    # a proto gaining the field, a new proto and an own field each
+    # invalidate what the earlier reads cached
+    source = """
+func main() {
+  g = @;
+  p = @;
+  p.proto = g;
+  c = @;
+  c.proto = p;
+  g.x = 1;
+  print(c.x);
+  p.x = 2;
+  print(c.x);
+  q = @;
+  q.x = 3;
+  c.proto = q;
+  print(c.x);
+  c.x = 4;
+  print(c.x);
+  print(p.x);
+}
+"""
+    output = program.compile(source, engine=engine).run()
+    assert output == ["1", "2", "3", "4", "2"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_new_proto_further_up_the_chain_is_seen(engine):
+    source = """
+func main() {
+  a = @;
+  a.x = "a";
+  b = @;
+  b.x = "b";
+  p = @;
+  p.proto = a;
+  c = @;
+  c.proto = p;
+  i = 0;
+  while (i < 3) {
+    print(c.x);
+    p.proto = b;
+    i = i + 1;
+  }
+  p.x = "p";
+  print(c.x);
+}
+"""
+    output = program.compile(source, engine=engine).run()
+    assert output == ["a", "b", "b", "p"]
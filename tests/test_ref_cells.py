@@ -0,0 +1,126 @@
+import pytest
+
+from interpreterv4 import Interpreter
+
+SEEN_BY_CALLER = """
+func peek() {
+  print("peek ", total);
+}
+
+func add(ref t, d) {
+  t = t + d;
+  peek();
+}
+
+func main() {
+  total = 1;
+  add(total, 5);
+  print(total);
+}
+"""
+
+SAME_VARIABLE_TWICE = """
+func both(ref a, ref b) {
+  a = 10;
+  print(b);
+  b = 20;
+  print(a);
+}
+
+func main() {
+  x = 1;
+  both(x, x);
+  print(x);
+}
+"""
+
+PASSED_ON = """
+func inner(ref q) {
+  q = q * 2;
+}
+
+func outer(ref p) {
+  inner(p);
+  p = p + 1;
+}
+
+func main() {
+  v = 3;
+  outer(v);
+  print(v);
+}
+"""
+
+CAPTURED = """
+func grab(ref a) {
+  a = 5;
+  f = lambda() { return a; };
+  a = 6;
+  return f;
+}
+
+func main() {
+  x = 1;
+  g = grab(x);
+  x = 100;
+  print(g());
+  print(x);
+}
+"""
+
+NOT_A_VARIABLE = """
+func set(ref a) {
+  a = 9;
+}
+
+func forward(ref a) {
+  return set(a);
+}
+
+func main() {
+  o = @;
+  o.f = 1;
+  set(o.f);
+  print(o.f);
+  y = 2;
+  set(y + 0);
+  print(y);
+  z = 0;
+  forward(z);
+  print(z);
+}
+"""
+
+
+def run(source, engine):
+    interpreter = Interpreter(console_output=False, engine=engine)
+    interpreter.run(source)
+    # every cell is released by the call that made it
+    assert interpreter.env.cells == []
+    return interpreter.get_output()
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_write_is_seen_by_the_caller_during_the_call(engine):
+    assert run(SEEN_BY_CALLER, engine) == ["peek 6", "6"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_two_ref_parameters_share_one_variable(engine):
+    assert run(SAME_VARIABLE_TWICE, engine) == ["10", "20", "20"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_ref_parameter_passed_on_by_ref(engine):
+    assert run(PASSED_ON, engine) == ["7"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_capture_takes_the_value_not_the_cell(engine):
+    assert run(CAPTURED, engine) == ["5", "100"]
+
+
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_only_variables_are_passed_by_ref(engine):
+    # a field and an expression go by value, a tail call passes the ref on
+    assert run(NOT_A_VARIABLE, engine) == ["1", "2", "9"]
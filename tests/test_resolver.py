@@ -0,0 +1,71 @@
+import pytest
+
+import program
+from brewparse import parse_program
+from env_v2 import UNBOUND
+from interpreterv4 import Interpreter
+from resolver import collect_nodes, resolve_program
+
+RECURSIVE = """
+func f(n) {
+  if (n == 0) {
+    return 0;
+  }
+  x = f(n - 1);
+  return x + 1;
+}
+
+func main() {
+  total = f(DEPTH);
+  print(total);
+}
+"""
+
+LAMBDA = """
+func main() {
+  f = lambda(n) {
+    if (n == 0) {
+      return 0;
+    }
+    x = f(n - 1);
+    return x + 1;
+  };
+  print(f(DEPTH));
+}
+"""
+
+
+def addresses(source):
+    nodes = []
+    for func in resolve_program(parse_program(source)).functions:
+        collect_nodes(func.statements, nodes)
+    found = {}
+    for node in nodes:
+        for name, addr in getattr(node, "addrs", {}).items():
+            found.setdefault(name, set()).add(addr)
+    return found
+
+
+def test_only_parameters_and_mains_names_get_a_frame():
+    found = addresses(RECURSIVE.replace("DEPTH", "3"))
+    # n in f's own frame, except in f(n - 1), evaluated with the callee's pushed
+    assert found["n"] == {-2, None}
+    assert found["total"] == {1}
+    assert found["f"] == {UNBOUND}
+    # a caller could hold x, only a scan of the stack can tell
+    assert found["x"] == {None}
+
+
+@pytest.mark.parametrize("source", [RECURSIVE, LAMBDA])
+@pytest.mark.parametrize("engine", Interpreter.ENGINES)
+def test_recursion_through_scanned_locals(engine, source):
+    compiled = program.compile(source.replace("DEPTH", "50"), engine=engine)
+    assert compiled.run() == ["50"]
+
+
+# Each call scans every call under it, so this is quadratic in the depth
+# (see resolver.py); 2000 keeps it well under a second.
+@pytest.mark.parametrize("source", [RECURSIVE, LAMBDA])
+def test_deep_recursion_through_scanned_locals(source):
+    compiled = program.compile(source.replace("DEPTH", "2000"), engine="vm")
+    assert compiled.run() == ["2000"]
@@ -12,8 +12,11 @@ class Type(Enum):
     FUNCTION = 6
     OBJECT = 7
 
-# Represents a value, which has a type and its value
+# Represents a value, which has a type and its value. Values are never
+# changed once made, so the common ones are shared instead of reallocated.
 class Value:
+    __slots__ = ("t", "v")
+
     def __init__(self, type, value=None):
         self.t = type
         self.v = value
@@ -25,17 +28,45 @@ class Value:
         return self.t
 
 
+TRUE = Value(Type.BOOL, True)
+FALSE = Value(Type.BOOL, False)
+NIL = Value(Type.NIL, None)
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1024
+SMALL_INTS = [Value(Type.INT, i) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+
+
+def int_value(val):
+    if SMALL_INT_MIN <= val <= SMALL_INT_MAX:
+        return SMALL_INTS[val - SMALL_INT_MIN]
+    return Value(Type.INT, val)
+
+
+def bool_value(val):
+    return TRUE if val else FALSE
+
+
+# pass-by-value copy for arguments and return values. Everything but objects
+# and lambdas is immutable, so the same Value is handed back.
+def copy_value(val, memo=None):
+    if val.t == Type.OBJECT or val.t == Type.LAMBDA:
+        if memo is None:
+            memo = {}
+        return Value(val.t, val.v.copy(memo))
+    return val
+
+
 def create_value(val):
     if val == InterpreterBase.TRUE_DEF:
-        return Value(Type.BOOL, True)
+        return TRUE
     elif val == InterpreterBase.FALSE_DEF:
-        return Value(Type.BOOL, False)
+        return FALSE
     elif val == InterpreterBase.NIL_DEF:
-        return Value(Type.NIL, None)
+        return NIL
     elif isinstance(val, str):
         return Value(Type.STRING, val)
     elif isinstance(val, int):
-        return Value(Type.INT, val)
+        return int_value(val)
     else:
         raise ValueError("Unknown value type")
 